@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сессии Bot API на локальном поддельном сервере: запросов в
+секунду у сессии aiogram по умолчанию и у настроенной BotSession, а
+также стоимость JSON - разбор пачки обновлений getUpdates и сборка
+клавиатуры запроса - у json и orjson.
+
+Запуск: python benchmarks/bench_http.py [запросов] [одновременно]
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiohttp import web  # noqa: E402
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+
+from bot.session import BotSession, json_codec  # noqa: E402
+from main import LessonTopic, create_lesson_navigation  # noqa: E402
+
+TOKEN = "42:BENCH"
+
+
+def fake_update(update_id: int) -> dict:
+    """Обновление с нажатием кнопки, как в getUpdates"""
+    user = {"id": update_id, "is_bot": False, "first_name": "Ученик", "language_code": "ru"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id), "from": user, "chat_instance": "1", "data": "t:basics:1",
+            "message": {
+                "message_id": update_id, "date": 1700000000, "chat": {"id": update_id, "type": "private"},
+                "text": "📚 Основы Python\n\n" + "Python - высокоуровневый язык программирования. " * 20,
+            },
+        },
+    }
+
+
+async def start_fake_api() -> tuple:
+    """Поддельный Bot API: sendMessage возвращает отправленное сообщение"""
+    async def handle(request: web.Request):
+        form = await request.post()
+        return web.json_response({"ok": True, "result": {
+            "message_id": 1, "date": 1700000000, "chat": {"id": 1, "type": "private"}, "text": form.get("text", ""),
+        }})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, TelegramAPIServer.from_base(f"http://127.0.0.1:{port}")
+
+
+async def requests_per_second(session: AiohttpSession, count: int, concurrency: int) -> float:
+    """Отправить count сообщений с клавиатурой, не больше concurrency одновременно"""
+    bot = Bot(TOKEN, session=session)
+    keyboard = create_lesson_navigation(LessonTopic.BASICS, 1, 3)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(index: int):
+        async with semaphore:
+            await bot.send_message(index, "Привет!", reply_markup=keyboard)
+
+    await send(0)  # установить соединение
+    started = time.perf_counter()
+    await asyncio.gather(*(send(index) for index in range(count)))
+    elapsed = time.perf_counter() - started
+    await session.close()
+    return count / elapsed
+
+
+def measure(function, count: int = 200) -> float:
+    """Медиана времени вызова в микросекундах"""
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+async def bench_sessions(count: int, concurrency: int):
+    runner, api = await start_fake_api()
+    try:
+        sessions = {"aiogram по умолчанию": lambda: AiohttpSession(api=api)}
+        for backend in ("json", "orjson"):
+            try:
+                json_codec(backend)
+            except ImportError:
+                continue
+            sessions[f"BotSession ({backend})"] = lambda backend=backend: BotSession(
+                api=api, pool_size=concurrency, keepalive=60, json_backend=backend
+            )
+        for name, factory in sessions.items():
+            rate = await requests_per_second(factory(), count, concurrency)
+            print(f"{name:<22} {rate:8.0f} запросов/с")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    print(f"Отправка {count} сообщений, одновременно {concurrency}:")
+    asyncio.run(bench_sessions(count, concurrency))
+
+    updates = json.dumps({"ok": True, "result": [fake_update(index) for index in range(100)]}, ensure_ascii=False)
+    markup = create_lesson_navigation(LessonTopic.BASICS, 1, 3).model_dump(exclude_none=True)
+    print(f"\nJSON: getUpdates на 100 обновлений ({len(updates.encode()) // 1024} КБ) и клавиатура урока")
+    for backend in ("json", "orjson"):
+        try:
+            name, loads, dumps = json_codec(backend)
+        except ImportError:
+            print(f"{backend:<8} не установлен")
+            continue
+        print(f"{name:<8} разбор {measure(lambda: loads(updates)):8.1f} мкс, "
+              f"сборка {measure(lambda: dumps(markup), 2000):6.2f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк классификатора намерений: обучение на каталогах и время
+классификации одного сообщения разной длины.
+
+Запуск: python benchmarks/bench_intents.py [сообщений]
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot.i18n import load_catalogues  # noqa: E402
+from bot.intents import IntentClassifier  # noqa: E402
+
+MESSAGES = {
+    "короткое": "привет!",
+    "фраза": "помоги разобраться с классами и наследованием",
+    "вопрос": "Почему мой код на asyncio зависает, если внутри корутины вызвать time.sleep? " * 3,
+    "длинное": "Вот мой код, он падает с ошибкой. " * 200,
+}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    started = time.perf_counter()
+    classifier = IntentClassifier.from_catalogues(load_catalogues()).fit()
+    print(f"Обучение: {(time.perf_counter() - started) * 1000:.1f} мс, "
+          f"примеров {classifier.matrix.shape[1]}, n-грамм {classifier.matrix.shape[0]}")
+
+    for name, text in MESSAGES.items():
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            classifier.classify(text)
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        intent, confidence = classifier.classify(text)
+        print(f"{name:<10} медиана {statistics.median(samples) * 1e6:7.1f} мкс, "
+              f"p99 {samples[int(len(samples) * 0.99)] * 1e6:7.1f} мкс -> {intent} ({confidence:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конвертера Markdown -> HTML на корпусе уроков ~100 КБ.
+
+Запуск: python benchmarks/bench_markdown.py [размер_КБ]
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import LessonManager, convert_markdown  # noqa: E402
+
+
+def build_corpus(size_kb: int) -> str:
+    """Собрать Markdown-корпус из уроков нужного размера"""
+    pages = []
+    for lesson in LessonManager.lessons.values():
+        for content in lesson["content"]:
+            page = f"**{content['title']}**\n\n*{content['explanation']}*\n\n"
+            if "example_code" in content:
+                page += f"Пример `print()`:\n```python\n{content['example_code']}\n```\n\n"
+            pages.append(page)
+    chunk = "".join(pages)
+    repeats = size_kb * 1024 // len(chunk.encode()) + 1
+    return chunk * repeats
+
+
+def regex_chain(text: str) -> str:
+    """Наивная реализация цепочкой подстановок для сравнения"""
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    text = re.sub(r"```(\w*)\n(.*?)\n```", r'<pre><code class="language-\1">\2</code></pre>', text, flags=re.S)
+    text = re.sub(r"`([^`]+)`", r"<code>\1</code>", text)
+    text = re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", text, flags=re.S)
+    text = re.sub(r"\*(.+?)\*", r"<i>\1</i>", text, flags=re.S)
+    return text
+
+
+def measure(func, text: str, rounds: int = 20) -> float:
+    """Лучшее время одного вызова в секундах"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    size_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    corpus = build_corpus(size_kb)
+    size_mb = len(corpus.encode()) / 1024 / 1024
+
+    _, errors = convert_markdown(corpus)
+    print(f"Корпус: {len(corpus.encode()) / 1024:.0f} КБ, ошибок разметки: {len(errors)}")
+
+    for name, func in (("single-pass", convert_markdown), ("regex-chain", regex_chain)):
+        elapsed = measure(func, corpus)
+        print(f"{name:>12}: {elapsed * 1000:8.2f} мс  {size_mb / elapsed:8.1f} МБ/с")
+
+    # Проверка линейности: 10x корпус должен занимать ~10x времени
+    large = corpus * 10
+    ratio = measure(convert_markdown, large, rounds=5) / measure(convert_markdown, corpus)
+    print(f"Отношение времени 10x/1x: {ratio:.1f}")
+
+
+if __name__ == "__main__":
+    main()
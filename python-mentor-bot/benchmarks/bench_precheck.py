@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк предварительной проверки кода: время статической проверки
+по сравнению с запуском в песочнице, которого она позволяет избежать.
+
+Запуск: python benchmarks/bench_precheck.py [повторов]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot.precheck import precheck  # noqa: E402
+from bot.sandbox import Sandbox  # noqa: E402
+from main import LessonManager  # noqa: E402
+
+SAMPLES = {
+    "синтаксис": "def greet(name):\n    print(f'Привет, {name}!'\n",
+    "импорт": "import os\nprint(os.listdir('/'))\n",
+    "цикл": "count = 0\nwhile True:\n    count += 1\n",
+}
+
+
+def measure(function, count: int) -> float:
+    """Медиана времени вызова в микросекундах"""
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    examples = [
+        content["example_code"]
+        for lesson in LessonManager.lessons.values()
+        for content in lesson["content"]
+        if "example_code" in content
+    ]
+    longest = max(examples, key=len)
+    print(f"Примеры уроков: {len(examples)}, самый длинный {len(longest)} символов")
+    print(f"{'самый длинный':<14} {measure(lambda: precheck(longest), count):8.1f} мкс -> {precheck(longest)}")
+    for name, source in SAMPLES.items():
+        rejection = precheck(source)
+        print(f"{name:<14} {measure(lambda: precheck(source), count):8.1f} мкс -> {rejection.reason}")
+
+    sandbox = Sandbox()
+    runs = []
+    for _ in range(10):
+        started = time.perf_counter()
+        asyncio.run(sandbox.run("print('ok')"))
+        runs.append(time.perf_counter() - started)
+    print(f"Запуск в песочнице: медиана {statistics.median(runs) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк холодного старта: импорт main, инициализация БД и время до
+обработки первого обновления.
+
+Bot API подменяется локальной сессией без сети, поэтому измеряется только
+работа самого процесса.
+
+Запуск: python benchmarks/bench_startup.py [повторов]
+"""
+
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_PROBE = (
+    "import time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started)"
+)
+
+FIRST_UPDATE_PROBE = f"""
+import asyncio, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {str(ROOT)!r})
+sys.path.insert(0, {str(Path(__file__).resolve().parent)!r})
+from bench_startup import first_update
+print(asyncio.run(first_update(started)))
+"""
+
+
+def run_probe(code: str) -> str:
+    """Выполнить код в новом интерпретаторе и вернуть его вывод"""
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+async def first_update(started: float) -> str:
+    """Пройти путь main() до ответа на первый /start в текущем процессе"""
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.base import BaseSession
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from aiogram.types import Chat, Message, Update, User
+
+    import main
+
+    imported = time.perf_counter()
+
+    class LocalSession(BaseSession):
+        """Сессия Bot API, отвечающая локально без сети"""
+
+        async def make_request(self, bot, method, timeout=None):
+            name = type(method).__name__
+            if name == "GetMe":
+                return User(id=1, is_bot=True, first_name="Mentor", username="mentor_bot")
+            if name == "SendMessage":
+                return Message(
+                    message_id=1, date=datetime.now(), chat=Chat(id=method.chat_id, type="private"),
+                    text=method.text,
+                )
+            return True
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main.default_tenant.db = main.SQLiteRepository(str(Path(tmp) / "bench.db"))
+        bot = Bot(token="42:BENCH", session=LocalSession())
+        dp = Dispatcher(storage=MemoryStorage())
+        dp.include_router(main.router)
+
+        db_started = time.perf_counter()
+        await asyncio.gather(main.default_tenant.prepare(), bot.me(), main.set_bot_commands(bot))
+        ready = time.perf_counter()
+
+        user = User(id=100, is_bot=False, first_name="Student")
+        update = Update(update_id=1, message=Message(
+            message_id=1, date=datetime.now(), chat=Chat(id=100, type="private"),
+            from_user=user, text="/start",
+        ))
+        await dp.feed_update(bot, update)
+        done = time.perf_counter()
+
+    return f"{imported - started:.4f} {ready - db_started:.4f} {done - started:.4f}"
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    imports = [float(run_probe(IMPORT_PROBE)) for _ in range(rounds)]
+    samples = [list(map(float, run_probe(FIRST_UPDATE_PROBE).split())) for _ in range(rounds)]
+
+    print(f"Импорт main:                 {statistics.median(imports) * 1000:8.1f} мс")
+    print(f"Инициализация БД + getMe:    {statistics.median(s[1] for s in samples) * 1000:8.1f} мс")
+    print(f"До первого обновления:       {statistics.median(s[2] for s in samples) * 1000:8.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк хранилищ на одной нагрузке: пользователи, пакетная запись
+результатов тестов и журнала команд, выборка наступивших повторений.
+
+SQLite проверяется всегда, PostgreSQL - если передан DSN (таблицы в
+этой базе пересоздаются):
+
+Запуск: python benchmarks/bench_storage.py [пользователей] [postgresql://...]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot import review as srs  # noqa: E402
+from bot.models import UserProgress  # noqa: E402
+from bot.storage import PostgresRepository, Repository, SQLiteRepository  # noqa: E402
+
+TABLES = "users, user_questions, command_logs, quiz_scores, review_items, scheduled_jobs"
+
+
+async def measure(repo: Repository, users: int) -> dict:
+    """Прогнать нагрузку и вернуть время каждого этапа в секундах"""
+    now = datetime(2026, 1, 1)
+    timings = {}
+
+    await repo.init_db()
+    try:
+        started = time.perf_counter()
+        for user_id in range(users):
+            await repo.save_user(UserProgress(user_id=user_id, username=f"user{user_id}", created_at=now))
+        timings["save_user"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for user_id in range(users):
+            await repo.get_user(user_id)
+        timings["get_user"] = time.perf_counter() - started
+
+        scores = [
+            (user_id, topic, user_id % 4, 3, now.isoformat())
+            for user_id in range(users) for topic in ("basics", "oop")
+        ]
+        started = time.perf_counter()
+        for offset in range(0, len(scores), 100):
+            await repo.save_quiz_scores(scores[offset:offset + 100])
+        timings["quiz_scores x100"] = time.perf_counter() - started
+
+        logs = [(user_id % users, "/start", now.isoformat()) for user_id in range(users * 10)]
+        started = time.perf_counter()
+        await repo.save_command_logs(logs)
+        timings["command_logs bulk"] = time.perf_counter() - started
+
+        for user_id in range(users):
+            due = (now + timedelta(minutes=user_id)).isoformat()
+            await repo.add_review_item(srs.ReviewItem(user_id, srs.PAGE, "basics", 0, due_at=due))
+        started = time.perf_counter()
+        for minute in range(0, users, 10):
+            await repo.due_reviews((now + timedelta(minutes=minute)).isoformat(), 50)
+        timings["due_reviews"] = time.perf_counter() - started
+    finally:
+        await repo.close()
+    return timings
+
+
+async def reset_postgres(dsn: str):
+    import asyncpg
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f"DROP TABLE IF EXISTS {TABLES}")
+    finally:
+        await conn.close()
+
+
+async def run(users: int, dsn: str = None):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        results["sqlite"] = await measure(SQLiteRepository(str(Path(tmp) / "bench.db")), users)
+    if dsn:
+        await reset_postgres(dsn)
+        results["postgres"] = await measure(PostgresRepository(dsn), users)
+
+    backends = list(results)
+    print(f"{'Этап':<20}" + "".join(f"{name:>12}" for name in backends))
+    for stage in results["sqlite"]:
+        print(f"{stage:<20}" + "".join(f"{results[name][stage] * 1000:10.1f}мс" for name in backends))
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    dsn = sys.argv[2] if len(sys.argv) > 2 else None
+    asyncio.run(run(users, dsn))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк нескольких ботов: N ботов в одном процессе против N процессов
+по одному боту. Для каждого варианта - суммарная пиковая память (RSS) и
+обновлений в секунду.
+
+Уроки, отрендеренные страницы, классификатор намерений и сама
+библиотека в одном процессе загружаются один раз. Bot API подменяется
+локальной сессией без сети.
+
+Запуск: python benchmarks/bench_tenancy.py [ботов] [обновлений на бота]
+"""
+
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = f"""
+import asyncio, sys
+sys.path.insert(0, {str(ROOT)!r})
+sys.path.insert(0, {str(Path(__file__).resolve().parent)!r})
+from bench_tenancy import serve
+print(asyncio.run(serve({{bots}}, {{updates}})))
+"""
+
+TEXTS = ("/start", "📚 Темы обучения", "📊 Мой прогресс", "привет")
+
+
+async def serve(bots: int, updates: int) -> str:
+    """Обработать updates обновлений каждым из bots ботов; вывод - RSS в КБ и секунды"""
+    import resource
+
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.base import BaseSession
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from aiogram.types import Chat, Message, Update, User
+
+    import main
+    from bot.middlewares import TenantMiddleware
+    from bot.storage import SQLiteRepository
+    from bot.tenancy import Tenant
+
+    class LocalSession(BaseSession):
+        """Сессия Bot API, отвечающая локально без сети"""
+
+        async def make_request(self, bot, method, timeout=None):
+            return Message(message_id=1, date=datetime.now(), chat=Chat(id=1, type="private"), text="ok")
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session = LocalSession()
+        middleware = TenantMiddleware(main.default_tenant)
+        tenants, clients = [], []
+        for index in range(bots):
+            tenant = Tenant(f"bot{index}", SQLiteRepository(str(Path(tmp) / f"bot{index}.db")))
+            bot = Bot(token=f"{index + 1}:BENCH", session=session)
+            middleware.register(bot, tenant)
+            tenants.append(tenant)
+            clients.append(bot)
+        await asyncio.gather(*(tenant.prepare() for tenant in tenants))
+
+        dp = Dispatcher(storage=MemoryStorage())
+        dp.update.outer_middleware(middleware)
+        dp.include_router(main.router)
+
+        started = time.perf_counter()
+        for number in range(updates):
+            user = User(id=1000 + number % 50, is_bot=False, first_name="Student", language_code="ru")
+            update = Update(update_id=number, message=Message(
+                message_id=number, date=datetime.now(), chat=Chat(id=user.id, type="private"),
+                from_user=user, text=TEXTS[number % len(TEXTS)],
+            ))
+            await asyncio.gather(*(dp.feed_update(bot, update) for bot in clients))
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*(tenant.db.close() for tenant in tenants))
+
+    return f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} {elapsed:.4f}"
+
+
+def run_probe(bots: int, updates: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", PROBE.format(bots=bots, updates=updates)],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True,
+    )
+
+
+def collect(processes) -> tuple:
+    """Суммарный RSS в МБ и самое долгое время обработки"""
+    results = [list(map(float, process.communicate()[0].strip().splitlines()[-1].split())) for process in processes]
+    return sum(rss for rss, _ in results) / 1024, max(elapsed for _, elapsed in results)
+
+
+def main():
+    bots = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print(f"{bots} ботов, по {updates} обновлений на бота:")
+    variants = {
+        f"1 процесс, {bots} ботов": lambda: [run_probe(bots, updates)],
+        f"{bots} процессов по боту": lambda: [run_probe(1, updates) for _ in range(bots)],
+    }
+    for name, start in variants.items():
+        rss, elapsed = collect(start())
+        print(f"{name:<24} RSS {rss:7.1f} МБ, {bots * updates / elapsed:8.0f} обновлений/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк памяти кэша пользователей: байт на закэшированного ученика
+у словаря моделей UserProgress и у столбцового UserCache, а также
+время чтения из кэша.
+
+Память считается tracemalloc как прирост после заполнения кэша.
+Имена пользователей создаются заранее и не входят в замер: их строки
+одинаковы в обоих вариантах.
+
+Запуск: python benchmarks/bench_users.py [пользователей]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot.models import LessonTopic, UserProgress  # noqa: E402
+from bot.users import UserCache  # noqa: E402
+
+TOPICS = [topic.value for topic in LessonTopic]
+LANGUAGES = ["ru", "en", "es", None]
+
+
+def make_rows(count: int) -> list:
+    """Строки users, как их возвращает хранилище"""
+    started = datetime(2026, 1, 1)
+    return [
+        (user_id, f"student{user_id}", TOPICS[user_id % len(TOPICS)], user_id % 7,
+         (started + timedelta(seconds=user_id)).isoformat(), LANGUAGES[user_id % len(LANGUAGES)])
+        for user_id in range(count)
+    ]
+
+
+def to_model(row: tuple) -> UserProgress:
+    user_id, username, topic, page, created_at, language = row
+    return UserProgress(
+        user_id=user_id, username=username, current_topic=topic, current_page=page,
+        created_at=datetime.fromisoformat(created_at), language=language,
+    )
+
+
+def measure_memory(fill, count: int) -> float:
+    """Байт на пользователя, занятых результатом fill()"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    cache = fill()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del cache
+    return (after - before) / count
+
+
+def fill_models(rows: list) -> dict:
+    return {row[0]: to_model(row) for row in rows}
+
+
+def fill_cache(rows: list) -> UserCache:
+    cache = UserCache(size=len(rows), ttl=0)
+    for row in rows:
+        # Модель живет только до записи в кэш, как после чтения из хранилища
+        cache.put(to_model(row))
+    return cache
+
+
+def measure_reads(get, count: int) -> float:
+    """Среднее время чтения в микросекундах"""
+    started = time.perf_counter()
+    for user_id in range(count):
+        get(user_id)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+
+    models = measure_memory(lambda: fill_models(rows), count)
+    columns = measure_memory(lambda: fill_cache(rows), count)
+    print(f"Пользователей: {count}")
+    print(f"dict[int, UserProgress] {models:8.0f} байт на пользователя")
+    print(f"UserCache               {columns:8.0f} байт на пользователя ({models / columns:.1f}x меньше)")
+
+    by_id, cache = fill_models(rows), fill_cache(rows)
+    print(f"\nЧтение: dict {measure_reads(by_id.get, count):.2f} мкс, "
+          f"UserCache {measure_reads(cache.get, count):.2f} мкс (со сборкой UserProgress)")
+
+
+if __name__ == "__main__":
+    main()
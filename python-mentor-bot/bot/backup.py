@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Онлайн-резервные копии SQLite.
+
+Снимок снимается через backup API порциями страниц в отдельном потоке:
+между порциями блокировка чтения отпускается, и бот продолжает писать.
+Снимок проверяется PRAGMA integrity_check, сжимается gzip и сохраняется
+рядом с файлом контрольной суммы в формате sha256sum.
+
+Запуск: python -m bot.backup create|list|restore [снимок]
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+SNAPSHOT_SUFFIX = ".db.gz"
+CHECKSUM_SUFFIX = ".sha256"
+
+
+def _integrity_check(path: Path):
+    """Проверить целостность файла БД, ValueError если она нарушена"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"Файл не является базой SQLite: {e}") from e
+    finally:
+        conn.close()
+    if result != "ok":
+        raise ValueError(f"Нарушена целостность БД: {result}")
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupManager:
+    """Снимки БД по расписанию с ротацией и проверяемым восстановлением"""
+
+    def __init__(
+            self,
+            db_path: str,
+            backup_dir: str = "backups",
+            keep: int = 7,
+            pages: int = 256,
+            pause: float = 0.05,
+    ):
+        self.db_path = Path(db_path)
+        self.backup_dir = Path(backup_dir)
+        self.keep = keep
+        self.pages = pages
+        self.pause = pause
+
+    def snapshots(self) -> List[Path]:
+        """Снимки от старых к новым"""
+        if not self.backup_dir.exists():
+            return []
+        return sorted(self.backup_dir.glob(f"{self.db_path.stem}-*{SNAPSHOT_SUFFIX}"))
+
+    def _copy(self, target: Path):
+        """Скопировать живую БД порциями по pages страниц"""
+        source = sqlite3.connect(self.db_path)
+        copy = sqlite3.connect(target)
+        try:
+            source.backup(copy, pages=self.pages, sleep=self.pause)
+        finally:
+            copy.close()
+            source.close()
+
+    def create_sync(self, now: Optional[datetime] = None) -> Path:
+        """Снять, проверить и сжать снимок; вернуть путь к нему"""
+        now = now or datetime.now()
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        snapshot = self.backup_dir / f"{self.db_path.stem}-{now:%Y%m%d-%H%M%S}{SNAPSHOT_SUFFIX}"
+
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as tmp:
+            raw = Path(tmp) / "snapshot.db"
+            self._copy(raw)
+            _integrity_check(raw)
+
+            partial = Path(tmp) / snapshot.name
+            with open(raw, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            checksum = _sha256(partial)
+            os.replace(partial, snapshot)
+
+        snapshot.with_name(snapshot.name + CHECKSUM_SUFFIX).write_text(
+            f"{checksum}  {snapshot.name}\n", encoding="utf-8"
+        )
+        self.prune()
+        return snapshot
+
+    async def create(self) -> Path:
+        """Снять снимок в отдельном потоке, не блокируя event loop"""
+        snapshot = await asyncio.to_thread(self.create_sync)
+        logging.info("Резервная копия БД: %s (%d байт)", snapshot, snapshot.stat().st_size)
+        return snapshot
+
+    def prune(self) -> List[Path]:
+        """Удалить снимки сверх keep последних"""
+        stale = self.snapshots()[:-self.keep] if self.keep else []
+        for snapshot in stale:
+            snapshot.unlink(missing_ok=True)
+            snapshot.with_name(snapshot.name + CHECKSUM_SUFFIX).unlink(missing_ok=True)
+        return stale
+
+    def verify(self, snapshot: Path, target: Path):
+        """Проверить контрольную сумму снимка и распаковать его в target"""
+        checksum_file = snapshot.with_name(snapshot.name + CHECKSUM_SUFFIX)
+        if not checksum_file.exists():
+            raise ValueError(f"Нет файла контрольной суммы: {checksum_file}")
+        expected = checksum_file.read_text(encoding="utf-8").split()[0]
+        if _sha256(snapshot) != expected:
+            raise ValueError(f"Контрольная сумма не совпадает: {snapshot}")
+
+        try:
+            with gzip.open(snapshot, "rb") as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+        except (OSError, EOFError) as e:
+            raise ValueError(f"Снимок поврежден: {e}") from e
+        _integrity_check(target)
+
+    def restore(self, snapshot: Path) -> Optional[Path]:
+        """Восстановить БД из проверенного снимка.
+
+        Перед заменой текущая БД сохраняется отдельным снимком. Содержимое
+        переносится тем же backup API, поэтому журнал WAL и открытые
+        соединения не ломают файл. Возвращает путь к снимку прежней БД.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            candidate = Path(tmp) / "restore.db"
+            self.verify(snapshot, candidate)
+
+            previous = None
+            if self.db_path.exists():
+                try:
+                    previous = self.create_sync()
+                except (ValueError, sqlite3.DatabaseError):
+                    # Текущая БД повреждена - сохраняем ее как есть
+                    previous = self.db_path.with_name(f"{self.db_path.name}.{datetime.now():%Y%m%d-%H%M%S}.bad")
+                    shutil.copy2(self.db_path, previous)
+            source = sqlite3.connect(candidate)
+            live = sqlite3.connect(self.db_path)
+            try:
+                source.backup(live)
+            finally:
+                live.close()
+                source.close()
+        return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Резервные копии базы Python Mentor Bot")
+    parser.add_argument("command", choices=("create", "list", "restore"))
+    parser.add_argument("snapshot", nargs="?", help="файл снимка для restore (по умолчанию последний)")
+    parser.add_argument("--db", default=None, help="путь к БД (по умолчанию DATABASE_PATH)")
+    parser.add_argument("--dir", default=None, help="каталог снимков (по умолчанию BACKUP_DIR)")
+    args = parser.parse_args()
+
+    from bot.config import load_settings
+
+    # Те же настройки, что у бота: .env и переменные окружения с проверкой
+    try:
+        config = load_settings()
+    except ValueError as e:
+        parser.exit(1, f"❌ Некорректная конфигурация: {e}\n")
+    manager = BackupManager(args.db or config.database_path, args.dir or config.backup_dir, config.backup_keep)
+
+    if args.command == "create":
+        print(f"✅ Снимок создан: {manager.create_sync()}")
+    elif args.command == "list":
+        for snapshot in manager.snapshots():
+            print(f"{snapshot.name}  {snapshot.stat().st_size} байт")
+    else:
+        snapshots = manager.snapshots()
+        snapshot = Path(args.snapshot) if args.snapshot else (snapshots[-1] if snapshots else None)
+        if snapshot is None:
+            parser.error("снимков не найдено")
+        try:
+            previous = manager.restore(snapshot)
+        except ValueError as e:
+            parser.exit(1, f"❌ {e}\n")
+        print(f"✅ БД восстановлена из {snapshot}")
+        if previous:
+            print(f"Прежняя БД сохранена в {previous}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Задания к страницам уроков: тема -> страница -> задание. Каждый скрытый
+# тест - выражение, вычисляемое в пространстве имен решения, и ожидаемое
+# значение. Перевод условия - в каталоге: lessons.<тема>.<страница>.exercise
+EXERCISES: Dict[str, Dict[int, Dict[str, Any]]] = {
+    "basics": {
+        0: {
+            "task": "Напишите функцию area(width, height), которая возвращает площадь прямоугольника.",
+            "cases": [
+                ("area(2, 3)", 6),
+                ("area(0, 5)", 0),
+                ("area(1.5, 2)", 3.0),
+                ("area(10, 10)", 100),
+            ],
+        },
+        1: {
+            "task": "Напишите функцию count_evens(numbers), которая возвращает количество четных чисел в списке.",
+            "cases": [
+                ("count_evens([1, 2, 3, 4])", 2),
+                ("count_evens([])", 0),
+                ("count_evens([1, 3, 5])", 0),
+                ("count_evens([0, -2, 7, 8])", 3),
+            ],
+        },
+    },
+    "syntax": {
+        0: {
+            "task": (
+                "Напишите функцию even_squares(n), которая с помощью list comprehension "
+                "возвращает список квадратов четных чисел от 0 до n - 1."
+            ),
+            "cases": [
+                ("even_squares(5)", [0, 4, 16]),
+                ("even_squares(0)", []),
+                ("even_squares(1)", [0]),
+                ("even_squares(10)", [0, 4, 16, 36, 64]),
+            ],
+        },
+    },
+    "oop": {
+        0: {
+            "task": (
+                "Напишите класс Rectangle с конструктором Rectangle(width, height) "
+                "и методами area() и perimeter()."
+            ),
+            "cases": [
+                ("Rectangle(2, 3).area()", 6),
+                ("Rectangle(2, 3).perimeter()", 10),
+                ("Rectangle(0, 4).area()", 0),
+                ("Rectangle(5, 5).perimeter()", 20),
+            ],
+        },
+    },
+    "files": {
+        0: {
+            "task": (
+                "Напишите функцию parse_csv_line(line), которая делит строку по запятым "
+                "и возвращает список значений без пробелов по краям."
+            ),
+            "cases": [
+                ("parse_csv_line('a,b,c')", ["a", "b", "c"]),
+                ("parse_csv_line(' Анна , 30 ,Москва ')", ["Анна", "30", "Москва"]),
+                ("parse_csv_line('one')", ["one"]),
+                ("parse_csv_line('x,,y')", ["x", "", "y"]),
+            ],
+        },
+    },
+}
+
+
+def canonical(value: Any) -> str:
+    """Каноническая запись значения для сравнения строк.
+
+    Та же функция есть в программе проверки (bot.grader.HARNESS): значение
+    решения и ожидаемое значение сравниваются как готовые строки.
+    """
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+class Exercise(NamedTuple):
+    """Скомпилированное задание: выражения тестов и канонические ответы"""
+    topic: str
+    page: int
+    task: str
+    expressions: Tuple[str, ...]
+    expected: Tuple[str, ...]
+
+    @property
+    def size(self) -> int:
+        return len(self.expressions)
+
+
+class ExerciseBank:
+    """Задания, скомпилированные один раз при старте"""
+
+    def __init__(self, exercises: Dict[str, Dict[int, Dict[str, Any]]] = EXERCISES):
+        self._exercises: Dict[Tuple[str, int], Exercise] = {}
+        for topic, pages in exercises.items():
+            for page, item in pages.items():
+                if not item["cases"]:
+                    raise ValueError(f"Задание {topic}/{page} без тестов")
+                self._exercises[topic, page] = Exercise(
+                    topic=topic,
+                    page=page,
+                    task=item["task"],
+                    expressions=tuple(expression for expression, _ in item["cases"]),
+                    expected=tuple(canonical(value) for _, value in item["cases"]),
+                )
+
+    def __len__(self) -> int:
+        return len(self._exercises)
+
+    def get(self, topic: str, page: int) -> Optional[Exercise]:
+        """Задание страницы, None если его нет"""
+        return self._exercises.get((topic, page))
+
+    def all(self) -> List[Exercise]:
+        """Все задания в порядке тем"""
+        return list(self._exercises.values())
@@ -0,0 +1,323 @@
+"""
+Автоматическая проверка решений заданий.
+
+Решение проходит статическую проверку в процессе бота, затем все скрытые
+тесты задания выполняются за один запуск песочницы: программа проверки
+(HARNESS) запускает каждый тест отдельным процессом (CASE) со своим
+таймаутом и печатает подписанный JSON с каноническими значениями. Таймауты
+тестов в сумме укладываются в таймаут песочницы, поэтому зависший тест
+проваливает только себя. Сравнение с заранее
+скомпилированными ответами (bot.exercises) - сравнение строк. Ожидаемые
+значения в песочницу не передаются.
+
+Песочницы запускает пул из workers воркеров, поэтому одновременная
+проверка решений многих пользователей не порождает больше процессов,
+чем воркеров. У пользователя в очереди не больше одного решения.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from bot.exercises import Exercise
+from bot.precheck import Rejection
+from bot.sandbox import TIMEOUT, CodeRunner
+
+logger = logging.getLogger(__name__)
+
+# Статусы проверки
+GRADED = "graded"
+REJECTED = "rejected"
+CRASHED = "crashed"
+GRADE_TIMEOUT = "timeout"
+BUSY = "busy"
+
+SOLUTION_NAME = "solution.py"
+CASE_NAME = "case.py"
+# Запас времени песочницы на запуск программы проверки и отчет
+HARNESS_RESERVE = 0.5
+
+# Один тест в отдельном процессе: решение загружается и вычисляет выражение.
+# canonical() должна совпадать с bot.exercises.canonical
+CASE = '''
+import io
+import json
+import sys
+import traceback
+
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+def describe(error):
+    return f"{type(error).__name__}: {error}"[:200]
+
+
+def solution_line(error):
+    lines = [frame.lineno for frame in traceback.extract_tb(error.__traceback__) if frame.filename == SOLUTION]
+    return lines[-1] if lines else None
+
+
+def main():
+    expression, max_value = sys.argv[1], int(sys.argv[2])
+    output = sys.stdout
+    # Вывод решения не должен смешиваться с результатом
+    sys.stdout = io.StringIO()
+    namespace = {"__name__": "solution"}
+    try:
+        with open(SOLUTION, encoding="utf-8") as file:
+            code = compile(file.read(), SOLUTION, "exec")
+        exec(code, namespace)
+    except BaseException as error:
+        result = {"error": describe(error), "line": solution_line(error), "load": True}
+    else:
+        try:
+            result = {"value": canonical(eval(expression, namespace))[:max_value]}
+        except BaseException as error:
+            result = {"error": describe(error)}
+    output.write(json.dumps(result, ensure_ascii=False))
+
+
+SOLUTION = "%s"
+main()
+''' % SOLUTION_NAME
+
+# Программа проверки: сама решение не выполняет, запускает каждый тест
+# отдельным процессом со своим таймаутом и подписывает отчет ключом, который
+# получает через stdin. Процессы тестов не наследуют ее stdout, а /proc/<pid>
+# недоступен им из-за PR_SET_DUMPABLE, поэтому ни записать отчет, ни узнать
+# ключ решение не может
+HARNESS = '''
+import hashlib
+import hmac
+import json
+import subprocess
+import sys
+import tempfile
+
+
+def hide_process():
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(4, 0, 0, 0, 0)  # PR_SET_DUMPABLE
+    except (OSError, AttributeError):
+        pass
+
+
+def parse(data, max_value):
+    try:
+        result = json.loads(data)
+    except ValueError:
+        result = None
+    if not isinstance(result, dict):
+        return {"error": "no result"}
+    if isinstance(result.get("value"), str):
+        return {"value": result["value"][:max_value]}
+    if not isinstance(result.get("error"), str):
+        return {"error": "no result"}
+    case = {"error": result["error"][:200]}
+    if result.get("load") is True:
+        line = result.get("line")
+        case.update(load=True, line=line if type(line) is int else None)
+    return case
+
+
+def run_case(expression, job):
+    with tempfile.TemporaryFile() as output:
+        try:
+            process = subprocess.run(
+                [sys.executable, "-I", "-B", CASE, expression, str(job["max_value"])],
+                stdin=subprocess.DEVNULL, stdout=output, stderr=subprocess.DEVNULL,
+                timeout=job["case_timeout"],
+            )
+        except subprocess.TimeoutExpired:
+            return {"error": "TimeoutError"}
+        output.seek(0)
+        data = output.read(job["max_value"] + 1024)
+    if not data:
+        return {"error": f"exit status {process.returncode}"}
+    return parse(data, job["max_value"])
+
+
+def main():
+    hide_process()
+    job = json.loads(sys.stdin.read())
+    cases = []
+    for expression in job["cases"]:
+        case = run_case(expression, job)
+        if case.pop("load", False):
+            report = {"error": case["error"], "line": case["line"]}
+            break
+        cases.append(case)
+    else:
+        report = {"cases": cases}
+    body = json.dumps(report, ensure_ascii=False)
+    signature = hmac.new(bytes.fromhex(job["key"]), body.encode("utf-8"), hashlib.sha256).hexdigest()
+    sys.stdout.write(signature + "\\n" + body)
+
+
+CASE = "%s"
+main()
+''' % CASE_NAME
+
+
+def verify(output: str, key: bytes) -> Optional[Dict[str, Any]]:
+    """Отчет программы проверки, если подпись верна"""
+    signature, _, body = output.partition("\n")
+    expected = hmac.new(key, body.encode("utf-8"), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(signature, expected):
+        return None
+    return json.loads(body)
+
+
+class CaseResult(NamedTuple):
+    """Результат одного скрытого теста"""
+    passed: bool
+    error: str = ""
+
+
+class GradeResult(NamedTuple):
+    """Результат проверки решения"""
+    status: str
+    cases: Tuple[CaseResult, ...] = ()
+    error: str = ""
+    line: Optional[int] = None
+    rejection: Optional[Rejection] = None
+    duration: float = 0.0
+
+    @property
+    def passed(self) -> int:
+        return sum(case.passed for case in self.cases)
+
+    @property
+    def total(self) -> int:
+        return len(self.cases)
+
+
+class Grader:
+    """Очередь решений и пул воркеров, запускающих песочницу"""
+
+    def __init__(self, runner: CodeRunner, workers: int = 2, max_queue: int = 100, case_timeout: float = 1.0):
+        self.runner = runner
+        self.workers = workers
+        self.case_timeout = case_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Set[int] = set()
+        self.graded = 0
+        self.busy = 0
+        self.grading_time = 0.0
+
+    @property
+    def queued(self) -> int:
+        """Решений в очереди"""
+        return self._queue.qsize()
+
+    def start(self):
+        """Запустить воркеры"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Остановить воркеры; ожидающие в очереди решения отменяются"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            future.cancel()
+
+    async def grade(self, user_id: int, exercise: Exercise, source: str) -> GradeResult:
+        """Проверить решение пользователя"""
+        if user_id in self._pending:
+            self.busy += 1
+            return GradeResult(BUSY)
+        # Статическая проверка дешевле места в очереди
+        rejection = self.runner.check(source)
+        if rejection is not None:
+            return GradeResult(REJECTED, rejection=rejection)
+        if self._queue.full():
+            self.busy += 1
+            return GradeResult(BUSY)
+
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.add(user_id)
+        try:
+            self._queue.put_nowait((exercise, source, future))
+            return await future
+        finally:
+            self._pending.discard(user_id)
+
+    async def _worker(self):
+        while True:
+            exercise, source, future = await self._queue.get()
+            try:
+                # Обработчик мог не дождаться проверки
+                if not future.done():
+                    result = await self._run(exercise, source)
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                logger.exception("Ошибка проверки задания %s/%s", exercise.topic, exercise.page)
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def budget(self, exercise: Exercise) -> float:
+        """Таймаут одного теста: все тесты вместе укладываются в таймаут песочницы"""
+        available = max(self.runner.sandbox.timeout - HARNESS_RESERVE, 0.1)
+        return min(self.case_timeout, available / exercise.size)
+
+    async def _run(self, exercise: Exercise, source: str) -> GradeResult:
+        """Все тесты задания одним запуском песочницы"""
+        key = secrets.token_bytes(32)
+        job = {
+            "key": key.hex(),
+            "cases": exercise.expressions,
+            "case_timeout": self.budget(exercise),
+            # Значение длиннее ожидаемого заведомо неверно - дальше не передаем
+            "max_value": max(map(len, exercise.expected)) + 1,
+        }
+        result = await self.runner.execute(
+            HARNESS, json.dumps(job, ensure_ascii=False), {SOLUTION_NAME: source, CASE_NAME: CASE}
+        )
+        self.graded += 1
+        self.grading_time += result.duration
+        if result.status == TIMEOUT:
+            return GradeResult(GRADE_TIMEOUT, duration=result.duration)
+
+        try:
+            report = verify(result.stdout, key)
+        except ValueError:
+            report = None
+        if report is None:
+            # Программа проверки не дописала отчет (память, процессорное время)
+            error = result.stderr.strip().splitlines()[-1:] or [f"exit status {result.status}"]
+            return GradeResult(CRASHED, error=error[0], duration=result.duration)
+        if "error" in report:
+            return GradeResult(CRASHED, error=report["error"], line=report["line"], duration=result.duration)
+
+        cases = tuple(
+            CaseResult(case.get("value") == expected, case.get("error", ""))
+            for case, expected in zip(report["cases"], exercise.expected)
+        )
+        return GradeResult(GRADED, cases, duration=result.duration)
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние пула и среднее время проверки"""
+        return {
+            "workers": len(self._tasks),
+            "queued": self.queued,
+            "grading": len(self._pending) - self.queued,
+            "graded": self.graded,
+            "busy": self.busy,
+            "grading_avg": self.grading_time / self.graded if self.graded else 0.0,
+        }
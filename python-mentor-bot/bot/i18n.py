@@ -0,0 +1,84 @@
+"""
+Локализация: каталоги сообщений bot/locales/<язык>.json.
+
+Каталоги компилируются один раз при запуске в плоские таблицы
+"группа.ключ" -> строка. Строки языка по умолчанию заранее подставлены
+в таблицу каждого языка, поэтому отсутствующий перевод ничего не стоит
+во время обработки обновления. Обратный индекс по подписям reply-кнопок
+всех языков находит нажатую кнопку одним поиском в словаре.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+LOCALES_DIR = Path(__file__).with_name("locales")
+DEFAULT_LOCALE = "ru"
+
+
+def load_catalogues(directory: Path = LOCALES_DIR) -> Dict[str, Dict[str, Any]]:
+    """Прочитать каталоги <язык>.json из каталога"""
+    return {
+        path.stem: json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted(directory.glob("*.json"))
+    }
+
+
+def flatten(catalogue: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Вложенный каталог -> {"группа.ключ": значение}"""
+    flat = {}
+    for key, value in catalogue.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+class Translator:
+    """Скомпилированные каталоги всех языков.
+
+    Группа "menu" - подписи reply-клавиатуры, по ним строится обратный
+    индекс подпись -> ключ. Группа "intents" - примеры фраз для
+    классификатора намерений (bot.intents).
+    """
+
+    def __init__(self, catalogues: Dict[str, Dict[str, Any]], default: str = DEFAULT_LOCALE):
+        if default not in catalogues:
+            raise ValueError(f"Нет каталога языка по умолчанию: {default}")
+        self.default = default
+        base = flatten(catalogues[default])
+        self.tables: Dict[str, Dict[str, Any]] = {
+            locale: {**base, **flatten(catalogue)} for locale, catalogue in catalogues.items()
+        }
+        # Язык по умолчанию первым: в таком порядке языки показываются в /language
+        self.locales = (default, *sorted(locale for locale in self.tables if locale != default))
+
+        self.buttons: Dict[str, str] = {}
+        for locale, table in self.tables.items():
+            for key, value in table.items():
+                if key.startswith("menu.") and self.buttons.setdefault(value, key) != key:
+                    raise ValueError(f"{locale}: «{value}» уже означает {self.buttons[value]}, а не {key}")
+        self._resolved: Dict[Optional[str], str] = {}
+
+    def resolve(self, language_code: Optional[str]) -> str:
+        """Язык по language_code Telegram ("en-US" -> "en"), иначе язык по умолчанию"""
+        locale = self._resolved.get(language_code)
+        if locale is None:
+            base = (language_code or "").split("-")[0].lower()
+            locale = base if base in self.tables else self.default
+            self._resolved[language_code] = locale
+        return locale
+
+    def get(self, locale: str, key: str, default: Any = None) -> Any:
+        """Значение ключа без подстановки, default если его нет ни в одном каталоге"""
+        return self.tables.get(locale, self.tables[self.default]).get(key, default)
+
+    def text(self, locale: str, key: str, **values: Any) -> str:
+        """Строка на языке locale с подставленными значениями"""
+        text = self.tables.get(locale, self.tables[self.default])[key]
+        return text.format(**values) if values else text
+
+    def button(self, text: Optional[str]) -> Optional[str]:
+        """Ключ reply-кнопки по ее подписи на любом языке"""
+        return self.buttons.get(text) if text else None
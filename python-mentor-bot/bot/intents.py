@@ -0,0 +1,134 @@
+"""
+Классификатор намерений для свободного текста пользователя.
+
+Каждый пример фразы из каталогов (группа "intents") переводится в вектор
+TF-IDF символьных n-грамм внутри слов, поэтому опечатки, окончания и
+знаки препинания ("привет!", "помоги с ооп") почти не влияют на близость.
+Матрица примеров строится один раз; классификация сообщения - один
+проход по его n-граммам и одно умножение вектора на строки матрицы,
+соответствующие этим n-граммам. Ответом служит намерение самого близкого
+примера, если косинусная близость не ниже порога.
+
+numpy импортируется при построении матрицы, а не при импорте модуля:
+запуск бота и CLI, которым классификатор не нужен, за него не платят.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from bot.i18n import flatten
+
+if TYPE_CHECKING:
+    import numpy as np
+
+NGRAM_SIZES = (2, 3, 4)
+# Длинные сообщения - это вопросы, а не команды: хватает начала текста
+MAX_LENGTH = 256
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def ngrams(text: str) -> Counter:
+    """Символьные n-граммы слов текста, слова дополнены пробелами по краям"""
+    grams = Counter()
+    for word in _WORD_RE.findall(text[:MAX_LENGTH].lower().replace("ё", "е")):
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            grams.update(padded[i:i + size] for i in range(len(padded) - size + 1))
+    return grams
+
+
+class IntentClassifier:
+    """Ближайший пример по косинусной близости TF-IDF векторов"""
+
+    def __init__(self, examples: Mapping[str, Iterable[str]], threshold: float = 0.45):
+        self.examples = {intent: list(phrases) for intent, phrases in examples.items()}
+        self.threshold = threshold
+        self.labels: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: Optional[np.ndarray] = None
+        self.unseen_idf = 0.0
+        self.matrix: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_catalogues(cls, catalogues: Mapping[str, Dict[str, Any]], threshold: float = 0.45) -> "IntentClassifier":
+        """Примеры всех языков из группы "intents" каталогов"""
+        examples: Dict[str, List[str]] = {}
+        for catalogue in catalogues.values():
+            for intent, phrases in flatten(catalogue.get("intents", {})).items():
+                examples.setdefault(intent, []).extend(phrases)
+        return cls(examples, threshold)
+
+    @property
+    def fitted(self) -> bool:
+        return self.matrix is not None
+
+    def fit(self) -> "IntentClassifier":
+        """Построить словарь n-грамм, IDF и нормированную матрицу примеров"""
+        import numpy as np
+
+        labels, counted = [], []
+        for intent, phrases in self.examples.items():
+            for phrase in phrases:
+                grams = ngrams(phrase)
+                if grams:
+                    labels.append(intent)
+                    counted.append(grams)
+        if not counted:
+            raise ValueError("Нет примеров фраз для классификатора намерений")
+
+        vocabulary: Dict[str, int] = {}
+        for grams in counted:
+            for gram in grams:
+                vocabulary.setdefault(gram, len(vocabulary))
+
+        df = np.zeros(len(vocabulary))
+        for grams in counted:
+            df[[vocabulary[gram] for gram in grams]] += 1
+        idf = np.log((1 + len(counted)) / (1 + df)) + 1
+
+        # Строки - n-граммы, столбцы - примеры: при классификации берутся
+        # только строки n-грамм сообщения
+        matrix = np.zeros((len(vocabulary), len(counted)), dtype=np.float32)
+        for column, grams in enumerate(counted):
+            rows = [vocabulary[gram] for gram in grams]
+            matrix[rows, column] = (1 + np.log(list(grams.values()))) * idf[rows]
+        matrix /= np.linalg.norm(matrix, axis=0)
+
+        self.labels, self.vocabulary, self.idf, self.matrix = labels, vocabulary, idf, matrix
+        # Незнакомая n-грамма весит как самая редкая: длинный посторонний
+        # текст снижает близость, а не игнорируется
+        self.unseen_idf = math.log(1 + len(counted)) + 1
+        return self
+
+    def scores(self, text: str) -> np.ndarray:
+        """Косинусная близость текста к каждому примеру"""
+        import numpy as np
+
+        if not self.fitted:
+            self.fit()
+        rows, weights, norm = [], [], 0.0
+        for gram, count in ngrams(text).items():
+            weight = 1 + math.log(count)
+            row = self.vocabulary.get(gram)
+            if row is None:
+                weight *= self.unseen_idf
+            else:
+                weight *= self.idf[row]
+                rows.append(row)
+                weights.append(weight)
+            norm += weight * weight
+        if not rows:
+            return np.zeros(len(self.labels), dtype=np.float32)
+        return np.asarray(weights, dtype=np.float32) @ self.matrix[rows] / math.sqrt(norm)
+
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        """Намерение и уверенность; None, если уверенность ниже порога"""
+        scores = self.scores(text)
+        best = int(scores.argmax())
+        confidence = float(scores[best])
+        return (self.labels[best] if confidence >= self.threshold else None), confidence
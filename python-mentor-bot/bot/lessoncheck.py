@@ -0,0 +1,336 @@
+"""
+Проверка содержимого уроков.
+
+Каждый пример example_code компилируется тем же интерпретатором, который
+их запускает (--python): все примеры делятся между workers процессами
+этого интерпретатора (python -m bot.lessoncheck --check-blocks), а не
+пулом, порожденным fork из процесса бота. Заодно определяется, можно ли
+запустить пример отдельно: примеры Flask, Django или pandas требуют
+сторонних пакетов, а примеры с input() ждут ввода. По флагу run
+запускаемые примеры выполняются в песочнице с таймаутом.
+Каждая отрендеренная страница и пример на каждом языке проверяются на
+лимит длины сообщения Telegram.
+
+Результат страницы запоминается вместе с хэшем ее содержимого на всех
+языках: повторная проверка проходит только по изменившимся страницам.
+CLI хранит результаты в JSON-файле между запусками.
+
+Запуск: python -m bot.lessoncheck [--run] [--force] [--cache .lessoncheck.json]
+"""
+
+import argparse
+import ast
+import asyncio
+import hashlib
+import html
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from bot.sandbox import ERROR, TIMEOUT, Sandbox
+
+# Каталог проекта: отсюда целевой интерпретатор импортирует bot.lessoncheck
+ROOT = Path(__file__).resolve().parent.parent
+MESSAGE_LIMIT = 4096
+PYTHON_FIELDS = ("example_code",)
+
+# Виды проблем
+SYNTAX = "syntax"
+RUNTIME = "runtime"
+RUN_TIMEOUT = "timeout"
+LENGTH = "length"
+EMPTY = "empty"
+
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+class Issue(NamedTuple):
+    """Проблема страницы урока"""
+    topic: str
+    page: int
+    kind: str
+    detail: str
+    field: str = ""
+    locale: str = ""
+    line: Optional[int] = None
+
+    def __str__(self) -> str:
+        where = f"{self.topic}/{self.page}"
+        if self.field:
+            where += f" {self.field}" + (f":{self.line}" if self.line else "")
+        if self.locale:
+            where += f" [{self.locale}]"
+        return f"{where}: {self.kind} - {self.detail}"
+
+
+class BlockCheck(NamedTuple):
+    """Результат статической проверки блока кода"""
+    error: str = ""
+    line: Optional[int] = None
+    # Почему пример нельзя запустить отдельно; пусто - можно
+    skip: str = ""
+
+
+def check_block(source: str) -> BlockCheck:
+    """Скомпилировать блок и понять, запускается ли он отдельно. Выполняется целевым интерпретатором"""
+    try:
+        tree = ast.parse(source)
+        compile(tree, "<lesson>", "exec")
+    except SyntaxError as e:
+        return BlockCheck(e.msg, e.lineno)
+
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.partition(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module.partition(".")[0])
+    third_party = sorted(modules - sys.stdlib_module_names)
+    if third_party:
+        return BlockCheck(skip="нужны " + ", ".join(third_party))
+    if any(
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "input"
+        for node in ast.walk(tree)
+    ):
+        return BlockCheck(skip="ждет ввода")
+    return BlockCheck()
+
+
+def visible_length(part: str) -> int:
+    """Длина HTML-сообщения после разбора разметки, в единицах UTF-16"""
+    return len(html.unescape(_TAG_RE.sub("", part)).encode("utf-16-le")) // 2
+
+
+class PageResult(NamedTuple):
+    """Запомненный результат проверки страницы"""
+    digest: str
+    issues: Tuple[Issue, ...]
+    compiled: int
+    executed: int
+    skipped: Tuple[str, ...]
+
+
+class Report(NamedTuple):
+    """Итог проверки всех уроков"""
+    pages: int
+    checked: int
+    compiled: int
+    executed: int
+    skipped: Tuple[str, ...]
+    issues: Tuple[Issue, ...]
+    duration: float
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def format(self) -> str:
+        lines = [
+            f"Страниц: {self.pages}, проверено заново: {self.checked} за {self.duration:.1f} с",
+            f"Скомпилировано примеров: {self.compiled}, выполнено: {self.executed}, "
+            f"не запускаются отдельно: {len(self.skipped)}",
+        ]
+        lines += [f"  - {skip}" for skip in self.skipped]
+        lines.append(f"Проблем: {len(self.issues)}")
+        lines += [f"  - {issue}" for issue in self.issues]
+        return "\n".join(lines)
+
+
+class LessonValidator:
+    """Проверка страниц уроков с повторной проверкой только изменившихся"""
+
+    def __init__(self, lessons: Any, locales: Iterable[str], sandbox: Optional[Sandbox] = None, workers: int = 2):
+        # lessons - LessonManager: lessons, get_topic_content, render_page, render_code
+        self.lessons = lessons
+        self.locales = tuple(locales)
+        self.sandbox = sandbox or Sandbox()
+        self.workers = workers
+        self.results: Dict[str, PageResult] = {}
+
+    def pages(self) -> List[Tuple[Any, int]]:
+        return [
+            (topic, page)
+            for topic, lesson in self.lessons.lessons.items()
+            for page in range(len(lesson["content"]))
+        ]
+
+    def page_digest(self, topic: Any, page: int, run: bool) -> str:
+        """Хэш содержимого страницы на всех языках и режима проверки"""
+        # Интерпретатор компилирует примеры и без run
+        digest = hashlib.sha256(f"{run}:{self.sandbox.python}".encode())
+        for locale in self.locales:
+            content = self.lessons.get_topic_content(topic, page, locale)
+            digest.update(json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()
+
+    async def validate(self, run: bool = False, force: bool = False) -> Report:
+        """Проверить изменившиеся страницы (все при force) и собрать отчет"""
+        started = time.perf_counter()
+        pending = []
+        for topic, page in self.pages():
+            digest = self.page_digest(topic, page, run)
+            cached = self.results.get(f"{topic.value}/{page}")
+            if force or cached is None or cached.digest != digest:
+                pending.append((topic, page, digest))
+
+        if pending:
+            keys, sources = [], []
+            for topic, page, _ in pending:
+                content = self.lessons.get_topic_content(topic, page)
+                for field in PYTHON_FIELDS:
+                    if field in content:
+                        keys.append((topic, page, field))
+                        sources.append(content[field])
+            checks = dict(zip(keys, await self.compile_blocks(sources)))
+            semaphore = asyncio.Semaphore(self.workers)
+            results = await asyncio.gather(*(
+                self._check_page(semaphore, checks, topic, page, digest, run) for topic, page, digest in pending
+            ))
+            for (topic, page, _), result in zip(pending, results):
+                self.results[f"{topic.value}/{page}"] = result
+
+        keys = [f"{topic.value}/{page}" for topic, page in self.pages()]
+        # Страницы удаленных уроков из отчета уходят
+        self.results = {key: self.results[key] for key in keys}
+        return Report(
+            pages=len(keys),
+            checked=len(pending),
+            compiled=sum(self.results[key].compiled for key in keys),
+            executed=sum(self.results[key].executed for key in keys),
+            skipped=tuple(skip for key in keys for skip in self.results[key].skipped),
+            issues=tuple(issue for key in keys for issue in self.results[key].issues),
+            duration=time.perf_counter() - started,
+        )
+
+    async def compile_blocks(self, sources: List[str]) -> List[BlockCheck]:
+        """Проверить блоки целевым интерпретатором: до workers процессов, у каждого своя часть"""
+        if not sources:
+            return []
+        size = -(-len(sources) // self.workers)
+        chunks = await asyncio.gather(*(
+            self._compile_chunk(sources[start:start + size]) for start in range(0, len(sources), size)
+        ))
+        return [check for chunk in chunks for check in chunk]
+
+    async def _compile_chunk(self, sources: List[str]) -> List[BlockCheck]:
+        process = await asyncio.create_subprocess_exec(
+            self.sandbox.python, "-B", "-m", "bot.lessoncheck", "--check-blocks",
+            cwd=ROOT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate(json.dumps(sources, ensure_ascii=False).encode("utf-8"))
+        if process.returncode:
+            error = stderr.decode("utf-8", "replace").strip().splitlines()[-1:] or [f"код {process.returncode}"]
+            raise RuntimeError(f"{self.sandbox.python}: {error[0]}")
+        return [BlockCheck(*check) for check in json.loads(stdout)]
+
+    async def _check_page(self, semaphore: asyncio.Semaphore, checks: Dict[Tuple[Any, int, str], BlockCheck],
+                          topic: Any, page: int, digest: str, run: bool) -> PageResult:
+        content = self.lessons.get_topic_content(topic, page)
+        issues: List[Issue] = []
+        skipped: List[str] = []
+        compiled = executed = 0
+
+        for field in PYTHON_FIELDS:
+            if field not in content:
+                continue
+            check = checks[topic, page, field]
+            compiled += 1
+            if check.error:
+                issues.append(Issue(topic.value, page, SYNTAX, check.error, field, line=check.line))
+            elif check.skip:
+                skipped.append(f"{topic.value}/{page} {field}: {check.skip}")
+            elif run:
+                async with semaphore:
+                    result = await self.sandbox.run(content[field])
+                executed += 1
+                if result.status == TIMEOUT:
+                    issues.append(Issue(topic.value, page, RUN_TIMEOUT, f"дольше {self.sandbox.timeout:g} с", field))
+                elif result.status == ERROR:
+                    error = result.stderr.strip().splitlines()[-1:] or ["ненулевой код выхода"]
+                    issues.append(Issue(topic.value, page, RUNTIME, error[0], field))
+
+        for locale in self.locales:
+            rendered = [("page", self.lessons.render_page(topic, page, locale))]
+            if "example_code" in content:
+                rendered.append(("code", self.lessons.render_code(topic, page, locale)))
+            for name, parts in rendered:
+                if not parts:
+                    issues.append(Issue(topic.value, page, EMPTY, f"{name}: нет частей", locale=locale))
+                for index, part in enumerate(parts):
+                    length = visible_length(part)
+                    if length > MESSAGE_LIMIT:
+                        issues.append(Issue(
+                            topic.value, page, LENGTH, f"{name} часть {index + 1}: {length} > {MESSAGE_LIMIT}",
+                            locale=locale,
+                        ))
+
+        return PageResult(digest, tuple(issues), compiled, executed, tuple(skipped))
+
+    def load(self, path: Path):
+        """Загрузить результаты прошлой проверки"""
+        if not path.exists():
+            return
+        data = json.loads(path.read_text(encoding="utf-8"))
+        self.results = {
+            key: PageResult(
+                value["digest"], tuple(Issue(*issue) for issue in value["issues"]),
+                value["compiled"], value["executed"], tuple(value["skipped"]),
+            )
+            for key, value in data.items()
+        }
+
+    def save(self, path: Path):
+        """Сохранить результаты для следующей проверки"""
+        data = {
+            key: {
+                "digest": result.digest, "issues": [list(issue) for issue in result.issues],
+                "compiled": result.compiled, "executed": result.executed, "skipped": list(result.skipped),
+            }
+            for key, result in self.results.items()
+        }
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+def check_blocks_stdio():
+    """Режим целевого интерпретатора: JSON-список блоков из stdin, результаты в stdout"""
+    sources = json.loads(sys.stdin.buffer.read())
+    json.dump([list(check_block(source)) for source in sources], sys.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка примеров кода и страниц уроков Python Mentor Bot")
+    parser.add_argument("--run", action="store_true", help="выполнить запускаемые примеры в песочнице")
+    parser.add_argument("--force", action="store_true", help="проверить все страницы, а не только изменившиеся")
+    parser.add_argument("--cache", default=".lessoncheck.json", help="файл с результатами прошлой проверки")
+    parser.add_argument("--timeout", type=float, default=5.0, help="время одного запуска, с")
+    parser.add_argument("--python", default=sys.executable, help="интерпретатор для запуска примеров")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--check-blocks", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.check_blocks:
+        check_blocks_stdio()
+        return
+
+    # Уроки и каталоги живут в main; импорт только для CLI
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from main import LessonManager, i18n
+
+    validator = LessonValidator(
+        LessonManager, i18n.locales, Sandbox(timeout=args.timeout, python=args.python), args.workers
+    )
+    cache = Path(args.cache)
+    validator.load(cache)
+    report = asyncio.run(validator.validate(run=args.run, force=args.force))
+    validator.save(cache)
+    print(report.format())
+    sys.exit(0 if report.ok else 1)
+
+
+if __name__ == "__main__":
+    main()
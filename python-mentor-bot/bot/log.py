@@ -0,0 +1,153 @@
+import json
+import logging
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Контекст текущего обновления: user_id, update_id, handler.
+# Каждое обновление обрабатывается в своей задаче, поэтому значение не
+# протекает между обновлениями и доступно в том числе обработчику ошибок.
+log_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("log_context", default=None)
+
+CONTEXT_FIELDS = ("user_id", "update_id", "handler")
+
+CONSOLE_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи поля контекста обновления"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = log_context.get() or {}
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Ограничение повторяющихся предупреждений и ошибок.
+
+    Записи одного вида (логгер, уровень, шаблон сообщения, тип исключения)
+    пропускаются не чаще burst раз за period секунд. Первая запись
+    следующего окна получает поле suppressed с числом отброшенных.
+    """
+
+    def __init__(self, burst: int = 5, period: float = 60.0, level: int = logging.WARNING):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.level = level
+        self.suppressed = 0
+        self._windows: Dict[Tuple, list] = {}
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        key = (record.name, record.levelno, record.msg, exc_type)
+        now = time.monotonic()
+
+        with self._lock:
+            if now >= self._next_sweep:
+                # Закрытые окна живут еще один период, чтобы передать счетчик отброшенных
+                self._windows = {k: w for k, w in self._windows.items() if now - w[0] < 2 * self.period}
+                self._next_sweep = now + self.period
+
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                dropped = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if dropped:
+                    record.suppressed = dropped
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS + ("suppressed",):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _ContextQueueHandler(QueueHandler):
+    """QueueHandler, сохраняющий поля записи для форматтеров слушателя"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщение и трассировка вычисляются в потоке вызова, пока живы
+        # аргументы и исключение; форматирование остается слушателю.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(
+        level: str = "INFO",
+        log_dir: Optional[str] = "logs",
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        sample_burst: int = 5,
+        sample_period: float = 60.0,
+) -> QueueListener:
+    """Настроить неблокирующее логирование и вернуть запущенный слушатель.
+
+    Корневой логгер только кладет записи в очередь; запись в консоль и в
+    JSON-файл с ротацией по размеру выполняет поток QueueListener.
+    Слушатель нужно остановить при завершении, чтобы дописать очередь.
+    """
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    handlers = [console]
+    if log_dir:
+        Path(log_dir).mkdir(parents=True, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            Path(log_dir) / "bot.log", maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _ContextQueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(SamplingFilter(sample_burst, sample_period))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,298 @@
+import asyncio
+import itertools
+import time
+from array import array
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import TelegramObject, Update
+
+from bot.log import log_context
+from bot.tenancy import Tenant, current_tenant
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+
+class DrainMiddleware(BaseMiddleware):
+    """Учет обрабатываемых обновлений для корректной остановки.
+
+    Должен быть самым внешним: запоминает задачу каждого обновления, а после
+    начала остановки отклоняет новые. drain() ждет завершения текущих
+    обработчиков до таймаута и отменяет оставшиеся.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.draining = False
+        self.rejected = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Количество обновлений в обработке"""
+        return len(self._tasks)
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if self.draining:
+            self.rejected += 1
+            return None
+
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self._tasks.discard(task)
+            if not self._tasks:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> Tuple[int, int]:
+        """Дождаться текущих обработчиков: (завершено, отменено)"""
+        self.draining = True
+        pending = len(self._tasks)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        abandoned = list(self._tasks)
+        for task in abandoned:
+            task.cancel()
+        if abandoned:
+            await asyncio.wait(abandoned, timeout=1.0)
+        return pending - len(abandoned), len(abandoned)
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """Контекст обновления для структурных логов.
+
+    Как внешний middleware обновлений заводит контекст с update_id и user_id,
+    как внутренний middleware событий дописывает в него имя обработчика.
+    """
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if isinstance(event, Update):
+            user = data.get("event_from_user")
+            log_context.set({"update_id": event.update_id, "user_id": user.id if user else None})
+        else:
+            context = log_context.get()
+            handler_object = data.get("handler")
+            if context is not None and handler_object is not None:
+                context["handler"] = handler_object.callback.__name__
+        return await handler(event, data)
+
+
+class _UserSlot:
+    """Очередь обновлений одного пользователя"""
+    __slots__ = ("lock", "waiters", "latest")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.waiters = 0
+        self.latest = -1
+
+
+class UserSerializationMiddleware(BaseMiddleware):
+    """Последовательная обработка обновлений каждого пользователя.
+
+    Обновления одного user_id выполняются строго по очереди, а из нескольких
+    ожидающих навигационных нажатий выполняется только последнее. Общее число
+    одновременно работающих обработчиков ограничено семафором. Слот
+    пользователя удаляется, как только у него не остается ожидающих обновлений,
+    поэтому память зависит только от числа активных пользователей.
+    """
+
+    def __init__(
+            self,
+            max_concurrent: int = 64,
+            is_collapsible: Optional[Callable[[TelegramObject], bool]] = None,
+    ):
+        self._slots: Dict[int, _UserSlot] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._is_collapsible = is_collapsible
+        self._tickets = itertools.count()
+        self.in_flight = 0
+        self.collapsed = 0
+
+    @property
+    def active_users(self) -> int:
+        """Количество пользователей с обновлениями в обработке или в очереди"""
+        return len(self._slots)
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await self._run(handler, event, data)
+
+        slot = self._slots.get(user.id)
+        if slot is None:
+            slot = self._slots[user.id] = _UserSlot()
+        slot.waiters += 1
+
+        ticket = None
+        if self._is_collapsible is not None and self._is_collapsible(event):
+            ticket = slot.latest = next(self._tickets)
+
+        try:
+            async with slot.lock:
+                if ticket is not None and ticket != slot.latest:
+                    # Пока ждали, пришло более свежее нажатие навигации
+                    self.collapsed += 1
+                    if isinstance(event, Update) and event.callback_query:
+                        await event.callback_query.answer()
+                    return None
+                return await self._run(handler, event, data)
+        finally:
+            slot.waiters -= 1
+            if not slot.waiters:
+                del self._slots[user.id]
+
+    async def _run(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self.in_flight -= 1
+
+
+class DebounceMiddleware(BaseMiddleware):
+    """Из серии частых обновлений пользователя обрабатывается только последнее.
+
+    Подходящее обновление ждет delay секунд; если за это время от того же
+    пользователя пришло более свежее, текущее отбрасывается без ответа.
+    Так inline-запросы, которые Telegram присылает на каждое нажатие
+    клавиши, не доходят до обработчиков, антифлуда и очереди пользователя:
+    клиент все равно показывает результаты только последнего запроса.
+    """
+
+    def __init__(self, delay: float = 0.3, applies_to: Optional[Callable[[TelegramObject], bool]] = None):
+        self.delay = delay
+        self._applies_to = applies_to
+        self._latest: Dict[int, int] = {}
+        self._tickets = itertools.count()
+        self.debounced = 0
+
+    @property
+    def pending_users(self) -> int:
+        """Количество пользователей с ожидающим обновлением"""
+        return len(self._latest)
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        user = data.get("event_from_user")
+        if user is None or self.delay <= 0 or (self._applies_to is not None and not self._applies_to(event)):
+            return await handler(event, data)
+
+        ticket = self._latest[user.id] = next(self._tickets)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            superseded = self._latest.get(user.id) != ticket
+            if not superseded:
+                del self._latest[user.id]
+        if superseded:
+            self.debounced += 1
+            return None
+        return await handler(event, data)
+
+
+class _Window:
+    """Кольцевой буфер времен последних обновлений пользователя"""
+    __slots__ = ("hits", "cursor", "last")
+
+    def __init__(self, size: int):
+        self.hits = array("d", bytes(8 * size))
+        self.cursor = 0
+        self.last = 0.0
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Антифлуд: не больше rate обновлений пользователя за period секунд.
+
+    Скользящее окно хранится в кольцевом array на rate элементов: обновление
+    пропускается, если самая старая отметка в кольце уже вышла за окно.
+    Окна неактивных пользователей периодически удаляются, так что память
+    пропорциональна числу активных пользователей. Лишние нажатия получают
+    пустой callback.answer, лишние сообщения молча отбрасываются.
+    """
+
+    def __init__(self, rate: int = 10, period: float = 5.0, exempt_ids: Iterable[int] = ()):
+        self.rate = rate
+        self.period = period
+        self.exempt_ids = frozenset(exempt_ids)
+        self._windows: Dict[int, _Window] = {}
+        self._next_sweep = 0.0
+        self.throttled = 0
+
+    @property
+    def active_users(self) -> int:
+        """Количество пользователей с открытым окном"""
+        return len(self._windows)
+
+    def configure(self, rate: int, period: float):
+        """Изменить лимит на лету; при смене rate окна создаются заново"""
+        if rate != self.rate:
+            self._windows.clear()
+        self.rate = rate
+        self.period = period
+
+    def hit(self, user_id: int, now: Optional[float] = None) -> bool:
+        """Учесть обновление пользователя, False если лимит превышен"""
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        window = self._windows.get(user_id)
+        if window is None:
+            window = self._windows[user_id] = _Window(self.rate)
+        elif window.hits[window.cursor] and now - window.hits[window.cursor] < self.period:
+            return False
+
+        window.hits[window.cursor] = now
+        window.cursor = (window.cursor + 1) % self.rate
+        window.last = now
+        return True
+
+    def _sweep(self, now: float):
+        """Удалить окна пользователей, не писавших дольше period"""
+        expired = [user_id for user_id, window in self._windows.items() if now - window.last >= self.period]
+        for user_id in expired:
+            del self._windows[user_id]
+        self._next_sweep = now + self.period
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        user = data.get("event_from_user")
+        if user is None or user.id in self.exempt_ids or self.hit(user.id):
+            return await handler(event, data)
+
+        self.throttled += 1
+        if isinstance(event, Update) and event.callback_query:
+            await event.callback_query.answer()
+        return None
+
+
+class TenantMiddleware(BaseMiddleware):
+    """Выбор данных бота, получившего обновление.
+
+    Кладет Tenant в current_tenant на время обработки и передает обработчикам
+    как tenant. Бот ищется по id из токена, без запроса getMe.
+    """
+
+    def __init__(self, default: Tenant):
+        self.default = default
+        self._tenants: Dict[int, Tenant] = {}
+
+    def register(self, bot: Bot, tenant: Tenant):
+        self._tenants[bot.id] = tenant
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        bot = data.get("bot")
+        tenant = self._tenants.get(bot.id, self.default) if bot is not None else self.default
+        data["tenant"] = tenant
+        token = current_tenant.set(tenant)
+        try:
+            return await handler(event, data)
+        finally:
+            current_tenant.reset(token)
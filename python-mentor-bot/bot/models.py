@@ -0,0 +1,34 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+# ---------- ENUM тем ----------
+class LessonTopic(str, Enum):
+    BASICS = "basics"
+    OOP = "oop"
+    FILES = "files"
+    TOOLS = "tools"
+    FRAMEWORKS = "frameworks"
+    DATASCIENCE = "datascience"
+    SYNTAX = "syntax"
+    ASYNC = "async"
+    TEST = "test"
+    INSTALL = "install"
+
+
+# ---------- Пользователь ----------
+class UserProgress(BaseModel):
+    user_id: int
+    username: Optional[str] = None
+    current_topic: str = LessonTopic.BASICS.value
+    current_page: int = 0
+    created_at: datetime = Field(default_factory=datetime.now)
+    language: Optional[str] = None
+
+    def update_topic(self, topic: LessonTopic, page: int = 0):
+        """Обновить текущую тему и страницу"""
+        self.current_topic = topic.value
+        self.current_page = page
@@ -0,0 +1,142 @@
+"""
+Статическая проверка присланного кода до запуска в песочнице.
+
+Проверка выполняется в процессе бота за доли миллисекунды: разбор ast,
+ограничения размера и сложности, запрещенные импорты и имена, очевидно
+бесконечные циклы. Код с синтаксической ошибкой или без шансов на
+успешный запуск отклоняется сразу, не занимая песочницу. Это не граница
+безопасности - ее обеспечивают ограничения самой песочницы - а фильтр,
+снимающий с нее заведомо бесполезную нагрузку.
+"""
+
+import ast
+from typing import List, NamedTuple, Optional
+
+# Модули, дающие доступ к процессу, файловой системе и сети
+FORBIDDEN_MODULES = frozenset({
+    "builtins", "ctypes", "importlib", "marshal", "multiprocessing", "os", "pickle",
+    "pty", "resource", "shutil", "signal", "socket", "subprocess", "sys",
+})
+FORBIDDEN_NAMES = frozenset({
+    "__import__", "breakpoint", "compile", "eval", "exec", "globals", "open", "vars",
+})
+# Атрибуты, через которые из объекта достают builtins и чужие модули
+FORBIDDEN_ATTRIBUTES = frozenset({
+    "__builtins__", "__closure__", "__code__", "__globals__", "__subclasses__",
+})
+
+# Узлы, открывающие новый уровень вложенности
+_BLOCKS = (
+    ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.For, ast.AsyncFor, ast.While,
+    ast.If, ast.With, ast.AsyncWith, ast.Try, ast.Lambda,
+)
+# Узлы, внутри которых break и return относятся уже не к проверяемому циклу
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+_LOOPS = (ast.For, ast.AsyncFor, ast.While)
+
+
+class PrecheckLimits(NamedTuple):
+    """Ограничения размера и сложности кода"""
+    max_chars: int = 5000
+    max_lines: int = 200
+    max_nodes: int = 3000
+    max_depth: int = 12
+
+
+class Rejection(NamedTuple):
+    """Причина отказа: reason - ключ для сообщения, detail - подробности"""
+    reason: str
+    line: Optional[int] = None
+    detail: str = ""
+
+
+DEFAULT_LIMITS = PrecheckLimits()
+
+
+def format_syntax_error(source: str, error: SyntaxError) -> str:
+    """Строка с ошибкой, указатель на позицию и текст ошибки"""
+    lines = source.splitlines()
+    text = f"{type(error).__name__}: {error.msg}"
+    if not error.lineno or error.lineno > len(lines):
+        return text
+    number = str(error.lineno)
+    line = lines[error.lineno - 1].expandtabs(4)
+    offset = max(1, min(error.offset or 1, len(line) + 1))
+    return f"{number} | {line}\n{' ' * len(number)} | {' ' * (offset - 1)}^\n{text}"
+
+
+def _exits_loop(body: List[ast.stmt]) -> bool:
+    """Есть ли в теле цикла break, return или raise, относящиеся к нему"""
+    # (узел, относится ли break в нем к проверяемому циклу)
+    stack = [(node, True) for node in body]
+    while stack:
+        node, own_break = stack.pop()
+        if isinstance(node, (ast.Return, ast.Raise)) or (own_break and isinstance(node, ast.Break)):
+            return True
+        if isinstance(node, _SCOPES):
+            continue
+        if isinstance(node, _LOOPS):
+            # break в теле вложенного цикла выходит только из него, а в else - из внешнего
+            stack.extend((child, False) for child in node.body)
+            stack.extend((child, own_break) for child in node.orelse)
+        else:
+            stack.extend((child, own_break) for child in ast.iter_child_nodes(node))
+    return False
+
+
+def _is_endless(loop: ast.While) -> bool:
+    """while с истинной константой в условии и без выхода из тела"""
+    test = loop.test
+    return isinstance(test, ast.Constant) and bool(test.value) and not _exits_loop(loop.body)
+
+
+def _module_root(name: Optional[str]) -> str:
+    return (name or "").partition(".")[0]
+
+
+def precheck(source: str, limits: PrecheckLimits = DEFAULT_LIMITS) -> Optional[Rejection]:
+    """Проверить код; None, если его стоит запускать"""
+    if not source.strip():
+        return Rejection("empty")
+    if len(source) > limits.max_chars:
+        return Rejection("size", detail=str(limits.max_chars))
+    if source.count("\n") + 1 > limits.max_lines:
+        return Rejection("lines", detail=str(limits.max_lines))
+
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return Rejection("syntax", e.lineno, format_syntax_error(source, e))
+    except (ValueError, MemoryError, RecursionError) as e:
+        # Нулевые байты и патологическая вложенность выражений
+        return Rejection("complexity", detail=str(e))
+
+    nodes = 0
+    stack = [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        nodes += 1
+        if nodes > limits.max_nodes:
+            return Rejection("complexity", detail=str(limits.max_nodes))
+        line = getattr(node, "lineno", None)
+
+        if isinstance(node, _BLOCKS):
+            depth += 1
+            if depth > limits.max_depth:
+                return Rejection("complexity", line, str(limits.max_depth))
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if _module_root(alias.name) in FORBIDDEN_MODULES:
+                    return Rejection("import", line, alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level == 0 and _module_root(node.module) in FORBIDDEN_MODULES:
+                return Rejection("import", line, node.module)
+        elif isinstance(node, ast.Name) and node.id in FORBIDDEN_NAMES:
+            return Rejection("name", line, node.id)
+        elif isinstance(node, ast.Attribute) and node.attr in FORBIDDEN_ATTRIBUTES:
+            return Rejection("name", line, node.attr)
+        elif isinstance(node, ast.While) and _is_endless(node):
+            return Rejection("loop", line)
+
+        stack.extend((child, depth) for child in ast.iter_child_nodes(node))
+    return None
@@ -0,0 +1,150 @@
+import random
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from bot.i18n import DEFAULT_LOCALE, flatten, load_catalogues
+
+
+def question_banks(table: Mapping[str, Any]) -> Dict[str, List[Dict]]:
+    """Банки вопросов из плоской таблицы каталога: quiz.<тема>.<номер>.question и options.
+
+    Первый вариант ответа - правильный. Порядок тем - порядок каталога.
+    """
+    banks: Dict[str, Dict[int, Dict]] = {}
+    for key, value in table.items():
+        group, _, rest = key.partition(".")
+        if group == "quiz":
+            topic, index, field = rest.split(".")
+            banks.setdefault(topic, {}).setdefault(int(index), {})[field] = value
+    return {topic: [items[index] for index in sorted(items)] for topic, items in banks.items()}
+
+
+@lru_cache(maxsize=None)
+def default_question_banks() -> Dict[str, List[Dict]]:
+    """Банки вопросов каталога языка по умолчанию - для кода без Translator"""
+    return question_banks(flatten(load_catalogues()[DEFAULT_LOCALE]))
+
+
+class Question(NamedTuple):
+    """Скомпилированный вопрос с заранее перемешанными ответами"""
+    text: str
+    options: Tuple[str, ...]
+    correct: int
+
+
+class QuizBank:
+    """Банки вопросов, скомпилированные один раз при старте"""
+
+    def __init__(self, banks: Dict[str, List[Dict]], seed: int = 2025):
+        self._questions: Dict[str, Tuple[Question, ...]] = {}
+        for topic, items in banks.items():
+            compiled = []
+            for index, item in enumerate(items):
+                order = list(range(len(item["options"])))
+                # Порядок зависит только от вопроса: у переводов правильный ответ на том же месте
+                random.Random(f"{seed}:{topic}:{index}").shuffle(order)
+                compiled.append(Question(
+                    text=item["question"],
+                    options=tuple(item["options"][i] for i in order),
+                    correct=order.index(0),
+                ))
+            self._questions[topic] = tuple(compiled)
+
+    def topics(self) -> List[str]:
+        """Темы, для которых есть вопросы"""
+        return list(self._questions)
+
+    def size(self, topic: str) -> int:
+        """Количество вопросов в теме"""
+        return len(self._questions.get(topic, ()))
+
+    def get(self, topic: str, index: int) -> Optional[Question]:
+        """Получить вопрос темы по номеру"""
+        questions = self._questions.get(topic, ())
+        return questions[index] if 0 <= index < len(questions) else None
+
+    def is_correct(self, topic: str, index: int, option: int) -> bool:
+        """Проверить ответ за O(1)"""
+        question = self.get(topic, index)
+        return question is not None and question.correct == option
+
+
+class Leaderboard:
+    """Рейтинг по сумме лучших результатов в каждой теме.
+
+    Отсортированный список (-очки, user_id) поддерживается при каждом
+    изменении, поэтому топ и место пользователя не требуют ORDER BY.
+    """
+
+    def __init__(self):
+        self._best: Dict[Tuple[int, str], int] = {}
+        self._points: Dict[int, int] = {}
+        self._names: Dict[int, str] = {}
+        self._ranking: List[Tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._ranking)
+
+    def record(self, user_id: int, topic: str, score: int, username: Optional[str] = None) -> bool:
+        """Учесть результат теста, True если это новый лучший результат по теме"""
+        if username:
+            self._names[user_id] = username
+        best = self._best.get((user_id, topic), 0)
+        if score <= best and (user_id, topic) in self._best:
+            return False
+        self._best[(user_id, topic)] = score
+
+        old_points = self._points.get(user_id)
+        if old_points is not None:
+            del self._ranking[bisect_left(self._ranking, (-old_points, user_id))]
+        points = (old_points or 0) + score - best
+        self._points[user_id] = points
+        insort(self._ranking, (-points, user_id))
+        return True
+
+    def top(self, limit: int = 10) -> List[Tuple[int, str, int]]:
+        """Первые limit мест: (user_id, имя, очки)"""
+        return [
+            (user_id, self._names.get(user_id, ""), -points)
+            for points, user_id in self._ranking[:limit]
+        ]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Место пользователя (с 1) или None"""
+        points = self._points.get(user_id)
+        if points is None:
+            return None
+        return bisect_left(self._ranking, (-points, user_id)) + 1
+
+
+class ScoreBuffer:
+    """Буфер результатов для пакетной записи в БД"""
+
+    def __init__(self, max_size: int = 100):
+        self.max_size = max_size
+        self._rows: Dict[Tuple[int, str], Tuple[int, str, int, int, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def full(self) -> bool:
+        return len(self._rows) >= self.max_size
+
+    def add(self, user_id: int, topic: str, score: int, total: int, finished_at: str):
+        """Добавить результат, повторный результат по той же теме заменяет лучший"""
+        previous = self._rows.get((user_id, topic))
+        if previous is None or score >= previous[2]:
+            self._rows[(user_id, topic)] = (user_id, topic, score, total, finished_at)
+
+    def extend(self, rows: Iterable[Tuple[int, str, int, int, str]]):
+        """Вернуть строки в буфер, например после неудачной записи"""
+        for row in rows:
+            self.add(*row)
+
+    def drain(self) -> List[Tuple[int, str, int, int, str]]:
+        """Забрать все накопленные строки"""
+        rows = list(self._rows.values())
+        self._rows.clear()
+        return rows
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Виды повторяемых элементов
+PAGE = "p"
+QUIZ = "q"
+
+
+class ReviewItem(NamedTuple):
+    """Элемент интервального повторения"""
+    user_id: int
+    kind: str
+    topic: str
+    item: int
+    ease: float = 2.5
+    interval: int = 0
+    repetitions: int = 0
+    due_at: str = ""
+
+
+def sm2(ease: float, interval: int, repetitions: int, quality: int) -> Tuple[float, int, int]:
+    """Шаг алгоритма SM-2: quality от 0 (забыл) до 5 (идеально помню)"""
+    if quality < 3:
+        repetitions = 0
+        interval = 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = round(interval * ease)
+    ease = max(1.3, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ease, interval, repetitions
+
+
+def review(item: ReviewItem, quality: int, now: Optional[datetime] = None) -> ReviewItem:
+    """Применить оценку к элементу и назначить следующее повторение"""
+    now = now or datetime.now()
+    ease, interval, repetitions = sm2(item.ease, item.interval, item.repetitions, quality)
+    return item._replace(
+        ease=ease,
+        interval=interval,
+        repetitions=repetitions,
+        due_at=(now + timedelta(days=interval)).isoformat(),
+    )
+
+
+class AsyncRateLimiter:
+    """Token bucket: не больше rate операций в секунду с запасом burst"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Дождаться свободного токена"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ReviewScheduler:
+    """Единственная фоновая задача рассылки напоминаний о повторении.
+
+    Просыпается ко времени ближайшего повторения (MIN(due_at) по индексу),
+    забирает пачку наступивших элементов диапазонным запросом, группирует их
+    по пользователям и рассылает через общий rate limiter. Отправленные
+    элементы откладываются на snooze, пока пользователь их не оценит.
+    """
+
+    def __init__(
+            self,
+            db: Any,
+            notify: Callable[[int, List[ReviewItem]], Awaitable[Any]],
+            limiter: AsyncRateLimiter,
+            batch_size: int = 50,
+            max_sleep: float = 300.0,
+            snooze: timedelta = timedelta(hours=12),
+    ):
+        self.db = db
+        self.notify = notify
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self.snooze = snooze
+        self.sent = 0
+        self._wakeup = asyncio.Event()
+        # Когда планировщик проснется сам; None - не спит
+        self._sleep_until: Optional[datetime] = None
+
+    def wake(self):
+        """Пересчитать время сна, например после добавления ранних элементов"""
+        self._wakeup.set()
+
+    def schedule(self, due_at: datetime):
+        """Новый элемент: разбудить, если он наступает раньше, чем планировщик проснется"""
+        if self._sleep_until is not None and due_at < self._sleep_until:
+            self.wake()
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Разослать одну пачку наступивших повторений, вернуть число элементов"""
+        now = now or datetime.now()
+        due = await self.db.due_reviews(now.isoformat(), self.batch_size)
+        if not due:
+            return 0
+
+        by_user: Dict[int, List[ReviewItem]] = {}
+        for item in due:
+            by_user.setdefault(item.user_id, []).append(item)
+
+        for user_id, items in by_user.items():
+            await self.limiter.acquire()
+            try:
+                await self.notify(user_id, items)
+                self.sent += 1
+            except Exception:
+                logging.exception("Не удалось отправить напоминание пользователю %s", user_id)
+
+        await self.db.snooze_reviews(due, (now + self.snooze).isoformat())
+        return len(due)
+
+    async def next_delay(self, now: Optional[datetime] = None) -> float:
+        """Сколько спать до ближайшего повторения"""
+        now = now or datetime.now()
+        next_due = await self.db.next_review_due()
+        if next_due is None:
+            return self.max_sleep
+        delay = (datetime.fromisoformat(next_due) - now).total_seconds()
+        return min(self.max_sleep, max(delay, 0.0))
+
+    async def run(self):
+        """Основной цикл планировщика"""
+        while True:
+            try:
+                if await self.run_once():
+                    continue
+                delay = await self.next_delay()
+            except Exception:
+                logging.exception("Ошибка планировщика повторений")
+                delay = self.max_sleep
+
+            self._wakeup.clear()
+            self._sleep_until = datetime.now() + timedelta(seconds=delay)
+            try:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+            finally:
+                self._sleep_until = None
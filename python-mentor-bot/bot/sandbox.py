@@ -0,0 +1,246 @@
+"""
+Запуск присланного кода в отдельном интерпретаторе.
+
+Каждый запуск - новый процесс python -I во временном каталоге с пустым
+окружением и ограничениями ресурсов (процессорное время, память, размер
+файлов). Если задан jail (bubblewrap), процесс запускается в отдельных
+пространствах имен: без сети, под чужим uid и с файловой системой только
+из системных каталогов на чтение и рабочего каталога. Без jail песочница
+не изолирует код от файлов и сети хоста - такой запуск доверяется только
+администраторам. Вывод читается не больше лимита: процесс, печатающий без
+конца, упирается в заполненный pipe и снимается по таймауту. CodeRunner перед
+запуском прогоняет код через статическую проверку (bot.precheck) и
+считает, сколько запусков она сэкономила.
+"""
+
+import asyncio
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+from bot.precheck import DEFAULT_LIMITS, PrecheckLimits, Rejection, precheck
+
+try:
+    import resource
+except ImportError:  # Windows: остаются только таймаут и лимит вывода
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Статусы запуска
+OK = "ok"
+ERROR = "error"
+TIMEOUT = "timeout"
+REJECTED = "rejected"
+
+SCRIPT_NAME = "main.py"
+_READ_CHUNK = 4096
+
+# Рабочий каталог внутри jail и пользователь nobody
+JAIL_DIR = "/sandbox"
+JAIL_UID = 65534
+# Системные каталоги, без которых не запустится интерпретатор
+JAIL_SYSTEM_DIRS = ("/usr", "/lib", "/lib64", "/lib32", "/bin", "/etc/alternatives")
+
+
+class RunResult(NamedTuple):
+    """Результат запуска кода"""
+    status: str
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    rejection: Optional[Rejection] = None
+    truncated: bool = False
+
+
+async def _read_limited(stream: asyncio.StreamReader, limit: int) -> bytes:
+    """Прочитать поток до EOF или limit + 1 байт, дальше не читать"""
+    data = bytearray()
+    while len(data) <= limit:
+        chunk = await stream.read(_READ_CHUNK)
+        if not chunk:
+            break
+        data += chunk
+    return bytes(data)
+
+
+async def _discard(stream: asyncio.StreamReader):
+    """Дочитать поток завершенного процесса до EOF"""
+    while await stream.read(65536):
+        pass
+
+
+class Sandbox:
+    """Отдельный интерпретатор с ограничениями на каждый запуск"""
+
+    def __init__(
+            self,
+            timeout: float = 5.0,
+            memory_mb: int = 256,
+            output_limit: int = 8192,
+            python: str = sys.executable,
+            jail: Optional[str] = shutil.which("bwrap"),
+    ):
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.output_limit = output_limit
+        self.python = python
+        self.jail = jail
+
+    @property
+    def isolated(self) -> bool:
+        """Запуск отрезан от сети и файлов хоста"""
+        return self.jail is not None
+
+    def command(self, workdir: str) -> List[str]:
+        """Команда запуска скрипта: напрямую или внутри bubblewrap"""
+        if self.jail is None:
+            return [self.python, "-I", "-B", SCRIPT_NAME]
+        # Интерпретатор вне /usr (pyenv, /opt) монтируется своим каталогом,
+        # а не через каталог виртуального окружения с пакетами бота
+        python = Path(self.python).resolve()
+        prefix = str(python.parent.parent)
+        command = [
+            self.jail,
+            "--unshare-all", "--die-with-parent", "--new-session",
+            "--uid", str(JAIL_UID), "--gid", str(JAIL_UID),
+            "--clearenv", "--setenv", "PYTHONIOENCODING", "utf-8",
+        ]
+        for path in dict.fromkeys((*JAIL_SYSTEM_DIRS, prefix)):
+            command += ["--ro-bind-try", path, path]
+        command += [
+            "--proc", "/proc", "--dev", "/dev", "--tmpfs", "/tmp",
+            "--bind", workdir, JAIL_DIR, "--chdir", JAIL_DIR,
+            str(python), "-I", "-B", SCRIPT_NAME,
+        ]
+        return command
+
+    def _limit_resources(self):
+        """Выполняется в дочернем процессе перед запуском интерпретатора"""
+        cpu = int(self.timeout) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+        memory = self.memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (1024 * 1024, 1024 * 1024))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    async def run(self, source: str, stdin: str = "", files: Optional[Mapping[str, str]] = None) -> RunResult:
+        """Выполнить код и вернуть его вывод; files - дополнительные файлы рядом со скриптом"""
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="sandbox-") as workdir:
+            for name, text in (files or {}).items():
+                Path(workdir, name).write_text(text, encoding="utf-8")
+            script = Path(workdir, SCRIPT_NAME)
+            script.write_text(source, encoding="utf-8")
+            shown = str(Path(JAIL_DIR, SCRIPT_NAME)) if self.isolated else str(script)
+            process = await asyncio.create_subprocess_exec(
+                *self.command(workdir),
+                cwd=workdir,
+                env={"PYTHONIOENCODING": "utf-8"},
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                preexec_fn=self._limit_resources if resource is not None else None,
+            )
+
+            async def capture(stream: asyncio.StreamReader) -> bytes:
+                data = await _read_limited(stream, self.output_limit)
+                if len(data) > self.output_limit:
+                    # Остальной вывод не нужен: не ждем, пока процесс упрется в таймаут
+                    with suppress(ProcessLookupError):
+                        process.kill()
+                return data
+
+            async def communicate():
+                if stdin:
+                    process.stdin.write(stdin.encode("utf-8"))
+                    # Код может завершиться, не дочитав ввод
+                    with suppress(BrokenPipeError, ConnectionResetError):
+                        await process.stdin.drain()
+                process.stdin.close()
+                return await asyncio.gather(capture(process.stdout), capture(process.stderr))
+
+            try:
+                stdout, stderr = await asyncio.wait_for(communicate(), self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with suppress(ProcessLookupError):
+                    process.kill()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                stdout = stderr = None
+            # asyncio считает процесс завершенным только после закрытия его
+            # pipe'ов, а чтение заполненного pipe приостановлено - дочитываем
+            await asyncio.gather(_discard(process.stdout), _discard(process.stderr))
+            await process.wait()
+
+        duration = time.perf_counter() - started
+        if stdout is None:
+            return RunResult(TIMEOUT, duration=duration)
+        truncated = len(stdout) > self.output_limit or len(stderr) > self.output_limit
+        return RunResult(
+            # Процесс, снятый из-за объема вывода, показывает обрезанный вывод, а не ошибку
+            OK if process.returncode == 0 or truncated else ERROR,
+            stdout[:self.output_limit].decode("utf-8", "replace"),
+            # В трассировке путь временного каталога ничего не говорит ученику
+            stderr[-self.output_limit:].decode("utf-8", "replace").replace(shown, SCRIPT_NAME),
+            duration,
+            truncated=truncated,
+        )
+
+
+class CodeRunner:
+    """Конвейер: статическая проверка в процессе бота, затем песочница"""
+
+    def __init__(self, sandbox: Sandbox, limits: PrecheckLimits = DEFAULT_LIMITS):
+        self.sandbox = sandbox
+        self.limits = limits
+        self.checked = 0
+        self.rejected: Dict[str, int] = {}
+        self.precheck_time = 0.0
+        self.sandbox_runs = 0
+        self.sandbox_time = 0.0
+
+    def check(self, source: str) -> Optional[Rejection]:
+        """Статическая проверка с учетом в статистике"""
+        started = time.perf_counter()
+        rejection = precheck(source, self.limits)
+        elapsed = time.perf_counter() - started
+        self.checked += 1
+        self.precheck_time += elapsed
+        if rejection is not None:
+            self.rejected[rejection.reason] = self.rejected.get(rejection.reason, 0) + 1
+            logger.info("Код отклонен до песочницы: %s (%.2f мс)", rejection.reason, elapsed * 1000)
+        return rejection
+
+    async def execute(self, source: str, stdin: str = "", files: Optional[Mapping[str, str]] = None) -> RunResult:
+        """Запуск в песочнице с учетом в статистике, без статической проверки"""
+        self.sandbox_runs += 1
+        result = await self.sandbox.run(source, stdin, files)
+        self.sandbox_time += result.duration
+        return result
+
+    async def run(self, source: str, stdin: str = "") -> RunResult:
+        """Проверить код и, если он жизнеспособен, выполнить в песочнице"""
+        rejection = self.check(source)
+        if rejection is not None:
+            return RunResult(REJECTED, rejection=rejection)
+        return await self.execute(source, stdin)
+
+    def stats(self) -> Dict[str, Any]:
+        """Сколько кода отсеяла проверка и сколько времени это заняло"""
+        rejected = sum(self.rejected.values())
+        return {
+            "checked": self.checked,
+            "rejected": rejected,
+            "rejected_by_reason": dict(self.rejected),
+            "precheck_avg": self.precheck_time / self.checked if self.checked else 0.0,
+            "sandbox_runs": self.sandbox_runs,
+            "sandbox_avg": self.sandbox_time / self.sandbox_runs if self.sandbox_runs else 0.0,
+            # Оценка сэкономленного времени песочницы по среднему запуску
+            "saved": rejected * (self.sandbox_time / self.sandbox_runs if self.sandbox_runs else 0.0),
+        }
@@ -0,0 +1,272 @@
+import asyncio
+import heapq
+import inspect
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class IntervalTrigger:
+    """Запуск каждые seconds секунд"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def __str__(self) -> str:
+        return f"every {self.seconds:g}s"
+
+    def next_fire(self, after: datetime) -> datetime:
+        return after + timedelta(seconds=self.seconds)
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """Разобрать поле cron: *, */n, a-b, a-b/n, списки через запятую"""
+    values: Set[int] = set()
+    for part in field.split(","):
+        expr, _, step = part.partition("/")
+        if expr == "*":
+            start, end = low, high
+        elif "-" in expr:
+            start, end = (int(x) for x in expr.split("-", 1))
+        else:
+            start = end = int(expr)
+        if start < low or end > high or start > end:
+            raise ValueError(f"Значение вне диапазона {low}-{high}: {part!r}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronTrigger:
+    """Запуск по cron-выражению из 5 полей: минута час день месяц день_недели"""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Ожидалось 5 полей cron, получено {len(fields)}: {expression!r}")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        # 0 и 7 - воскресенье
+        self.weekdays = {day % 7 for day in _parse_cron_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def __str__(self) -> str:
+        return f"cron {self.expression}"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_fire(self, after: datetime) -> datetime:
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = divmod(moment.month, 12)
+                moment = moment.replace(year=moment.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron-выражение никогда не срабатывает: {self.expression!r}")
+
+
+class Job:
+    """Зарегистрированная периодическая задача"""
+
+    def __init__(
+            self,
+            name: str,
+            func: Callable[[], Any],
+            trigger: Any,
+            timeout: float = 60.0,
+            max_instances: int = 1,
+            jitter: float = 0.0,
+    ):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.timeout = timeout
+        self.max_instances = max_instances
+        self.jitter = jitter
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[datetime] = None
+        self.last_status = ""
+        self.last_duration = 0.0
+        self.running = 0
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+
+    def schedule_after(self, moment: datetime) -> datetime:
+        """Вычислить следующий запуск с учетом jitter"""
+        self.next_run = self.trigger.next_fire(moment)
+        if self.jitter:
+            self.next_run += timedelta(seconds=random.uniform(0, self.jitter))
+        return self.next_run
+
+
+class JobScheduler:
+    """Планировщик задач в том же event loop, что и обработчики.
+
+    Одна задача-цикл спит до ближайшего запуска по куче (next_run, name),
+    а каждая задача запускается отдельным asyncio.Task с таймаутом и
+    ограничением одновременных экземпляров, так что цикл никогда не ждет
+    задачи. Синхронные функции уходят в поток, чтобы не блокировать loop.
+    Состояние задач (следующий и последний запуск) сохраняется в store, и
+    после перезапуска расписание продолжается, а не начинается заново.
+    Задержка пробуждения относительно плана (lag) копится в stats().
+    """
+
+    def __init__(self, store: Any = None):
+        self.store = store
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[datetime, str]] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_avg = 0.0
+
+    def add_job(self, name: str, func: Callable[[], Any], trigger: Any, **options: Any) -> Job:
+        """Зарегистрировать задачу; повторная регистрация заменяет старую"""
+        job = self.jobs[name] = Job(name, func, trigger, **options)
+        if self._loop_task is not None:
+            self._push(job, job.schedule_after(datetime.now()))
+        return job
+
+    def _push(self, job: Job, moment: datetime):
+        heapq.heappush(self._heap, (moment, job.name))
+        self._wakeup.set()
+
+    async def start(self):
+        """Восстановить состояние задач из store и запустить цикл"""
+        states = await self.store.load_job_states() if self.store is not None else {}
+        now = datetime.now()
+        for job in self.jobs.values():
+            state = states.get(job.name)
+            if state and state["next_run"]:
+                job.next_run = datetime.fromisoformat(state["next_run"])
+                job.last_run = datetime.fromisoformat(state["last_run"]) if state["last_run"] else None
+                # Пропущенный во время простоя запуск выполняется сразу, но один раз
+                job.next_run = max(job.next_run, now)
+            else:
+                job.schedule_after(now)
+            heapq.heappush(self._heap, (job.next_run, job.name))
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Остановить цикл и дождаться выполняющихся задач"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+
+    def _record_lag(self, lag: float):
+        self.lag_last = lag
+        self.lag_max = max(self.lag_max, lag)
+        self.lag_avg = lag if not self.lag_avg else self.lag_avg * 0.9 + lag * 0.1
+
+    async def _run(self):
+        while True:
+            now = datetime.now()
+            while self._heap and self._heap[0][0] <= now:
+                moment, name = heapq.heappop(self._heap)
+                job = self.jobs.get(name)
+                if job is None or job.next_run != moment:
+                    continue  # задача заменена или перепланирована
+                self._record_lag((now - moment).total_seconds())
+                self._launch(job)
+                self._push(job, job.schedule_after(now))
+
+            delay = (self._heap[0][0] - now).total_seconds() if self._heap else 3600.0
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(delay, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    def _launch(self, job: Job):
+        if job.running >= job.max_instances:
+            job.skipped += 1
+            logging.warning("Задача %s пропущена: уже выполняется %s экз.", job.name, job.running)
+            return
+        task = asyncio.create_task(self._execute(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job: Job):
+        job.running += 1
+        started = time.perf_counter()
+        job.last_run = datetime.now()
+        try:
+            if inspect.iscoroutinefunction(job.func):
+                await asyncio.wait_for(job.func(), job.timeout)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(job.func), job.timeout)
+            job.last_status = "ok"
+        except asyncio.TimeoutError:
+            job.failures += 1
+            job.last_status = "timeout"
+            logging.error("Задача %s превысила таймаут %ss", job.name, job.timeout)
+        except Exception:
+            job.failures += 1
+            job.last_status = "error"
+            logging.exception("Ошибка в задаче %s", job.name)
+        finally:
+            job.running -= 1
+            job.runs += 1
+            job.last_duration = time.perf_counter() - started
+            await self._save_state(job)
+
+    async def _save_state(self, job: Job):
+        if self.store is None:
+            return
+        try:
+            await self.store.save_job_state(
+                job.name,
+                str(job.trigger),
+                job.next_run.isoformat() if job.next_run else None,
+                job.last_run.isoformat() if job.last_run else None,
+                job.last_status,
+                job.last_duration,
+            )
+        except Exception:
+            logging.exception("Не удалось сохранить состояние задачи %s", job.name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Сводка по задачам и задержке планировщика"""
+        return {
+            "lag_last": self.lag_last,
+            "lag_max": self.lag_max,
+            "lag_avg": self.lag_avg,
+            "jobs": {
+                job.name: {
+                    "trigger": str(job.trigger),
+                    "next_run": job.next_run,
+                    "last_run": job.last_run,
+                    "last_status": job.last_status,
+                    "last_duration": job.last_duration,
+                    "running": job.running,
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "skipped": job.skipped,
+                }
+                for job in self.jobs.values()
+            },
+        }
@@ -0,0 +1,87 @@
+"""
+Поиск по урокам для inline-режима.
+
+Индекс - словарь слово -> {документ: вес}, где слова заголовка весят
+больше слов текста. Последнее слово запроса обычно еще набирается, поэтому
+каждое слово ищется как префикс по отсортированному словарю (bisect),
+а если префикс ничего не нашел - нечетко через difflib. Документ должен
+подходить под все слова запроса; порядок - по сумме весов.
+"""
+
+import difflib
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+TITLE_WEIGHT = 3.0
+TEXT_WEIGHT = 1.0
+# Точное совпадение слова ценнее префикса, префикс - ценнее опечатки
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.5
+FUZZY_CUTOFF = 0.75
+# Короткие слова нечетко не ищем: у них слишком много похожих
+FUZZY_MIN_LENGTH = 3
+MAX_QUERY_WORDS = 8
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def words(text: str) -> List[str]:
+    """Слова текста в нижнем регистре, ё -> е"""
+    return _WORD_RE.findall(text.lower().replace("ё", "е"))
+
+
+def normalize_query(text: str) -> str:
+    """Ключ запроса: регистр, пунктуация и лишние пробелы не важны"""
+    return " ".join(words(text)[:MAX_QUERY_WORDS])
+
+
+class SearchIndex:
+    """Инвертированный индекс документов (заголовок, текст)"""
+
+    def __init__(self, documents: Iterable[Tuple[str, str]]):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.size = 0
+        for document, (title, text) in enumerate(documents):
+            for weight, field in ((TITLE_WEIGHT, title), (TEXT_WEIGHT, text)):
+                for word in set(words(field)):
+                    posting = self.postings.setdefault(word, {})
+                    posting[document] = max(posting.get(document, 0.0), weight)
+            self.size = document + 1
+        self.vocabulary = sorted(self.postings)
+
+    def expand(self, word: str) -> List[Tuple[str, float]]:
+        """Слова индекса, подходящие под слово запроса, и множитель веса"""
+        start = bisect_left(self.vocabulary, word)
+        matches = []
+        for term in self.vocabulary[start:]:
+            if not term.startswith(word):
+                break
+            matches.append((term, 1.0 if term == word else PREFIX_FACTOR))
+        if matches or len(word) < FUZZY_MIN_LENGTH:
+            return matches
+        return [
+            (term, FUZZY_FACTOR)
+            for term in difflib.get_close_matches(word, self.vocabulary, n=3, cutoff=FUZZY_CUTOFF)
+        ]
+
+    def search(self, query: str, limit: int = 50) -> List[int]:
+        """Номера документов по убыванию релевантности; пустой запрос - все по порядку"""
+        query_words = words(query)[:MAX_QUERY_WORDS]
+        if not query_words:
+            return list(range(min(self.size, limit)))
+
+        scores: Dict[int, float] = {}
+        for position, word in enumerate(query_words):
+            best: Dict[int, float] = {}
+            for term, factor in self.expand(word):
+                for document, weight in self.postings[term].items():
+                    best[document] = max(best.get(document, 0.0), weight * factor)
+            if position == 0:
+                scores = best
+            else:
+                scores = {document: score + best[document] for document, score in scores.items() if document in best}
+            if not scores:
+                return []
+
+        return sorted(scores, key=lambda document: (-scores[document], document))[:limit]
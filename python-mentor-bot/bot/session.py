@@ -0,0 +1,85 @@
+"""
+HTTP-сессия Bot API.
+
+Одна сессия aiohttp на бота с настраиваемым пулом соединений: общий
+лимит и лимит на хост, keep-alive между запросами, кэш DNS и таймаут
+запроса. JSON ответов (в том числе обновлений getUpdates и webhook) и
+вложенных полей запросов (клавиатуры, entities) разбирается и
+собирается orjson, если он установлен.
+
+Сессию можно направить на собственный сервер Bot API
+(https://github.com/tdlib/telegram-bot-api): перед переходом с
+api.telegram.org бот должен один раз вызвать logOut.
+"""
+
+import json
+from typing import Any, Callable, Tuple
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+
+JSON_BACKENDS = ("auto", "orjson", "json")
+
+
+def _json_dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def json_codec(backend: str = "auto") -> Tuple[str, Callable[..., Any], Callable[[Any], str]]:
+    """Имя, loads и dumps выбранной библиотеки JSON; auto - orjson, если установлен"""
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f"Неизвестная библиотека JSON: {backend}")
+    if backend != "json":
+        try:
+            import orjson
+        except ImportError:
+            if backend == "orjson":
+                raise
+        else:
+            # aiogram ждет от dumps строку, orjson возвращает bytes
+            return "orjson", orjson.loads, lambda value: orjson.dumps(value).decode()
+    return "json", json.loads, _json_dumps
+
+
+class BotSession(AiohttpSession):
+    """AiohttpSession с настройками пула соединений и быстрым JSON"""
+
+    def __init__(
+            self,
+            api: TelegramAPIServer = PRODUCTION,
+            pool_size: int = 100,
+            pool_per_host: int = 0,
+            keepalive: float = 30.0,
+            dns_cache_ttl: int = 3600,
+            timeout: float = 60.0,
+            json_backend: str = "auto",
+    ):
+        self.json_backend, loads, dumps = json_codec(json_backend)
+        super().__init__(limit=pool_size, api=api, json_loads=loads, json_dumps=dumps, timeout=timeout)
+        # Параметры TCPConnector, который aiogram создает при первом запросе
+        self._connector_init.update(
+            limit_per_host=pool_per_host,
+            keepalive_timeout=keepalive,
+            ttl_dns_cache=dns_cache_ttl,
+        )
+
+    @property
+    def connector_options(self) -> dict:
+        """Параметры пула соединений без SSL-контекста"""
+        return {key: value for key, value in self._connector_init.items() if key != "ssl"}
+
+
+def create_session(config: Any) -> BotSession:
+    """Сессия Bot API по настройкам бота"""
+    api = PRODUCTION
+    if config.bot_api_url:
+        api = TelegramAPIServer.from_base(config.bot_api_url, is_local=config.bot_api_local)
+    return BotSession(
+        api=api,
+        pool_size=config.http_pool_size,
+        pool_per_host=config.http_pool_per_host,
+        keepalive=config.http_keepalive,
+        dns_cache_ttl=config.http_dns_cache_ttl,
+        timeout=config.http_timeout,
+        json_backend=config.json_backend,
+    )
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+
+class ShutdownStep(NamedTuple):
+    """Шаг остановки"""
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    timeout: Optional[float]
+
+
+class GracefulShutdown:
+    """Последовательная остановка с общим дедлайном и отчетом.
+
+    Шаги выполняются строго в порядке добавления: сначала дожидаемся
+    обработчиков, затем останавливаем фоновые задачи, сбрасываем буферы и
+    только в конце закрываем соединения. Каждый шаг получает свой таймаут,
+    но не больше остатка общего дедлайна (и не меньше min_step, чтобы
+    последние шаги хотя бы попытались выполниться). Результаты шагов
+    собираются в отчет, который логируется и возвращается.
+    """
+
+    def __init__(self, deadline: float = 25.0, min_step: float = 1.0):
+        self.deadline = deadline
+        self.min_step = min_step
+        self.steps: List[ShutdownStep] = []
+
+    def add_step(self, name: str, func: Callable[[], Awaitable[Any]], timeout: Optional[float] = None):
+        """Добавить шаг остановки"""
+        self.steps.append(ShutdownStep(name, func, timeout))
+
+    async def run(self) -> Dict[str, Any]:
+        """Выполнить все шаги и вернуть отчет"""
+        started = time.monotonic()
+        report: Dict[str, Any] = {}
+        for step in self.steps:
+            remaining = max(self.deadline - (time.monotonic() - started), self.min_step)
+            timeout = min(step.timeout, remaining) if step.timeout else remaining
+            try:
+                result = await asyncio.wait_for(step.func(), timeout)
+                report[step.name] = "ok" if result is None else result
+            except asyncio.TimeoutError:
+                report[step.name] = "timeout"
+            except Exception as e:
+                logging.exception("Ошибка на шаге остановки %s", step.name)
+                report[step.name] = f"error: {e}"
+
+        report["elapsed"] = round(time.monotonic() - started, 3)
+        logging.info("Остановка завершена: %s", report)
+        return report
@@ -0,0 +1,162 @@
+"""
+Картинки фрагментов кода.
+
+Длинный <pre> на телефоне переносится по строкам и читается плохо, поэтому
+пример кода можно отправить PNG с подсветкой синтаксиса (Pygments +
+Pillow). Картинка рисуется в пуле процессов, чтобы event loop не ждал
+рендеринга, и загружается в Telegram один раз на пару (хэш фрагмента,
+тема): полученный file_id сохраняется в хранилище, и дальше фрагмент
+уходит send_photo по file_id без загрузки файла.
+"""
+
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, InlineKeyboardMarkup, Message
+
+logger = logging.getLogger(__name__)
+
+IMAGE_NAME = "snippet.png"
+
+
+def snippet_hash(code: str) -> str:
+    """Ключ фрагмента кода: sha256 текста без хвостовых пробелов"""
+    return hashlib.sha256(code.strip().encode("utf-8")).hexdigest()
+
+
+def render_snippet(code: str, theme: str = "monokai", font_size: int = 20) -> bytes:
+    """Нарисовать фрагмент кода в PNG. Выполняется в процессе пула"""
+    from pygments import highlight
+    from pygments.formatters import ImageFormatter
+    from pygments.lexers import PythonLexer
+
+    formatter = ImageFormatter(
+        style=theme, font_size=font_size, line_numbers=True, line_number_bg=None, image_pad=24, image_format="png"
+    )
+    return highlight(code.strip(), PythonLexer(), formatter)
+
+
+def renderer_available() -> bool:
+    """Установлены ли Pygments и Pillow и нашелся ли моноширинный шрифт"""
+    try:
+        from pygments.formatters import ImageFormatter
+
+        # Шрифт ищется при создании форматтера (fc-list на Linux)
+        ImageFormatter()
+    except Exception:
+        return False
+    return True
+
+
+class CodeImages:
+    """Рендеринг фрагментов кода в пуле процессов и кэш file_id загруженных картинок"""
+
+    def __init__(self, store: Any = None, theme: str = "monokai", workers: int = 2,
+                 font_size: int = 20, min_lines: int = 15, max_lines: int = 120,
+                 pool: Optional[ProcessPoolExecutor] = None):
+        self.store = store
+        self.theme = theme
+        self.workers = workers
+        self.font_size = font_size
+        self.min_lines = min_lines
+        self.max_lines = max_lines
+        self.enabled = False
+        # Пул, переданный снаружи, общий для нескольких ботов - его закрывает владелец
+        self._pool = pool
+        self._owns_pool = pool is None
+        self._file_ids: Dict[Tuple[str, str], str] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.rendered = 0
+        self.uploaded = 0
+        self.hits = 0
+        self.render_time = 0.0
+
+    def start(self) -> bool:
+        """Включить картинки, если есть рендерер; процессы пула создаются при первом рендеринге"""
+        self.enabled = renderer_available()
+        if not self.enabled:
+            logger.warning("Картинки кода отключены: нет pygments, pillow или моноширинного шрифта")
+        elif self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+            self._owns_pool = True
+        return self.enabled
+
+    def for_store(self, store: Any) -> "CodeImages":
+        """Картинки другого бота: свой кэш file_id и хранилище, общие пул и настройки"""
+        images = CodeImages(
+            store, self.theme, self.workers, self.font_size, self.min_lines, self.max_lines, pool=self._pool
+        )
+        images.enabled = self.enabled
+        return images
+
+    async def stop(self):
+        """Остановить пул; начатый рендеринг дорабатывает в своем процессе"""
+        self.enabled = False
+        if self._pool is not None and self._owns_pool:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    def accepts(self, code: str) -> bool:
+        """Стоит ли отправлять фрагмент картинкой: короткий читается и текстом, слишком длинный Telegram сожмет"""
+        return self.enabled and self.min_lines <= code.strip().count("\n") + 1 <= self.max_lines
+
+    async def file_id(self, code: str) -> Optional[str]:
+        """file_id уже загруженной картинки фрагмента"""
+        key = (snippet_hash(code), self.theme)
+        if key not in self._file_ids and self.store is not None:
+            file_id = await self.store.get_code_image(*key)
+            if file_id:
+                self._file_ids[key] = file_id
+        return self._file_ids.get(key)
+
+    async def render(self, code: str) -> bytes:
+        """Нарисовать картинку в пуле процессов"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        png = await loop.run_in_executor(self._pool, render_snippet, code, self.theme, self.font_size)
+        self.rendered += 1
+        self.render_time += loop.time() - started
+        return png
+
+    async def send(self, bot: Bot, chat_id: int, code: str, caption: Optional[str] = None,
+                   reply_markup: Optional[InlineKeyboardMarkup] = None) -> Message:
+        """Отправить фрагмент картинкой: по file_id, а если его нет - отрисовать и загрузить"""
+        key = (snippet_hash(code), self.theme)
+        # Одновременные запросы одного фрагмента ждут первую загрузку, а не рисуют его заново
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            file_id = await self.file_id(code)
+            if file_id:
+                try:
+                    message = await bot.send_photo(chat_id, file_id, caption=caption, reply_markup=reply_markup)
+                    self.hits += 1
+                    return message
+                except TelegramBadRequest as e:
+                    # file_id чужого бота или удаленный файл - загружаем заново
+                    logger.warning("file_id картинки кода %s недействителен: %s", key[0][:12], e.message)
+                    del self._file_ids[key]
+
+            png = await self.render(code)
+            message = await bot.send_photo(
+                chat_id, BufferedInputFile(png, IMAGE_NAME), caption=caption, reply_markup=reply_markup
+            )
+            self.uploaded += 1
+            self._file_ids[key] = message.photo[-1].file_id
+            if self.store is not None:
+                await self.store.save_code_image(*key, self._file_ids[key])
+            return message
+
+    def stats(self) -> Dict[str, Any]:
+        """Сколько картинок нарисовано, загружено и отправлено по file_id"""
+        return {
+            "enabled": self.enabled,
+            "rendered": self.rendered,
+            "uploaded": self.uploaded,
+            "hits": self.hits,
+            "cached": len(self._file_ids),
+            "render_avg": self.render_time / self.rendered if self.rendered else 0.0,
+        }
@@ -0,0 +1,22 @@
+from bot.storage.base import TABLE_COLUMNS, TABLE_KEYS, CommandLogRow, QuizScoreRow, Repository
+from bot.storage.postgres import PostgresRepository
+from bot.storage.sqlite import SQLiteRepository
+
+
+def create_repository(config) -> Repository:
+    """Выбрать хранилище по настройкам: PostgreSQL при заданном DATABASE_URL, иначе SQLite"""
+    if config.database_url:
+        return PostgresRepository(config.database_url, config.db_pool_size)
+    return SQLiteRepository(config.database_path)
+
+
+__all__ = [
+    "CommandLogRow",
+    "PostgresRepository",
+    "QuizScoreRow",
+    "Repository",
+    "SQLiteRepository",
+    "TABLE_COLUMNS",
+    "TABLE_KEYS",
+    "create_repository",
+]
@@ -0,0 +1,153 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from bot.models import UserProgress
+from bot.review import ReviewItem
+
+# Строки пакетной записи
+QuizScoreRow = Tuple[int, str, int, int, str]  # user_id, topic, score, total, finished_at
+CommandLogRow = Tuple[int, str, str]  # user_id, command, used_at
+
+# Переносимые таблицы: столбцы с типами (в порядке выгрузки) и ключ
+# keyset-пагинации. Пользователи идут первыми, чтобы при загрузке
+# остальные строки ссылались на уже существующих пользователей.
+TABLE_COLUMNS: Dict[str, Dict[str, type]] = {
+    "users": {
+        "user_id": int, "username": str, "current_topic": str, "current_page": int, "created_at": str,
+        "language": str,
+    },
+    "quiz_scores": {"user_id": int, "topic": str, "score": int, "total": int, "finished_at": str},
+    "exercise_scores": {"user_id": int, "topic": str, "page": int, "passed": int, "total": int, "graded_at": str},
+    "review_items": {
+        "user_id": int, "kind": str, "topic": str, "item": int,
+        "ease": float, "interval": int, "repetitions": int, "due_at": str,
+    },
+    "user_questions": {"id": int, "user_id": int, "question": str, "answer": str, "created_at": str},
+    "command_logs": {"id": int, "user_id": int, "command": str, "used_at": str},
+}
+TABLE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "users": ("user_id",),
+    "quiz_scores": ("user_id", "topic"),
+    "exercise_scores": ("user_id", "topic", "page"),
+    "review_items": ("user_id", "kind", "topic", "item"),
+    "user_questions": ("id",),
+    "command_logs": ("id",),
+}
+
+
+class Repository(ABC):
+    """Хранилище бота: пользователи, вопросы, прогресс и журнал команд.
+
+    Время хранится строками ISO 8601 во всех реализациях, поэтому сравнение
+    due_at и сортировка одинаковы в SQLite и PostgreSQL. Строки выборок
+    поддерживают доступ по имени столбца (row["user_id"]).
+    """
+
+    @abstractmethod
+    async def init_db(self):
+        """Подключиться и создать схему"""
+
+    async def close(self):
+        """Освободить соединения"""
+
+    # ---------- Пользователи ----------
+    @abstractmethod
+    async def get_user(self, user_id: int) -> Optional[UserProgress]:
+        """Получить пользователя"""
+
+    @abstractmethod
+    async def save_user(self, user: UserProgress):
+        """Сохранить пользователя"""
+
+    @abstractmethod
+    async def save_users(self, users: Sequence[UserProgress]):
+        """Сохранить пачку пользователей одной транзакцией"""
+
+    # ---------- Вопросы и журнал ----------
+    @abstractmethod
+    async def save_question(self, user_id: int, question: str, answer: str = ""):
+        """Сохранить вопрос пользователя"""
+
+    @abstractmethod
+    async def save_command_logs(self, rows: Sequence[CommandLogRow]):
+        """Записать пачку строк журнала команд"""
+
+    # ---------- Прогресс ----------
+    @abstractmethod
+    async def save_quiz_scores(self, rows: Sequence[QuizScoreRow]):
+        """Сохранить пачку результатов тестов, оставляя лучший по теме"""
+
+    @abstractmethod
+    async def load_quiz_scores(self) -> List[Mapping[str, Any]]:
+        """Загрузить лучшие результаты тестов вместе с именами пользователей"""
+
+    @abstractmethod
+    async def save_exercise_score(self, user_id: int, topic: str, page: int, passed: int, total: int, graded_at: str):
+        """Сохранить результат задания, оставляя лучший"""
+
+    @abstractmethod
+    async def load_exercise_scores(self, user_id: int) -> List[Mapping[str, Any]]:
+        """Лучшие результаты заданий пользователя"""
+
+    @abstractmethod
+    async def add_review_item(self, item: ReviewItem) -> bool:
+        """Поставить элемент на повторение, если его еще нет; True - добавлен"""
+
+    @abstractmethod
+    async def get_review_item(self, user_id: int, kind: str, topic: str, item: int) -> Optional[ReviewItem]:
+        """Получить элемент повторения"""
+
+    @abstractmethod
+    async def save_review_item(self, item: ReviewItem):
+        """Сохранить элемент повторения после оценки"""
+
+    @abstractmethod
+    async def next_review_due(self) -> Optional[str]:
+        """Время ближайшего повторения"""
+
+    @abstractmethod
+    async def due_reviews(self, now: str, limit: int) -> List[ReviewItem]:
+        """Наступившие повторения в порядке due_at"""
+
+    @abstractmethod
+    async def snooze_reviews(self, items: List[ReviewItem], until: str):
+        """Отложить напоминания об уже отправленных повторениях"""
+
+    # ---------- Фоновые задачи ----------
+    @abstractmethod
+    async def load_job_states(self) -> Dict[str, Mapping[str, Any]]:
+        """Загрузить сохраненное состояние фоновых задач"""
+
+    @abstractmethod
+    async def save_job_state(
+            self,
+            name: str,
+            trigger: str,
+            next_run: Optional[str],
+            last_run: Optional[str],
+            last_status: str,
+            last_duration: float,
+    ):
+        """Сохранить состояние фоновой задачи"""
+
+    @abstractmethod
+    async def optimize(self, vacuum: bool = False):
+        """Обслуживание: обновить статистику планировщика и при необходимости сжать данные"""
+
+    # ---------- Картинки кода ----------
+    @abstractmethod
+    async def get_code_image(self, snippet_hash: str, theme: str) -> Optional[str]:
+        """file_id загруженной в Telegram картинки фрагмента кода"""
+
+    @abstractmethod
+    async def save_code_image(self, snippet_hash: str, theme: str, file_id: str):
+        """Запомнить file_id картинки фрагмента кода"""
+
+    # ---------- Перенос данных ----------
+    @abstractmethod
+    def iter_rows(self, table: str, batch_size: int = 1000) -> AsyncIterator[List[Tuple]]:
+        """Выгрузить таблицу пачками по ключу (keyset), не держа ее в памяти"""
+
+    @abstractmethod
+    async def write_rows(self, table: str, rows: Sequence[Tuple]):
+        """Записать пачку строк одной транзакцией, существующие ключи перезаписываются"""
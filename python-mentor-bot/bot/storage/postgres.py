@@ -0,0 +1,363 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from bot.models import UserProgress
+from bot.review import ReviewItem
+from bot.storage.base import TABLE_COLUMNS, TABLE_KEYS, CommandLogRow, QuizScoreRow, Repository
+
+def _quote(columns) -> str:
+    """Список столбцов в кавычках для INSERT/SELECT по TABLE_COLUMNS"""
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+# Схема повторяет SQLite-версию. Внешние ключи не объявлены: SQLite их не
+# проверяет, и результаты теста могут прийти раньше строки пользователя.
+# "interval" - ключевое слово PostgreSQL, поэтому столбец в кавычках
+REVIEW_COLUMNS = 'user_id, kind, topic, item, ease, "interval", repetitions, due_at'
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id BIGINT PRIMARY KEY,
+        username TEXT,
+        current_topic TEXT,
+        current_page INTEGER DEFAULT 0,
+        created_at TEXT,
+        language TEXT
+    )
+    """,
+    # Базы, созданные до появления языка интерфейса
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS language TEXT",
+    """
+    CREATE TABLE IF NOT EXISTS user_questions (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT,
+        question TEXT,
+        answer TEXT,
+        created_at TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS command_logs (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT,
+        command TEXT,
+        used_at TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_scores (
+        user_id BIGINT,
+        topic TEXT,
+        score INTEGER,
+        total INTEGER,
+        finished_at TEXT,
+        PRIMARY KEY (user_id, topic)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS exercise_scores (
+        user_id BIGINT,
+        topic TEXT,
+        page INTEGER,
+        passed INTEGER,
+        total INTEGER,
+        graded_at TEXT,
+        PRIMARY KEY (user_id, topic, page)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS review_items (
+        user_id BIGINT,
+        kind TEXT,
+        topic TEXT,
+        item INTEGER,
+        ease DOUBLE PRECISION DEFAULT 2.5,
+        "interval" INTEGER DEFAULT 0,
+        repetitions INTEGER DEFAULT 0,
+        due_at TEXT,
+        PRIMARY KEY (user_id, kind, topic, item)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_review_due ON review_items (due_at)",
+    """
+    CREATE TABLE IF NOT EXISTS scheduled_jobs (
+        name TEXT PRIMARY KEY,
+        trigger TEXT,
+        next_run TEXT,
+        last_run TEXT,
+        last_status TEXT,
+        last_duration DOUBLE PRECISION
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS code_images (
+        snippet_hash TEXT,
+        theme TEXT,
+        file_id TEXT,
+        PRIMARY KEY (snippet_hash, theme)
+    )
+    """,
+]
+
+
+class PostgresRepository(Repository):
+    """Хранилище в PostgreSQL через пул соединений asyncpg.
+
+    Несколько экземпляров бота могут писать в одну базу. asyncpg
+    подготавливает каждый запрос один раз на соединение и дальше
+    выполняет его по кэшу, а пакетные вставки идут через COPY: журнал
+    команд - прямо в таблицу, результаты тестов - через временную
+    таблицу и один INSERT ... ON CONFLICT.
+    """
+
+    def __init__(self, dsn: str, pool_size: int = 4):
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self._pool = None
+
+    async def init_db(self):
+        """Создать пул соединений и схему"""
+        import asyncpg
+
+        if self._pool is None:
+            self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size)
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                for statement in SCHEMA:
+                    await conn.execute(statement)
+
+    async def close(self):
+        """Закрыть пул соединений"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def get_user(self, user_id: int) -> Optional[UserProgress]:
+        """Получить пользователя"""
+        row = await self._pool.fetchrow("SELECT * FROM users WHERE user_id = $1", user_id)
+        if row is None:
+            return None
+        return UserProgress(
+            user_id=row["user_id"],
+            username=row["username"],
+            current_topic=row["current_topic"],
+            current_page=row["current_page"],
+            created_at=row["created_at"],
+            language=row["language"],
+        )
+
+    async def save_user(self, user: UserProgress):
+        """Сохранить пользователя"""
+        await self.save_users([user])
+
+    async def save_users(self, users: Sequence[UserProgress]):
+        """Сохранить пачку пользователей одной транзакцией"""
+        await self._pool.executemany("""
+            INSERT INTO users (user_id, username, current_topic, current_page, created_at, language)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (user_id) DO UPDATE SET
+                username = excluded.username,
+                current_topic = excluded.current_topic,
+                current_page = excluded.current_page,
+                created_at = excluded.created_at,
+                language = excluded.language
+        """, [
+            (user.user_id, user.username, user.current_topic, user.current_page, user.created_at.isoformat(),
+             user.language)
+            for user in users
+        ])
+
+    async def save_question(self, user_id: int, question: str, answer: str = ""):
+        """Сохранить вопрос пользователя"""
+        await self._pool.execute("""
+            INSERT INTO user_questions (user_id, question, answer, created_at)
+            VALUES ($1, $2, $3, $4)
+        """, user_id, question, answer, datetime.now().isoformat())
+
+    async def save_command_logs(self, rows: Sequence[CommandLogRow]):
+        """Записать пачку строк журнала команд одним COPY"""
+        if not rows:
+            return
+        async with self._pool.acquire() as conn:
+            await conn.copy_records_to_table(
+                "command_logs", records=rows, columns=["user_id", "command", "used_at"]
+            )
+
+    async def save_quiz_scores(self, rows: Sequence[QuizScoreRow]):
+        """Сохранить пачку результатов: COPY во временную таблицу и один upsert"""
+        if not rows:
+            return
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS quiz_scores_stage
+                    (LIKE quiz_scores) ON COMMIT DELETE ROWS
+                """)
+                await conn.copy_records_to_table("quiz_scores_stage", records=rows)
+                await conn.execute("""
+                    INSERT INTO quiz_scores (user_id, topic, score, total, finished_at)
+                    SELECT DISTINCT ON (user_id, topic) user_id, topic, score, total, finished_at
+                    FROM quiz_scores_stage ORDER BY user_id, topic, score DESC
+                    ON CONFLICT (user_id, topic) DO UPDATE SET
+                        score = excluded.score,
+                        total = excluded.total,
+                        finished_at = excluded.finished_at
+                    WHERE excluded.score > quiz_scores.score
+                """)
+
+    async def load_quiz_scores(self) -> List[Mapping[str, Any]]:
+        """Загрузить лучшие результаты тестов вместе с именами пользователей"""
+        return await self._pool.fetch("""
+            SELECT s.user_id, s.topic, s.score, u.username
+            FROM quiz_scores s LEFT JOIN users u ON u.user_id = s.user_id
+        """)
+
+    async def save_exercise_score(self, user_id: int, topic: str, page: int, passed: int, total: int, graded_at: str):
+        """Сохранить результат задания, оставляя лучший"""
+        await self._pool.execute("""
+            INSERT INTO exercise_scores (user_id, topic, page, passed, total, graded_at)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (user_id, topic, page) DO UPDATE SET
+                passed = excluded.passed,
+                total = excluded.total,
+                graded_at = excluded.graded_at
+            WHERE excluded.passed > exercise_scores.passed
+        """, user_id, topic, page, passed, total, graded_at)
+
+    async def load_exercise_scores(self, user_id: int) -> List[Mapping[str, Any]]:
+        """Лучшие результаты заданий пользователя"""
+        return await self._pool.fetch("""
+            SELECT topic, page, passed, total, graded_at
+            FROM exercise_scores WHERE user_id = $1 ORDER BY topic, page
+        """, user_id)
+
+    async def add_review_item(self, item: ReviewItem) -> bool:
+        """Поставить элемент на повторение, если его еще нет; True - добавлен"""
+        status = await self._pool.execute(f"""
+            INSERT INTO review_items ({REVIEW_COLUMNS})
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ON CONFLICT DO NOTHING
+        """, *item)
+        # Статус команды: INSERT 0 <число строк>
+        return status.endswith(" 1")
+
+    async def get_review_item(self, user_id: int, kind: str, topic: str, item: int) -> Optional[ReviewItem]:
+        """Получить элемент повторения"""
+        row = await self._pool.fetchrow(f"""
+            SELECT {REVIEW_COLUMNS} FROM review_items
+            WHERE user_id = $1 AND kind = $2 AND topic = $3 AND item = $4
+        """, user_id, kind, topic, item)
+        return ReviewItem(*row) if row else None
+
+    async def save_review_item(self, item: ReviewItem):
+        """Сохранить элемент повторения после оценки"""
+        await self._pool.execute(f"""
+            INSERT INTO review_items ({REVIEW_COLUMNS})
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ON CONFLICT (user_id, kind, topic, item) DO UPDATE SET
+                ease = excluded.ease,
+                "interval" = excluded."interval",
+                repetitions = excluded.repetitions,
+                due_at = excluded.due_at
+        """, *item)
+
+    async def next_review_due(self) -> Optional[str]:
+        """Время ближайшего повторения"""
+        return await self._pool.fetchval("SELECT MIN(due_at) FROM review_items")
+
+    async def due_reviews(self, now: str, limit: int) -> List[ReviewItem]:
+        """Наступившие повторения в порядке due_at"""
+        rows = await self._pool.fetch(f"""
+            SELECT {REVIEW_COLUMNS} FROM review_items
+            WHERE due_at <= $1 ORDER BY due_at LIMIT $2
+        """, now, limit)
+        return [ReviewItem(*row) for row in rows]
+
+    async def snooze_reviews(self, items: List[ReviewItem], until: str):
+        """Отложить напоминания об уже отправленных повторениях"""
+        await self._pool.executemany("""
+            UPDATE review_items SET due_at = $1
+            WHERE user_id = $2 AND kind = $3 AND topic = $4 AND item = $5
+        """, [(until, item.user_id, item.kind, item.topic, item.item) for item in items])
+
+    async def load_job_states(self) -> Dict[str, Mapping[str, Any]]:
+        """Загрузить сохраненное состояние фоновых задач"""
+        return {row["name"]: row for row in await self._pool.fetch("SELECT * FROM scheduled_jobs")}
+
+    async def save_job_state(
+            self,
+            name: str,
+            trigger: str,
+            next_run: Optional[str],
+            last_run: Optional[str],
+            last_status: str,
+            last_duration: float,
+    ):
+        """Сохранить состояние фоновой задачи"""
+        await self._pool.execute("""
+            INSERT INTO scheduled_jobs (name, trigger, next_run, last_run, last_status, last_duration)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (name) DO UPDATE SET
+                trigger = excluded.trigger,
+                next_run = excluded.next_run,
+                last_run = excluded.last_run,
+                last_status = excluded.last_status,
+                last_duration = excluded.last_duration
+        """, name, trigger, next_run, last_run, last_status, last_duration)
+
+    async def get_code_image(self, snippet_hash: str, theme: str) -> Optional[str]:
+        """file_id загруженной в Telegram картинки фрагмента кода"""
+        return await self._pool.fetchval(
+            "SELECT file_id FROM code_images WHERE snippet_hash = $1 AND theme = $2", snippet_hash, theme
+        )
+
+    async def save_code_image(self, snippet_hash: str, theme: str, file_id: str):
+        """Запомнить file_id картинки фрагмента кода"""
+        await self._pool.execute("""
+            INSERT INTO code_images (snippet_hash, theme, file_id) VALUES ($1, $2, $3)
+            ON CONFLICT (snippet_hash, theme) DO UPDATE SET file_id = excluded.file_id
+        """, snippet_hash, theme, file_id)
+
+    async def iter_rows(self, table: str, batch_size: int = 1000) -> AsyncIterator[List[Tuple]]:
+        """Выгрузить таблицу пачками по ключу (keyset), не держа ее в памяти"""
+        columns, keys = _quote(TABLE_COLUMNS[table]), _quote(TABLE_KEYS[table])
+        count = len(TABLE_KEYS[table])
+        marks = ", ".join(f"${i}" for i in range(1, count + 1))
+        positions = [list(TABLE_COLUMNS[table]).index(key) for key in TABLE_KEYS[table]]
+
+        async with self._pool.acquire() as conn:
+            first = await conn.prepare(f"SELECT {columns} FROM {table} ORDER BY {keys} LIMIT $1")
+            after = await conn.prepare(
+                f"SELECT {columns} FROM {table} WHERE ({keys}) > ({marks}) ORDER BY {keys} LIMIT ${count + 1}"
+            )
+            last = None
+            while True:
+                records = await (first.fetch(batch_size) if last is None else after.fetch(*last, batch_size))
+                if not records:
+                    return
+                rows = [tuple(record) for record in records]
+                yield rows
+                last = tuple(rows[-1][i] for i in positions)
+
+    async def write_rows(self, table: str, rows: Sequence[Tuple]):
+        """Записать пачку строк одной транзакцией, существующие ключи перезаписываются"""
+        columns, keys = list(TABLE_COLUMNS[table]), TABLE_KEYS[table]
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in columns if c not in keys)
+        query = f"""
+            INSERT INTO {table} ({_quote(columns)})
+            VALUES ({", ".join(f"${i}" for i in range(1, len(columns) + 1))})
+            ON CONFLICT ({_quote(keys)}) DO UPDATE SET {updates}
+        """
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(query, rows)
+                if keys == ("id",):
+                    # Явные id не двигают последовательность BIGSERIAL
+                    await conn.execute(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), MAX(id)) FROM {table}"
+                    )
+
+    async def optimize(self, vacuum: bool = False):
+        """Обслуживание БД: обновить статистику и при необходимости убрать мертвые строки"""
+        await self._pool.execute("VACUUM ANALYZE" if vacuum else "ANALYZE")
@@ -0,0 +1,365 @@
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from bot.models import UserProgress
+from bot.review import ReviewItem
+from bot.storage.base import TABLE_COLUMNS, TABLE_KEYS, CommandLogRow, QuizScoreRow, Repository
+
+
+class SQLiteRepository(Repository):
+    """Хранилище в одном файле SQLite через aiosqlite"""
+
+    def __init__(self, db_path: str = "python_mentor.db"):
+        # Файловая система не трогается до init_db, чтобы импорт модуля был дешевым
+        self.path = Path(db_path)
+
+    @asynccontextmanager
+    async def get_connection(self):
+        """Контекстный менеджер для соединения с БД"""
+        import aiosqlite
+
+        async with aiosqlite.connect(self.path) as db:
+            db.row_factory = aiosqlite.Row
+            yield db
+
+    async def init_db(self):
+        """Инициализация базы данных"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        async with self.get_connection() as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INTEGER PRIMARY KEY,
+                    username TEXT,
+                    current_topic TEXT,
+                    current_page INTEGER DEFAULT 0,
+                    created_at TEXT,
+                    language TEXT
+                )
+            """)
+            # Базы, созданные до появления языка интерфейса, дополняем столбцом
+            async with db.execute("PRAGMA table_info(users)") as cursor:
+                columns = {row["name"] async for row in cursor}
+            if "language" not in columns:
+                await db.execute("ALTER TABLE users ADD COLUMN language TEXT")
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS user_questions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    question TEXT,
+                    answer TEXT,
+                    created_at TEXT,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS command_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    command TEXT,
+                    used_at TEXT
+                )
+            """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_scores (
+                    user_id INTEGER,
+                    topic TEXT,
+                    score INTEGER,
+                    total INTEGER,
+                    finished_at TEXT,
+                    PRIMARY KEY (user_id, topic),
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS exercise_scores (
+                    user_id INTEGER,
+                    topic TEXT,
+                    page INTEGER,
+                    passed INTEGER,
+                    total INTEGER,
+                    graded_at TEXT,
+                    PRIMARY KEY (user_id, topic, page),
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS review_items (
+                    user_id INTEGER,
+                    kind TEXT,
+                    topic TEXT,
+                    item INTEGER,
+                    ease REAL DEFAULT 2.5,
+                    interval INTEGER DEFAULT 0,
+                    repetitions INTEGER DEFAULT 0,
+                    due_at TEXT,
+                    PRIMARY KEY (user_id, kind, topic, item),
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            """)
+            # Индекс по времени повторения: "что пора повторить" - диапазонный запрос
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_review_due ON review_items (due_at)")
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                    name TEXT PRIMARY KEY,
+                    trigger TEXT,
+                    next_run TEXT,
+                    last_run TEXT,
+                    last_status TEXT,
+                    last_duration REAL
+                )
+            """)
+            # file_id привязан к токену бота, поэтому таблица не переносится
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS code_images (
+                    snippet_hash TEXT,
+                    theme TEXT,
+                    file_id TEXT,
+                    PRIMARY KEY (snippet_hash, theme)
+                )
+            """)
+            await db.commit()
+
+    async def get_user(self, user_id: int) -> Optional[UserProgress]:
+        """Получить пользователя"""
+        async with self.get_connection() as db:
+            async with db.execute(
+                    "SELECT * FROM users WHERE user_id = ?", (user_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                if row:
+                    return UserProgress(
+                        user_id=row["user_id"],
+                        username=row["username"],
+                        current_topic=row["current_topic"],
+                        current_page=row["current_page"],
+                        created_at=datetime.fromisoformat(row["created_at"]),
+                        language=row["language"],
+                    )
+        return None
+
+    async def save_user(self, user: UserProgress):
+        """Сохранить пользователя"""
+        await self.save_users([user])
+
+    async def save_users(self, users: Sequence[UserProgress]):
+        """Сохранить пачку пользователей одной транзакцией"""
+        async with self.get_connection() as db:
+            await db.executemany("""
+                INSERT OR REPLACE INTO users 
+                (user_id, username, current_topic, current_page, created_at, language)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    user.user_id,
+                    user.username,
+                    user.current_topic,
+                    user.current_page,
+                    user.created_at.isoformat(),
+                    user.language,
+                )
+                for user in users
+            ])
+            await db.commit()
+
+    async def save_question(self, user_id: int, question: str, answer: str = ""):
+        """Сохранить вопрос пользователя"""
+        async with self.get_connection() as db:
+            await db.execute("""
+                INSERT INTO user_questions (user_id, question, answer, created_at)
+                VALUES (?, ?, ?, ?)
+            """, (
+                user_id,
+                question,
+                answer,
+                datetime.now().isoformat()
+            ))
+            await db.commit()
+
+    async def save_command_logs(self, rows: Sequence[CommandLogRow]):
+        """Записать пачку строк журнала команд"""
+        async with self.get_connection() as db:
+            await db.executemany(
+                "INSERT INTO command_logs (user_id, command, used_at) VALUES (?, ?, ?)", rows
+            )
+            await db.commit()
+
+    async def save_quiz_scores(self, rows: Sequence[QuizScoreRow]):
+        """Сохранить пачку результатов тестов, оставляя лучший по теме"""
+        async with self.get_connection() as db:
+            await db.executemany("""
+                INSERT INTO quiz_scores (user_id, topic, score, total, finished_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, topic) DO UPDATE SET
+                    score = excluded.score,
+                    total = excluded.total,
+                    finished_at = excluded.finished_at
+                WHERE excluded.score > quiz_scores.score
+            """, rows)
+            await db.commit()
+
+    async def save_exercise_score(self, user_id: int, topic: str, page: int, passed: int, total: int, graded_at: str):
+        """Сохранить результат задания, оставляя лучший"""
+        async with self.get_connection() as db:
+            await db.execute("""
+                INSERT INTO exercise_scores (user_id, topic, page, passed, total, graded_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, topic, page) DO UPDATE SET
+                    passed = excluded.passed,
+                    total = excluded.total,
+                    graded_at = excluded.graded_at
+                WHERE excluded.passed > exercise_scores.passed
+            """, (user_id, topic, page, passed, total, graded_at))
+            await db.commit()
+
+    async def load_exercise_scores(self, user_id: int) -> List[Mapping[str, Any]]:
+        """Лучшие результаты заданий пользователя"""
+        async with self.get_connection() as db:
+            async with db.execute("""
+                SELECT topic, page, passed, total, graded_at
+                FROM exercise_scores WHERE user_id = ? ORDER BY topic, page
+            """, (user_id,)) as cursor:
+                return await cursor.fetchall()
+
+    async def add_review_item(self, item: ReviewItem) -> bool:
+        """Поставить элемент на повторение, если его еще нет; True - добавлен"""
+        async with self.get_connection() as db:
+            cursor = await db.execute("""
+                INSERT OR IGNORE INTO review_items
+                (user_id, kind, topic, item, ease, interval, repetitions, due_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, item)
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def get_review_item(self, user_id: int, kind: str, topic: str, item: int) -> Optional[ReviewItem]:
+        """Получить элемент повторения"""
+        async with self.get_connection() as db:
+            async with db.execute("""
+                SELECT user_id, kind, topic, item, ease, interval, repetitions, due_at
+                FROM review_items WHERE user_id = ? AND kind = ? AND topic = ? AND item = ?
+            """, (user_id, kind, topic, item)) as cursor:
+                row = await cursor.fetchone()
+                return ReviewItem(*row) if row else None
+
+    async def save_review_item(self, item: ReviewItem):
+        """Сохранить элемент повторения после оценки"""
+        async with self.get_connection() as db:
+            await db.execute("""
+                INSERT OR REPLACE INTO review_items
+                (user_id, kind, topic, item, ease, interval, repetitions, due_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, item)
+            await db.commit()
+
+    async def next_review_due(self) -> Optional[str]:
+        """Время ближайшего повторения"""
+        async with self.get_connection() as db:
+            async with db.execute("SELECT MIN(due_at) FROM review_items") as cursor:
+                return (await cursor.fetchone())[0]
+
+    async def due_reviews(self, now: str, limit: int) -> List[ReviewItem]:
+        """Наступившие повторения в порядке due_at"""
+        async with self.get_connection() as db:
+            async with db.execute("""
+                SELECT user_id, kind, topic, item, ease, interval, repetitions, due_at
+                FROM review_items WHERE due_at <= ? ORDER BY due_at LIMIT ?
+            """, (now, limit)) as cursor:
+                return [ReviewItem(*row) for row in await cursor.fetchall()]
+
+    async def snooze_reviews(self, items: List[ReviewItem], until: str):
+        """Отложить напоминания об уже отправленных повторениях"""
+        async with self.get_connection() as db:
+            await db.executemany("""
+                UPDATE review_items SET due_at = ?
+                WHERE user_id = ? AND kind = ? AND topic = ? AND item = ?
+            """, [(until, item.user_id, item.kind, item.topic, item.item) for item in items])
+            await db.commit()
+
+    async def load_job_states(self) -> Dict[str, Mapping[str, Any]]:
+        """Загрузить сохраненное состояние фоновых задач"""
+        async with self.get_connection() as db:
+            async with db.execute("SELECT * FROM scheduled_jobs") as cursor:
+                return {row["name"]: row for row in await cursor.fetchall()}
+
+    async def save_job_state(
+            self,
+            name: str,
+            trigger: str,
+            next_run: Optional[str],
+            last_run: Optional[str],
+            last_status: str,
+            last_duration: float,
+    ):
+        """Сохранить состояние фоновой задачи"""
+        async with self.get_connection() as db:
+            await db.execute("""
+                INSERT OR REPLACE INTO scheduled_jobs
+                (name, trigger, next_run, last_run, last_status, last_duration)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (name, trigger, next_run, last_run, last_status, last_duration))
+            await db.commit()
+
+    async def get_code_image(self, snippet_hash: str, theme: str) -> Optional[str]:
+        """file_id загруженной в Telegram картинки фрагмента кода"""
+        async with self.get_connection() as db:
+            async with db.execute(
+                "SELECT file_id FROM code_images WHERE snippet_hash = ? AND theme = ?", (snippet_hash, theme)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return row["file_id"] if row else None
+
+    async def save_code_image(self, snippet_hash: str, theme: str, file_id: str):
+        """Запомнить file_id картинки фрагмента кода"""
+        async with self.get_connection() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO code_images (snippet_hash, theme, file_id) VALUES (?, ?, ?)",
+                (snippet_hash, theme, file_id)
+            )
+            await db.commit()
+
+    async def iter_rows(self, table: str, batch_size: int = 1000) -> AsyncIterator[List[Tuple]]:
+        """Выгрузить таблицу пачками по ключу (keyset), не держа ее в памяти"""
+        columns, keys = ", ".join(TABLE_COLUMNS[table]), ", ".join(TABLE_KEYS[table])
+        marks = ", ".join("?" * len(TABLE_KEYS[table]))
+        first = f"SELECT {columns} FROM {table} ORDER BY {keys} LIMIT ?"
+        after = f"SELECT {columns} FROM {table} WHERE ({keys}) > ({marks}) ORDER BY {keys} LIMIT ?"
+        positions = [list(TABLE_COLUMNS[table]).index(key) for key in TABLE_KEYS[table]]
+
+        last = None
+        async with self.get_connection() as db:
+            while True:
+                query, params = (first, (batch_size,)) if last is None else (after, (*last, batch_size))
+                async with db.execute(query, params) as cursor:
+                    rows = [tuple(row) for row in await cursor.fetchall()]
+                if not rows:
+                    return
+                yield rows
+                last = tuple(rows[-1][i] for i in positions)
+
+    async def write_rows(self, table: str, rows: Sequence[Tuple]):
+        """Записать пачку строк одной транзакцией, существующие ключи перезаписываются"""
+        columns = TABLE_COLUMNS[table]
+        async with self.get_connection() as db:
+            await db.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows,
+            )
+            await db.commit()
+
+    async def optimize(self, vacuum: bool = False):
+        """Обслуживание БД: обновить статистику планировщика запросов и при необходимости сжать файл"""
+        async with self.get_connection() as db:
+            await db.execute("PRAGMA optimize")
+            if vacuum:
+                await db.execute("VACUUM")
+
+    async def load_quiz_scores(self) -> List[Mapping[str, Any]]:
+        """Загрузить лучшие результаты тестов вместе с именами пользователей"""
+        async with self.get_connection() as db:
+            async with db.execute("""
+                SELECT s.user_id, s.topic, s.score, u.username
+                FROM quiz_scores s LEFT JOIN users u ON u.user_id = s.user_id
+            """) as cursor:
+                return await cursor.fetchall()
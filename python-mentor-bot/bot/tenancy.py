@@ -0,0 +1,55 @@
+"""
+Несколько ботов в одном процессе.
+
+Уроки, отрендеренные страницы, клавиатуры, классификатор намерений,
+песочница и пул проверки заданий общие для всех ботов процесса. Все, что
+зависит от пользователей, принадлежит боту (Tenant): хранилище, кэш
+пользователей (с их языками), рейтинг, буфер результатов тестов и file_id
+картинок кода - file_id действителен только для загрузившего его бота.
+
+Tenant текущего обновления кладет в current_tenant TenantMiddleware,
+фоновые задачи получают его явно.
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+
+from bot.quiz import Leaderboard, ScoreBuffer
+from bot.review import ReviewScheduler
+from bot.snippets import CodeImages
+from bot.storage import Repository
+from bot.users import UserCache
+
+DEFAULT_TENANT = "default"
+
+
+class Tenant:
+    """Данные одного бота"""
+
+    def __init__(self, name: str, db: Repository, locale: Optional[str] = None):
+        self.name = name
+        self.db = db
+        # Язык бота для пользователей, не выбравших язык сами; None - из настроек Telegram
+        self.locale = locale
+        self.user_cache = UserCache()
+        self.leaderboard = Leaderboard()
+        self.score_buffer = ScoreBuffer()
+        self.code_images = CodeImages(db)
+        # Планировщик напоминаний бота; назначается при запуске
+        self.review_scheduler: Optional[ReviewScheduler] = None
+
+    def __repr__(self) -> str:
+        return f"Tenant({self.name!r})"
+
+    def job_name(self, name: str) -> str:
+        """Имя фоновой задачи бота: у основного бота имена прежние"""
+        return name if self.name == DEFAULT_TENANT else f"{name}:{self.name}"
+
+    async def prepare(self):
+        """Создать схему БД и загрузить рейтинг"""
+        await self.db.init_db()
+        for row in await self.db.load_quiz_scores():
+            self.leaderboard.record(row["user_id"], row["topic"], row["score"], row["username"])
+
+
+current_tenant: ContextVar[Tenant] = ContextVar("current_tenant")
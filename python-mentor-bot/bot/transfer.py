@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Перенос данных между развертываниями: потоковая выгрузка и загрузка
+пользователей, прогресса, вопросов и журнала команд в JSONL или CSV.
+
+Таблицы читаются пачками по ключу (keyset) и пишутся пачками, каждая
+одной транзакцией, поэтому память не зависит от объема данных. Загрузка
+записывает пройденную позицию каждого источника в файл прогресса и после
+сбоя продолжает с последней записанной пачки; повтор пачки безопасен,
+так как строки перезаписываются по ключу. Источником может быть и база
+старой схемы create_db.py: completed_lessons и test_scores переводятся в
+повторения и результаты тестов.
+
+Запуск:
+    python -m bot.transfer export КАТАЛОГ [--format jsonl|csv] [--tables users,...]
+    python -m bot.transfer import КАТАЛОГ|старая.db [--restart]
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from bot.quiz import default_question_banks
+from bot.review import PAGE
+from bot.storage import TABLE_COLUMNS, PostgresRepository, Repository, SQLiteRepository
+
+FORMATS = ("jsonl", "csv")
+PROGRESS_SUFFIX = ".import-progress.json"
+
+# Таблицы старой схемы create_db.py и их ключи
+LEGACY_KEYS = {"users": "user_id", "questions": "id", "command_logs": "id"}
+LEGACY_TABLES = {"questions": "user_questions"}
+LEGACY_COLUMNS = {"question_text": "question", "answer_text": "answer", "asked_date": "created_at"}
+
+# Текстовые столбцы, где пустая ячейка CSV означает NULL, а не пустую строку
+OPTIONAL_TEXT = {("users", "language")}
+
+# (имя источника, позиция в нем, таблица, строка)
+SourceRow = Tuple[str, Any, str, Dict[str, Any]]
+
+
+def coerce(table: str, row: Mapping[str, Any]) -> Tuple:
+    """Привести строку к столбцам таблицы; пустые нестроковые значения CSV - NULL"""
+    values = []
+    for column, kind in TABLE_COLUMNS[table].items():
+        value = row.get(column)
+        if value is None or (value == "" and (kind is not str or (table, column) in OPTIONAL_TEXT)):
+            values.append(None)
+        else:
+            values.append(kind(value))
+    return tuple(values)
+
+
+def _iso(value: Any) -> Optional[str]:
+    """Время старой схемы (CURRENT_TIMESTAMP) в ISO 8601"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        return str(value)
+
+
+def _json_field(value: Any, default: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value) if value else default
+        except ValueError:
+            return default
+    return default if value is None else value
+
+
+def translate_legacy_user(row: Mapping[str, Any], now: datetime) -> List[Tuple[str, Dict[str, Any]]]:
+    """Пользователь старой схемы -> пользователь, результаты тестов и повторения"""
+    user_id = int(row["user_id"])
+    created_at = _iso(row.get("created_at")) or now.isoformat()
+    result = [("users", {
+        "user_id": user_id,
+        "username": row.get("username"),
+        "current_topic": row.get("current_topic") or "basics",
+        "current_page": row.get("current_page") or 0,
+        "created_at": created_at,
+    })]
+
+    # test_scores: {"topic": score} или {"topic": {"score": s, "total": t}}
+    for topic, score in _json_field(row.get("test_scores"), {}).items():
+        total = None
+        if isinstance(score, dict):
+            score, total = score.get("score", 0), score.get("total")
+        result.append(("quiz_scores", {
+            "user_id": user_id,
+            "topic": topic,
+            "score": score,
+            "total": total or len(default_question_banks().get(topic, ())) or score,
+            "finished_at": created_at,
+        }))
+
+    # completed_lessons: ["topic", "topic:page", ...] - ставим на повторение
+    due_at = (now + timedelta(days=1)).isoformat()
+    for lesson in _json_field(row.get("completed_lessons"), []):
+        topic, _, page = str(lesson).partition(":")
+        result.append(("review_items", {
+            "user_id": user_id, "kind": PAGE, "topic": topic, "item": int(page) if page.isdigit() else 0,
+            "ease": 2.5, "interval": 0, "repetitions": 0, "due_at": due_at,
+        }))
+    return result
+
+
+def translate(table: str, row: Dict[str, Any], now: datetime) -> List[Tuple[str, Dict[str, Any]]]:
+    """Строка источника -> строки таблиц текущей схемы"""
+    if table == "users" and ("completed_lessons" in row or "test_scores" in row):
+        return translate_legacy_user(row, now)
+    if table in LEGACY_TABLES:
+        return [(LEGACY_TABLES[table], {LEGACY_COLUMNS.get(key, key): value for key, value in row.items()})]
+    if table in TABLE_COLUMNS:
+        return [(table, row)]
+    return []
+
+
+def read_directory(source: Path, progress: Dict[str, Any]) -> Iterator[SourceRow]:
+    """Строки файлов <таблица>.jsonl/.csv, пропуская уже загруженные"""
+    for table in [*TABLE_COLUMNS, *LEGACY_TABLES]:
+        for fmt in FORMATS:
+            path = source / f"{table}.{fmt}"
+            if not path.exists():
+                continue
+            done = progress.get(path.name, 0)
+            with open(path, encoding="utf-8", newline="") as f:
+                lines = csv.DictReader(f) if fmt == "csv" else f
+                for number, line in enumerate(lines, 1):
+                    if number <= done:
+                        continue
+                    yield path.name, number, table, line if fmt == "csv" else json.loads(line)
+
+
+def read_legacy_db(source: Path, progress: Dict[str, Any], batch_size: int) -> Iterator[SourceRow]:
+    """Строки базы старой схемы пачками по ключу"""
+    conn = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table, key in LEGACY_KEYS.items():
+            if table not in existing:
+                continue
+            last = progress.get(table)
+            while True:
+                if last is None:
+                    rows = conn.execute(f"SELECT * FROM {table} ORDER BY {key} LIMIT ?", (batch_size,)).fetchall()
+                else:
+                    rows = conn.execute(
+                        f"SELECT * FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?", (last, batch_size)
+                    ).fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    last = row[key]
+                    yield table, last, table, dict(row)
+    finally:
+        conn.close()
+
+
+def _progress_path(source: Path) -> Path:
+    return source / PROGRESS_SUFFIX if source.is_dir() else source.with_name(source.name + PROGRESS_SUFFIX)
+
+
+async def import_data(
+        repo: Repository,
+        source: Path,
+        batch_size: int = 5000,
+        restart: bool = False,
+        report: Callable[[str], Any] = print,
+) -> Dict[str, int]:
+    """Загрузить каталог выгрузки или базу старой схемы, вернуть число строк по таблицам"""
+    progress_path = _progress_path(source)
+    progress: Dict[str, Any] = {}
+    if progress_path.exists() and not restart:
+        progress = json.loads(progress_path.read_text(encoding="utf-8"))
+        report(f"Продолжаем загрузку: {progress}")
+
+    rows = read_directory(source, progress) if source.is_dir() else read_legacy_db(source, progress, batch_size)
+    now = datetime.now()
+    pending: Dict[str, List[Tuple]] = {}
+    positions: Dict[str, Any] = {}
+    counts = {table: 0 for table in TABLE_COLUMNS}
+    buffered = 0
+    started = time.perf_counter()
+
+    async def flush():
+        for table in TABLE_COLUMNS:
+            batch = pending.pop(table, None)
+            if batch:
+                await repo.write_rows(table, batch)
+                counts[table] += len(batch)
+        progress.update(positions)
+        partial = progress_path.with_name(progress_path.name + ".tmp")
+        partial.write_text(json.dumps(progress), encoding="utf-8")
+        os.replace(partial, progress_path)
+        total = sum(counts.values())
+        report(f"Загружено {total} строк ({total / max(time.perf_counter() - started, 1e-9):.0f} строк/с)")
+
+    for name, position, table, row in rows:
+        for target, values in translate(table, row, now):
+            pending.setdefault(target, []).append(coerce(target, values))
+            buffered += 1
+        positions[name] = position
+        if buffered >= batch_size:
+            await flush()
+            buffered = 0
+    await flush()
+    progress_path.unlink(missing_ok=True)
+    return counts
+
+
+async def export_data(
+        repo: Repository,
+        target: Path,
+        fmt: str = "jsonl",
+        tables: Optional[List[str]] = None,
+        batch_size: int = 5000,
+        report: Callable[[str], Any] = print,
+) -> Dict[str, int]:
+    """Выгрузить таблицы в <таблица>.<fmt>, вернуть число строк по таблицам"""
+    target.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    for table in tables or TABLE_COLUMNS:
+        columns = list(TABLE_COLUMNS[table])
+        path = target / f"{table}.{fmt}"
+        partial = path.with_name(path.name + ".part")
+        count = 0
+        with open(partial, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f) if fmt == "csv" else None
+            if writer is not None:
+                writer.writerow(columns)
+            async for rows in repo.iter_rows(table, batch_size):
+                if writer is not None:
+                    writer.writerows(rows)
+                else:
+                    f.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+                count += len(rows)
+                report(f"{table}: {count} строк")
+        os.replace(partial, path)
+        counts[table] = count
+    return counts
+
+
+def open_repository(db: Optional[str]) -> Repository:
+    """Хранилище по --db или DATABASE_URL/DATABASE_PATH"""
+    location = db or os.environ.get("DATABASE_URL") or os.environ.get("DATABASE_PATH", "python_mentor.db")
+    if location.startswith(("postgres://", "postgresql://")):
+        return PostgresRepository(location)
+    return SQLiteRepository(location)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, int]:
+    repo = open_repository(args.db)
+
+    def report(line: str):
+        print(line, file=sys.stderr)
+
+    await repo.init_db()
+    try:
+        if args.command == "export":
+            tables = args.tables.split(",") if args.tables else None
+            return await export_data(repo, Path(args.path), args.format, tables, args.batch, report)
+        return await import_data(repo, Path(args.path), args.batch, args.restart, report)
+    finally:
+        await repo.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка и загрузка данных Python Mentor Bot")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="каталог выгрузки или база старой схемы для import")
+    parser.add_argument("--db", default=None, help="путь к БД или postgresql://... (по умолчанию из окружения)")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--tables", default=None, help=f"через запятую из: {', '.join(TABLE_COLUMNS)}")
+    parser.add_argument("--batch", type=int, default=5000, help="строк в пачке и транзакции")
+    parser.add_argument("--restart", action="store_true", help="начать загрузку заново, игнорируя прогресс")
+    args = parser.parse_args()
+
+    if args.tables and not set(args.tables.split(",")) <= set(TABLE_COLUMNS):
+        parser.error(f"неизвестные таблицы: {args.tables}")
+    counts = asyncio.run(run(args))
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+
+
+if __name__ == "__main__":
+    main()
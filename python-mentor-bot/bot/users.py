@@ -0,0 +1,242 @@
+"""
+Кэш состояния активных пользователей.
+
+Модель UserProgress на каждого закэшированного ученика - это объект
+pydantic, datetime, словарь полей и несколько строк: около килобайта на
+пользователя. UserCache хранит то же состояние по столбцам в array:
+тема и язык - номера из небольших таблиц, страница - 2 байта, дата
+регистрации - микросекунды от эпохи. Строка таблицы ищется по user_id,
+освобожденные строки переиспользуются. UserProgress собирается только на
+границе - при выдаче обработчику - и без повторной валидации.
+
+Кэш сквозной: запись в хранилище идет как раньше, кэш только избавляет
+от чтения. Исключение - положение в уроке (defer): страница меняется на
+каждое нажатие, поэтому такие изменения копятся в кэше и записываются
+пачкой (drain). Несохраненные записи не теряются при вытеснении и
+продолжают отдаваться из кэша. Старые записи вытесняются по LRU и по
+времени жизни. Промахи
+хранилища (еще не зарегистрированные пользователи) запоминаются так же,
+чтобы каждое их обновление не читало хранилище заново.
+"""
+
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from bot.models import LessonTopic, UserProgress
+
+# Номера тем: порядок LessonTopic, новые темы добавляются в конец
+TOPICS = tuple(topic.value for topic in LessonTopic)
+TOPIC_CODES = {topic: code for code, topic in enumerate(TOPICS)}
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NO_LANGUAGE = -1
+
+
+class UserCache:
+    """LRU-кэш UserProgress со столбцовым хранением полей"""
+
+    def __init__(self, size: int = 1024, ttl: float = 300.0):
+        self.size = size
+        self.ttl = ttl
+        # user_id -> строка; порядок ключей - от давно использованных к недавним
+        self._rows: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._topics = array("B")
+        self._pages = array("H")
+        self._created = array("q")
+        self._languages = array("b")
+        self._loaded = array("d")
+        self._usernames: List[Optional[str]] = []
+        # Страницы, уже поставленные на повторение: (номер темы, страница)
+        self._seen: List[Optional[Set[Tuple[int, int]]]] = []
+        # Языков единицы: имя каждого хранится один раз, в столбце - номер
+        self._language_names: List[str] = []
+        self._language_codes: Dict[str, int] = {}
+        # user_id -> время, когда хранилище ответило, что пользователя нет
+        self._absent: Dict[int, float] = {}
+        # Изменения, еще не записанные в хранилище: строки кэша и вытесненные
+        self._dirty: Set[int] = set()
+        self._unsaved: Dict[int, UserProgress] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._rows
+
+    def configure(self, size: int, ttl: float):
+        """Изменить размер и время жизни; лишние записи вытесняются сразу"""
+        self.size, self.ttl = size, ttl
+        while len(self._rows) > size:
+            self._evict()
+        while len(self._absent) > size:
+            del self._absent[next(iter(self._absent))]
+
+    def get(self, user_id: int) -> Optional[UserProgress]:
+        """Пользователь из кэша или None, если его нет или запись устарела"""
+        row = self._rows.get(user_id)
+        if row is not None and self.ttl and time.monotonic() - self._loaded[row] > self.ttl:
+            self.discard(user_id)
+            row = None
+        if row is None:
+            unsaved = self._unsaved.get(user_id)
+            if unsaved is None:
+                self.misses += 1
+                return None
+            # Вытесненный до записи пользователь новее, чем в хранилище
+            if not self.defer(unsaved):
+                self.hits += 1
+                return unsaved
+            row = self._rows[user_id]
+        # Недавно использованные - в конец очереди вытеснения
+        self._rows[user_id] = self._rows.pop(user_id)
+        self.hits += 1
+        return self._user(user_id, row)
+
+    def _user(self, user_id: int, row: int) -> UserProgress:
+        language = self._languages[row]
+        # Данные уже проверены при загрузке - повторная валидация не нужна
+        return UserProgress.model_construct(
+            user_id=user_id,
+            username=self._usernames[row],
+            current_topic=TOPICS[self._topics[row]],
+            current_page=self._pages[row],
+            created_at=_EPOCH + self._created[row] * _MICROSECOND,
+            language=self._language_names[language] if language != _NO_LANGUAGE else None,
+        )
+
+    def is_absent(self, user_id: int) -> bool:
+        """Хранилище недавно ответило, что такого пользователя нет"""
+        loaded = self._absent.get(user_id)
+        if loaded is None:
+            return False
+        if self.ttl and time.monotonic() - loaded > self.ttl:
+            del self._absent[user_id]
+            return False
+        return True
+
+    def put_absent(self, user_id: int):
+        """Запомнить промах хранилища; put() того же пользователя его отменяет"""
+        if not self.size:
+            return
+        self._absent.pop(user_id, None)
+        if len(self._absent) >= self.size:
+            del self._absent[next(iter(self._absent))]
+        self._absent[user_id] = time.monotonic()
+
+    def put(self, user: UserProgress):
+        """Запомнить пользователя после чтения или записи в хранилище"""
+        if not self.size:
+            return
+        self._absent.pop(user.user_id, None)
+        self._dirty.discard(user.user_id)
+        self._unsaved.pop(user.user_id, None)
+        row = self._rows.pop(user.user_id, None)
+        if row is None:
+            if len(self._rows) >= self.size:
+                self._evict()
+            row = self._allocate()
+            self._seen[row] = None
+        self._rows[user.user_id] = row
+        self._topics[row] = TOPIC_CODES[user.current_topic]
+        self._pages[row] = user.current_page
+        self._created[row] = (user.created_at - _EPOCH) // _MICROSECOND
+        self._languages[row] = self._language_code(user.language)
+        self._loaded[row] = time.monotonic()
+        self._usernames[row] = user.username
+
+    def defer(self, user: UserProgress) -> bool:
+        """Запомнить изменение без записи в хранилище; False - кэш выключен, писать сразу"""
+        if not self.size:
+            return False
+        self.put(user)
+        self._dirty.add(user.user_id)
+        return True
+
+    def drain(self) -> List[UserProgress]:
+        """Забрать несохраненные изменения для записи пачкой"""
+        users = [self._user(user_id, self._rows[user_id]) for user_id in self._dirty]
+        users += self._unsaved.values()
+        self._dirty.clear()
+        self._unsaved = {}
+        return users
+
+    def restore(self, users: List[UserProgress]):
+        """Вернуть изменения, которые не удалось записать, если их не сменили новые"""
+        for user in users:
+            if user.user_id not in self._dirty and user.user_id not in self._unsaved:
+                self._unsaved[user.user_id] = user
+
+    @property
+    def unsaved(self) -> int:
+        """Пользователей с несохраненными изменениями"""
+        return len(self._dirty) + len(self._unsaved)
+
+    def mark_seen(self, user_id: int, topic: str, page: int) -> bool:
+        """Отметить страницу поставленной на повторение; False - уже была отмечена.
+
+        Для пользователя не из кэша всегда True: хранилище само пропустит повтор.
+        """
+        row = self._rows.get(user_id)
+        if row is None:
+            return True
+        seen = self._seen[row]
+        if seen is None:
+            seen = self._seen[row] = set()
+        key = (TOPIC_CODES[topic], page)
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
+
+    def discard(self, user_id: int):
+        """Забыть пользователя; несохраненное изменение остается до drain"""
+        self._absent.pop(user_id, None)
+        row = self._rows.pop(user_id, None)
+        if row is not None:
+            if user_id in self._dirty:
+                self._dirty.remove(user_id)
+                self._unsaved[user_id] = self._user(user_id, row)
+            self._usernames[row] = None
+            self._seen[row] = None
+            self._free.append(row)
+
+    def _evict(self):
+        user_id = next(iter(self._rows))
+        self.discard(user_id)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        for column in (self._topics, self._pages, self._created, self._languages, self._loaded):
+            column.append(0)
+        self._usernames.append(None)
+        self._seen.append(None)
+        return len(self._usernames) - 1
+
+    def _language_code(self, language: Optional[str]) -> int:
+        if language is None:
+            return _NO_LANGUAGE
+        code = self._language_codes.get(language)
+        if code is None:
+            code = self._language_codes[language] = len(self._language_names)
+            self._language_names.append(language)
+        return code
+
+    def stats(self) -> Dict[str, float]:
+        """Заполненность и доля попаданий"""
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._rows),
+            "absent": len(self._absent),
+            "unsaved": self.unsaved,
+            "capacity": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
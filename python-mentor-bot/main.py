@@ -11,18 +11,21 @@ import logging
 import html
 import re
 import os
+import signal
 import sys
-from contextlib import asynccontextmanager
-from datetime import datetime
+from contextlib import suppress
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
 from enum import Enum
 from pathlib import Path
-from typing import ClassVar, Optional, List, Dict, Any
+from typing import ClassVar, Optional, List, Dict, Any, Type
 
-import aiosqlite
 from aiogram import Bot, Dispatcher, Router, F
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.filters import Command, CommandStart
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.filters import Command, CommandStart, Filter
+from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -32,12 +35,45 @@ from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     BotCommand,
+    ErrorEvent,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
     ReplyKeyboardMarkup,
     KeyboardButton,
+    User,
 )
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
-from dotenv import dotenv_values
-from pydantic import BaseModel, Field
+from pydantic import Field, ValidationError
+
+from bot.backup import BackupManager
+from bot.config import BotConfig, TenantConfig, load_settings, load_tenants, reload_settings
+from bot.exercises import ExerciseBank
+from bot import grader as grading
+from bot.i18n import DEFAULT_LOCALE, Translator, load_catalogues
+from bot.intents import IntentClassifier
+from bot.lessoncheck import LessonValidator
+from bot.log import CONSOLE_FORMAT, setup_logging
+from bot.middlewares import (
+    DebounceMiddleware,
+    DrainMiddleware,
+    LogContextMiddleware,
+    TenantMiddleware,
+    ThrottlingMiddleware,
+    UserSerializationMiddleware,
+)
+from bot.models import LessonTopic, UserProgress
+from bot.quiz import QuizBank, question_banks
+from bot import review as srs
+from bot.precheck import Rejection
+from bot.sandbox import OK, REJECTED, TIMEOUT, CodeRunner, RunResult, Sandbox
+from bot.scheduler import CronTrigger, IntervalTrigger, JobScheduler
+from bot.search import SearchIndex, normalize_query
+from bot.session import create_session
+from bot.shutdown import GracefulShutdown
+from bot.snippets import CodeImages
+from bot.storage import SQLiteRepository, create_repository
+from bot.tenancy import DEFAULT_TENANT, Tenant, current_tenant
 
 
 # ---------- Состояния для диалогов ----------
@@ -45,6 +81,12 @@ class UserState(StatesGroup):
     """Состояния пользователя"""
     waiting_code_example = State()
     waiting_question = State()
+    waiting_solution = State()
+
+
+class QuizState(StatesGroup):
+    """Прохождение теста"""
+    answering = State()
 
 
 # ---------- Утилиты форматирования ----------
@@ -63,26 +105,351 @@ def format_explanation(text: str) -> str:
     return f"<i>{escape_html(text)}</i>"
 
 
-# ---------- ENUM тем ----------
-class LessonTopic(str, Enum):
-    BASICS = "basics"
-    OOP = "oop"
-    FILES = "files"
-    TOOLS = "tools"
-    FRAMEWORKS = "frameworks"
-    DATASCIENCE = "datascience"
-    SYNTAX = "syntax"
-    ASYNC = "async"
-    TEST = "test"
-    INSTALL = "install"
+# ---------- Markdown -> HTML ----------
+_MARKDOWN_TOKEN_RE = re.compile(r"```|\*\*|\\[\\*`_]|[*`&<>]")
+_MARKDOWN_TAGS = {"**": "b", "*": "i"}
+_HTML_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+
+
+def _escape_text(text: str) -> str:
+    """Экранирование только того, что требует Telegram HTML"""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def convert_markdown(text: str) -> tuple[str, List[str]]:
+    """Перевести Markdown в HTML для Telegram и собрать ошибки разметки.
+
+    Один проход по тексту: регулярное выражение только находит следующий
+    маркер, а блоки кода пропускаются целиком через str.find. Незакрытые
+    маркеры в итоге выводятся как обычный текст.
+    """
+    out: List[str] = []
+    errors: List[str] = []
+    stack: List[tuple[str, int, int]] = []  # (маркер, индекс в out, позиция в тексте)
+
+    def line_of(position: int) -> int:
+        return text.count("\n", 0, position) + 1
+
+    pos = 0
+    length = len(text)
+    while pos < length:
+        match = _MARKDOWN_TOKEN_RE.search(text, pos)
+        if match is None:
+            out.append(text[pos:])
+            break
+        start, token = match.start(), match.group()
+        if start > pos:
+            out.append(text[pos:start])
+        pos = match.end()
+
+        if token in _HTML_ESCAPES:
+            out.append(_HTML_ESCAPES[token])
+        elif token[0] == "\\":
+            out.append(_escape_text(token[1]))
+        elif token == "```" and (start == 0 or text[start - 1] == "\n"):
+            header_end = text.find("\n", pos)
+            if header_end == -1:
+                header_end = length
+            language = text[pos:header_end].strip()
+            body_start = min(header_end + 1, length)
+            body_end = text.find("\n```", header_end)
+            if body_end == -1:
+                errors.append(f"Незакрытый блок кода ``` (строка {line_of(start)})")
+                body_end = pos = length
+            else:
+                pos = body_end + 4
+            css = f' class="language-{_escape_text(language)}"' if language else ""
+            out.append(f"<pre><code{css}>{_escape_text(text[body_start:body_end])}</code></pre>")
+        elif token[0] == "`":
+            end = text.find(token, pos)
+            if end == -1:
+                errors.append(f"Непарные {token} (строка {line_of(start)})")
+                out.append(token)
+            else:
+                out.append(f"<code>{_escape_text(text[pos:end])}</code>")
+                pos = end + len(token)
+        elif stack and stack[-1][0] == token:
+            out.append(f"</{_MARKDOWN_TAGS[token]}>")
+            stack.pop()
+        elif any(marker == token for marker, _, _ in stack):
+            errors.append(f"Неправильная вложенность {token} (строка {line_of(start)})")
+            out.append(token)
+        else:
+            stack.append((token, len(out), start))
+            out.append(f"<{_MARKDOWN_TAGS[token]}>")
+
+    for marker, index, start in stack:
+        errors.append(f"Непарные {marker} (строка {line_of(start)})")
+        out[index] = marker
+
+    return "".join(out), errors
+
+
+def markdown_to_html(text: str) -> str:
+    """Конвертация Markdown в HTML для Telegram"""
+    return convert_markdown(text)[0]
+
+
+def validate_markdown(text: str) -> tuple[bool, str]:
+    """Проверка Markdown: (корректно ли, описание ошибок)"""
+    errors = convert_markdown(text)[1]
+    return not errors, "; ".join(errors)
+
+
+# ---------- Разбиение длинных сообщений ----------
+TELEGRAM_MESSAGE_LIMIT = 4096
+_HTML_TOKEN_RE = re.compile(r"<[^>]*>|[^<]+")
+_HTML_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)")
+_ENTITY_TAIL_RE = re.compile(r"&[#a-zA-Z0-9]{0,10}$")
+
+
+def telegram_length(text: str) -> int:
+    """Длина текста в единицах UTF-16, как ее считает Telegram"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _fit_prefix(text: str, budget: int) -> int:
+    """Сколько символов text помещается в budget единиц UTF-16, не разрывая HTML-сущность"""
+    used = 0
+    end = 0
+    for end, char in enumerate(text):
+        used += 2 if ord(char) > 0xFFFF else 1
+        if used > budget:
+            break
+    else:
+        return len(text)
+    entity = _ENTITY_TAIL_RE.search(text, 0, end)
+    return entity.start() if entity and entity.start() > 0 else end
+
+
+def split_html(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """Разбить HTML на части не длиннее limit.
+
+    Разрез делается только между строками (или внутри очень длинной строки),
+    но никогда внутри тега или сущности: открытые на границе теги, включая <pre>,
+    закрываются в конце части и открываются заново в начале следующей.
+    """
+    if telegram_length(text) <= limit:
+        return [text]
+
+    parts: List[str] = []
+    stack: List[tuple[str, str]] = []  # (имя тега, открывающий тег)
+    chunks: List[str] = []
+    used = 0
+    has_text = False
+
+    def closing_length() -> int:
+        return sum(len(name) + 3 for name, _ in stack)
+
+    def flush():
+        nonlocal used, has_text
+        parts.append("".join(chunks) + "".join(f"</{name}>" for name, _ in reversed(stack)))
+        chunks.clear()
+        chunks.extend(tag for _, tag in stack)
+        used = sum(len(tag) for _, tag in stack)
+        has_text = False
+
+    def append(piece: str, length: int):
+        nonlocal used
+        chunks.append(piece)
+        used += length
+
+    for token in _HTML_TOKEN_RE.findall(text):
+        tag = _HTML_TAG_RE.match(token)
+        if tag:
+            is_closing, name = tag.group(1), tag.group(2).lower()
+            if is_closing:
+                append(token, len(token))
+                if stack and stack[-1][0] == name:
+                    stack.pop()
+                continue
+            if has_text and used + len(token) + len(name) + 3 + closing_length() > limit:
+                flush()
+            append(token, len(token))
+            stack.append((name, token))
+            continue
+
+        for line in token.splitlines(keepends=True):
+            length = telegram_length(line)
+            if used + length + closing_length() > limit and has_text:
+                flush()
+            while used + length + closing_length() > limit:
+                budget = limit - used - closing_length()
+                if budget <= 0:
+                    raise ValueError("Лимит слишком мал для вложенности тегов")
+                cut = _fit_prefix(line, budget)
+                append(line[:cut], telegram_length(line[:cut]))
+                has_text = True
+                flush()
+                line = line[cut:]
+                length = telegram_length(line)
+            if line:
+                append(line, length)
+                has_text = True
+
+    if has_text:
+        parts.append("".join(chunks))
+    return [part.strip() for part in parts]
+
+
+def pack_html_blocks(blocks: List[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """Собрать независимые HTML-блоки в минимальное число сообщений"""
+    messages: List[str] = []
+    current = ""
+    for block in blocks:
+        for part in split_html(block, limit):
+            if current and telegram_length(current) + telegram_length(part) > limit:
+                messages.append(current.strip())
+                current = ""
+            current += part
+    if current.strip():
+        messages.append(current.strip())
+    return messages
+
+
+# ---------- Callback data ----------
+class MenuAction(str, Enum):
+    TOPICS = "topics"
+    MAIN = "main"
+    NOOP = "noop"
+    QUIZ = "quiz"
+    LEADERBOARD = "top"
+
+
+class TopicCallback(CallbackData, prefix="t"):
+    """Страница урока: t:<topic>:<page>:<part>"""
+    topic: LessonTopic
+    page: int = Field(0, ge=0, le=99)
+    part: int = Field(0, ge=0, le=99)
+
+
+class CodeCallback(CallbackData, prefix="c"):
+    """Только пример кода страницы: c:<topic>:<page>:<part>"""
+    topic: LessonTopic
+    page: int = Field(0, ge=0, le=99)
+    part: int = Field(0, ge=0, le=99)
+
+
+class MenuCallback(CallbackData, prefix="m"):
+    """Переходы по меню: m:<action>"""
+    action: MenuAction
+
+
+class QuizCallback(CallbackData, prefix="qs"):
+    """Начать тест по теме: qs:<topic>"""
+    topic: LessonTopic
+
+
+class AnswerCallback(CallbackData, prefix="qa"):
+    """Ответ на вопрос теста: qa:<question>:<option>"""
+    question: int = Field(ge=0, le=99)
+    option: int = Field(ge=0, le=9)
+
+
+class ReviewCallback(CallbackData, prefix="r"):
+    """Оценка повторения: r:<kind>:<topic>:<item>:<quality>"""
+    kind: str = Field(pattern="^[pq]$")
+    topic: LessonTopic
+    item: int = Field(ge=0, le=99)
+    quality: int = Field(ge=0, le=5)
+
+
+class ExerciseCallback(CallbackData, prefix="e"):
+    """Задание к странице урока: e:<topic>:<page>"""
+    topic: LessonTopic
+    page: int = Field(0, ge=0)
+
+
+class LanguageCallback(CallbackData, prefix="l"):
+    """Выбор языка интерфейса: l:<locale>"""
+    locale: str = Field(pattern="^[a-z]{2}$")
+
+
+# Таблица префикс -> тип, собирается один раз при импорте
+CALLBACK_CODECS: Dict[str, Type[CallbackData]] = {
+    codec.__prefix__: codec
+    for codec in (
+        TopicCallback, CodeCallback, MenuCallback, QuizCallback, AnswerCallback, ReviewCallback, ExerciseCallback,
+        LanguageCallback,
+    )
+}
+
+
+def decode_callback(data: Optional[str]) -> Optional[CallbackData]:
+    """Разобрать callback_data за один проход, None если данные некорректны"""
+    if not data:
+        return None
+    codec = CALLBACK_CODECS.get(data.partition(":")[0])
+    if codec is None:
+        return None
+    try:
+        return codec.unpack(data)
+    except (TypeError, ValueError):
+        return None
+
+
+# Навигационные нажатия одного пользователя схлопываются до последнего
+NAVIGATION_PREFIXES = frozenset({TopicCallback.__prefix__, CodeCallback.__prefix__})
+
+
+def is_navigation_update(event: Any) -> bool:
+    """Обновление - нажатие кнопки навигации по урокам"""
+    callback = getattr(event, "callback_query", None)
+    return bool(callback and callback.data) and callback.data.partition(":")[0] in NAVIGATION_PREFIXES
+
 
+def is_inline_query(event: Any) -> bool:
+    """Обновление - inline-запрос (приходит на каждое нажатие клавиши)"""
+    return getattr(event, "inline_query", None) is not None
 
-# ---------- Конфигурация бота ----------
-class BotConfig(BaseModel):
-    """Конфигурация бота"""
-    token: str
-    admin_ids: List[int] = []
-    debug: bool = False
+
+class PayloadFilter(Filter):
+    """Фильтр по уже разобранному payload нужного типа"""
+
+    def __init__(self, codec: Type[CallbackData], **values: Any):
+        self.codec = codec
+        self.values = values
+
+    async def __call__(self, callback: CallbackQuery, payload: Optional[CallbackData] = None) -> bool:
+        if not isinstance(payload, self.codec):
+            return False
+        return all(getattr(payload, key) == value for key, value in self.values.items())
+
+
+# ---------- Локализация ----------
+catalogues = load_catalogues()
+i18n = Translator(catalogues)
+# Матрица примеров строится при запуске бота (или при первом сообщении)
+intent_classifier = IntentClassifier.from_catalogues(catalogues)
+# Основной бот; данные остальных ботов процесса создаются в main()
+default_tenant = Tenant(DEFAULT_TENANT, SQLiteRepository())
+
+
+def get_tenant() -> Tenant:
+    """Данные бота, обрабатывающего текущее обновление"""
+    return current_tenant.get(default_tenant)
+
+
+async def user_locale(user: Optional[User]) -> str:
+    """Язык интерфейса пользователя"""
+    tenant = get_tenant()
+    if user is None:
+        return tenant.locale or i18n.default
+    # Язык, сохраненный пользователем, важнее языка бота и language_code из Telegram;
+    # сохраненный язык берется из кэша активных пользователей, а не из копии всей таблицы
+    progress = await load_user(user.id)
+    saved = progress.language if progress is not None else None
+    return saved or tenant.locale or i18n.resolve(user.language_code)
+
+
+class MenuButton(Filter):
+    """Нажатие reply-кнопки главного меню на любом языке"""
+
+    def __init__(self, name: str):
+        self.key = f"menu.{name}"
+
+    async def __call__(self, message: Message) -> bool:
+        return i18n.button(message.text) == self.key
 
 
 # ---------- Уроки с подробными объяснениями ----------
@@ -797,18 +1164,44 @@ async def fetch_multiple_urls():
         }
     }
 
+    # Поля страницы, которые можно перевести в каталоге: lessons.<тема>.<страница>.<поле>
+    LOCALIZED_FIELDS: ClassVar[tuple] = ("title", "explanation", "steps")
+    # Уроки с подставленными переводами: (тема, язык) -> урок
+    _localized: ClassVar[Dict[tuple, Optional[Dict[str, Any]]]] = {}
+
+    @classmethod
+    def _lesson(cls, topic: LessonTopic, locale: str) -> Optional[Dict[str, Any]]:
+        """Урок на языке locale; непереведенные поля остаются исходными"""
+        key = (topic, locale)
+        if key not in cls._localized:
+            lesson = cls.lessons.get(topic)
+            if lesson is not None:
+                prefix = f"lessons.{topic.value}."
+                lesson = {
+                    "title": i18n.get(locale, prefix + "title", lesson["title"]),
+                    "content": [
+                        {**content, **{
+                            field: i18n.get(locale, f"{prefix}{page}.{field}", content[field])
+                            for field in cls.LOCALIZED_FIELDS if field in content
+                        }}
+                        for page, content in enumerate(lesson["content"])
+                    ],
+                }
+            cls._localized[key] = lesson
+        return cls._localized[key]
+
     @classmethod
-    def get_topic_content(cls, topic: LessonTopic, page: int = 0) -> Dict[str, Any]:
+    def get_topic_content(cls, topic: LessonTopic, page: int = 0, locale: str = DEFAULT_LOCALE) -> Dict[str, Any]:
         """Получить контент темы"""
-        lesson = cls.lessons.get(topic)
+        lesson = cls._lesson(topic, locale)
         if not lesson or page >= len(lesson["content"]):
             return {}
         return lesson["content"][page]
 
     @classmethod
-    def get_topic_title(cls, topic: LessonTopic) -> str:
+    def get_topic_title(cls, topic: LessonTopic, locale: str = DEFAULT_LOCALE) -> str:
         """Получить заголовок темы"""
-        lesson = cls.lessons.get(topic)
+        lesson = cls._lesson(topic, locale)
         return lesson.get("title", "") if lesson else ""
 
     @classmethod
@@ -817,543 +1210,1303 @@ async def fetch_multiple_urls():
         lesson = cls.lessons.get(topic)
         return len(lesson.get("content", [])) if lesson else 0
 
+    # Отрендеренные страницы: (тема, страница, язык) -> части сообщения
+    _rendered_pages: ClassVar[Dict[tuple, List[str]]] = {}
+    _rendered_code: ClassVar[Dict[tuple, List[str]]] = {}
 
-# ---------- Пользователь ----------
-class UserProgress(BaseModel):
-    user_id: int
-    username: Optional[str] = None
-    current_topic: str = LessonTopic.BASICS.value
-    current_page: int = 0
-    created_at: datetime = Field(default_factory=datetime.now)
-
-    def update_topic(self, topic: LessonTopic, page: int = 0):
-        """Обновить текущую тему и страницу"""
-        self.current_topic = topic.value
-        self.current_page = page
-
-
-# ---------- БД ----------
-class DatabaseManager:
-    def __init__(self, db_path: str = "python_mentor.db"):
-        self.path = Path(db_path)
-        self.path.parent.mkdir(exist_ok=True)
-
-    @asynccontextmanager
-    async def get_connection(self):
-        """Контекстный менеджер для соединения с БД"""
-        async with aiosqlite.connect(self.path) as db:
-            db.row_factory = aiosqlite.Row
-            yield db
-
-    async def init_db(self):
-        """Инициализация базы данных"""
-        async with self.get_connection() as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    current_topic TEXT,
-                    current_page INTEGER DEFAULT 0,
-                    created_at TEXT
-                )
-            """)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS user_questions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    question TEXT,
-                    answer TEXT,
-                    created_at TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            """)
-            await db.commit()
-
-    async def get_user(self, user_id: int) -> Optional[UserProgress]:
-        """Получить пользователя"""
-        async with self.get_connection() as db:
-            async with db.execute(
-                    "SELECT * FROM users WHERE user_id = ?", (user_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return UserProgress(
-                        user_id=row["user_id"],
-                        username=row["username"],
-                        current_topic=row["current_topic"],
-                        current_page=row["current_page"],
-                        created_at=datetime.fromisoformat(row["created_at"])
-                    )
-        return None
+    # Блоки кода страницы и ключ подписи каждого в каталоге
+    CODE_BLOCKS: ClassVar[tuple] = (
+        ("windows_code", "lesson.windows"),
+        ("linux_code", "lesson.linux"),
+        ("install_code", "lesson.install"),
+        ("example_code", "lesson.example"),
+    )
 
-    async def save_user(self, user: UserProgress):
-        """Сохранить пользователя"""
-        async with self.get_connection() as db:
-            await db.execute("""
-                INSERT OR REPLACE INTO users 
-                (user_id, username, current_topic, current_page, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                user.user_id,
-                user.username,
-                user.current_topic,
-                user.current_page,
-                user.created_at.isoformat()
-            ))
-            await db.commit()
-
-    async def save_question(self, user_id: int, question: str, answer: str = ""):
-        """Сохранить вопрос пользователя"""
-        async with self.get_connection() as db:
-            await db.execute("""
-                INSERT INTO user_questions (user_id, question, answer, created_at)
-                VALUES (?, ?, ?, ?)
-            """, (
-                user_id,
-                question,
-                answer,
-                datetime.now().isoformat()
-            ))
-            await db.commit()
+    @classmethod
+    def _page_blocks(cls, topic: LessonTopic, content: Dict[str, Any], locale: str) -> List[str]:
+        """Разбить страницу на независимые HTML-блоки"""
+        blocks = [
+            f"<b>{cls.get_topic_title(topic, locale)}</b>\n\n",
+            f"<b>{content['title']}</b>\n\n",
+            format_explanation(content['explanation']) + "\n\n",
+        ]
+
+        # Код для Windows и Linux, установки и пример, если есть
+        for field, label in cls.CODE_BLOCKS:
+            if field in content:
+                blocks.append(i18n.text(locale, label) + format_code(content[field]) + "\n\n")
+
+        if 'steps' in content:
+            blocks.append(i18n.text(locale, "lesson.steps") + "".join(f"• {step}\n" for step in content['steps']))
+
+        return blocks
+
+    @classmethod
+    def render_page(cls, topic: LessonTopic, page: int = 0, locale: str = DEFAULT_LOCALE) -> List[str]:
+        """Получить страницу урока, разбитую на части по лимиту Telegram"""
+        key = (topic, page, locale)
+        if key not in cls._rendered_pages:
+            content = cls.get_topic_content(topic, page, locale)
+            cls._rendered_pages[key] = pack_html_blocks(cls._page_blocks(topic, content, locale)) if content else []
+        return cls._rendered_pages[key]
+
+    @classmethod
+    async def warm_up(cls):
+        """Отрендерить все страницы на всех языках заранее, уступая event loop между страницами"""
+        for locale in i18n.locales:
+            for topic, lesson in cls.lessons.items():
+                for page in range(len(lesson["content"])):
+                    cls.render_page(topic, page, locale)
+                    cls.render_code(topic, page, locale)
+                    await asyncio.sleep(0)
+
+    @classmethod
+    def render_code(cls, topic: LessonTopic, page: int = 0, locale: str = DEFAULT_LOCALE) -> List[str]:
+        """Получить только пример кода страницы, разбитый на части"""
+        key = (topic, page, locale)
+        if key not in cls._rendered_code:
+            content = cls.get_topic_content(topic, page, locale)
+            if not content or 'example_code' not in content:
+                cls._rendered_code[key] = []
+            else:
+                cls._rendered_code[key] = pack_html_blocks([
+                    i18n.text(locale, "lesson.code_title", title=content['title']),
+                    format_code(content['example_code']),
+                ])
+        return cls._rendered_code[key]
 
 
 # ---------- Клавиатуры ----------
-def create_main_keyboard() -> ReplyKeyboardMarkup:
+# Клавиатуры не зависят от пользователя, поэтому собираются один раз на язык
+MENU_BUTTONS = ("topics", "code", "question", "progress", "install")
+
+
+@lru_cache(maxsize=None)
+def create_main_keyboard(locale: str = DEFAULT_LOCALE) -> ReplyKeyboardMarkup:
     """Создать основную клавиатуру"""
     builder = ReplyKeyboardBuilder()
-    builder.add(KeyboardButton(text="📚 Темы обучения"))
-    builder.add(KeyboardButton(text="💻 Пример кода"))
-    builder.add(KeyboardButton(text="❓ Задать вопрос"))
-    builder.add(KeyboardButton(text="📊 Мой прогресс"))
-    builder.add(KeyboardButton(text="📥 Установка Python"))
+    for name in MENU_BUTTONS:
+        builder.add(KeyboardButton(text=i18n.text(locale, f"menu.{name}")))
     builder.adjust(2)
     return builder.as_markup(resize_keyboard=True)
 
 
-def create_topics_keyboard() -> InlineKeyboardMarkup:
+TOPIC_BUTTONS = [
+    LessonTopic.BASICS,
+    LessonTopic.SYNTAX,
+    LessonTopic.OOP,
+    LessonTopic.FILES,
+    LessonTopic.FRAMEWORKS,
+    LessonTopic.TOOLS,
+    LessonTopic.DATASCIENCE,
+    LessonTopic.ASYNC,
+]
+
+
+@lru_cache(maxsize=None)
+def create_topics_keyboard(locale: str = DEFAULT_LOCALE) -> InlineKeyboardMarkup:
     """Создать клавиатуру с темами"""
-    topics = [
-        (LessonTopic.BASICS, "📚 Основы Python"),
-        (LessonTopic.SYNTAX, "🧠 Синтаксис"),
-        (LessonTopic.OOP, "🏛️ ООП"),
-        (LessonTopic.FILES, "📁 Файлы"),
-        (LessonTopic.FRAMEWORKS, "🚀 Фреймворки"),
-        (LessonTopic.TOOLS, "🛠️ Инструменты"),
-        (LessonTopic.DATASCIENCE, "📊 Data Science"),
-        (LessonTopic.ASYNC, "⚡ Асинхронность"),
-    ]
+    builder = InlineKeyboardBuilder()
+    for topic in TOPIC_BUTTONS:
+        builder.button(text=i18n.text(locale, f"topics.{topic.value}"), callback_data=TopicCallback(topic=topic))
+
+    builder.button(text=i18n.text(locale, "buttons.quizzes"), callback_data=MenuCallback(action=MenuAction.QUIZ))
+    builder.button(text=i18n.text(locale, "buttons.back"), callback_data=MenuCallback(action=MenuAction.MAIN))
+    builder.adjust(2)
+    return builder.as_markup()
+
 
+@lru_cache(maxsize=None)
+def create_quiz_topics_keyboard(locale: str = DEFAULT_LOCALE) -> InlineKeyboardMarkup:
+    """Создать клавиатуру выбора темы теста"""
     builder = InlineKeyboardBuilder()
-    for topic, title in topics:
-        builder.button(text=title, callback_data=f"topic:{topic.value}")
+    for topic in TOPIC_BUTTONS:
+        if quiz_banks[locale].size(topic.value):
+            builder.button(text=i18n.text(locale, f"topics.{topic.value}"), callback_data=QuizCallback(topic=topic))
 
-    builder.button(text="⬅️ Назад", callback_data="back_to_main")
+    builder.button(
+        text=i18n.text(locale, "buttons.leaderboard"), callback_data=MenuCallback(action=MenuAction.LEADERBOARD)
+    )
+    builder.button(text=i18n.text(locale, "buttons.back"), callback_data=MenuCallback(action=MenuAction.TOPICS))
     builder.adjust(2)
     return builder.as_markup()
 
 
-def create_lesson_navigation(topic: LessonTopic, current_page: int, total_pages: int) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=None)
+def create_language_keyboard() -> InlineKeyboardMarkup:
+    """Создать клавиатуру выбора языка: каждый язык подписан на самом себе"""
+    builder = InlineKeyboardBuilder()
+    for locale in i18n.locales:
+        builder.button(text=i18n.text(locale, "language.name"), callback_data=LanguageCallback(locale=locale))
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+def create_question_keyboard(index: int, options: tuple) -> InlineKeyboardMarkup:
+    """Создать клавиатуру с вариантами ответа"""
+    builder = InlineKeyboardBuilder()
+    for option, text in enumerate(options):
+        builder.button(text=text, callback_data=AnswerCallback(question=index, option=option))
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def create_lesson_navigation(
+        topic: LessonTopic,
+        current_page: int,
+        total_pages: int,
+        part: int = 0,
+        total_parts: int = 1,
+        locale: str = DEFAULT_LOCALE,
+) -> InlineKeyboardMarkup:
     """Создать клавиатуру навигации по уроку"""
     builder = InlineKeyboardBuilder()
+    back, forward = i18n.text(locale, "buttons.back"), i18n.text(locale, "buttons.forward")
 
-    # Кнопки навигации
-    if current_page > 0:
-        builder.button(text="⬅️ Назад", callback_data=f"page:{topic.value}:{current_page - 1}")
+    # Кнопки навигации: сначала по частям длинной страницы, затем по страницам
+    if part > 0:
+        builder.button(text=back, callback_data=TopicCallback(topic=topic, page=current_page, part=part - 1))
+    elif current_page > 0:
+        builder.button(text=back, callback_data=TopicCallback(topic=topic, page=current_page - 1))
 
-    builder.button(text=f"{current_page + 1}/{total_pages}", callback_data="current_page")
+    counter = f"{current_page + 1}/{total_pages}"
+    if total_parts > 1:
+        counter += f" · {part + 1}/{total_parts}"
+    builder.button(text=counter, callback_data=MenuCallback(action=MenuAction.NOOP))
 
-    if current_page < total_pages - 1:
-        builder.button(text="Вперед ➡️", callback_data=f"page:{topic.value}:{current_page + 1}")
+    if part < total_parts - 1:
+        builder.button(text=forward, callback_data=TopicCallback(topic=topic, page=current_page, part=part + 1))
+    elif current_page < total_pages - 1:
+        builder.button(text=forward, callback_data=TopicCallback(topic=topic, page=current_page + 1))
 
     # Дополнительные кнопки
-    builder.button(text="📚 Все темы", callback_data="show_topics")
-    builder.button(text="💻 Пример кода", callback_data=f"code:{topic.value}:{current_page}")
-    builder.button(text="🏠 Главная", callback_data="back_to_main")
+    builder.button(text=i18n.text(locale, "buttons.all_topics"), callback_data=MenuCallback(action=MenuAction.TOPICS))
+    builder.button(text=i18n.text(locale, "buttons.code"), callback_data=CodeCallback(topic=topic, page=current_page))
+    if exercise_bank.get(topic.value, current_page):
+        builder.button(
+            text=i18n.text(locale, "buttons.exercise"), callback_data=ExerciseCallback(topic=topic, page=current_page)
+        )
+    if quiz_banks[locale].size(topic.value):
+        builder.button(text=i18n.text(locale, "buttons.quiz"), callback_data=QuizCallback(topic=topic))
+    builder.button(text=i18n.text(locale, "buttons.home"), callback_data=MenuCallback(action=MenuAction.MAIN))
 
-    builder.adjust(3, 2, 1)
+    builder.adjust(3, 2, 2)
     return builder.as_markup()
 
 
+# ---------- Inline-режим ----------
+INLINE_RESULTS_LIMIT = 20
+
+
+@lru_cache(maxsize=None)
+def lesson_search_index(locale: str) -> tuple[SearchIndex, tuple]:
+    """Индекс страниц уроков на языке locale и (тема, страница) каждого документа"""
+    pages, documents = [], []
+    for topic, lesson in LessonManager.lessons.items():
+        topic_title = f"{topic.value} {LessonManager.get_topic_title(topic, locale)}"
+        for page in range(len(lesson["content"])):
+            content = LessonManager.get_topic_content(topic, page, locale)
+            pages.append((topic, page))
+            documents.append((
+                f"{topic_title} {content['title']}",
+                " ".join([content["explanation"], *content.get("steps", ()), content.get("example_code", "")]),
+            ))
+    return SearchIndex(documents), tuple(pages)
+
+
+@lru_cache(maxsize=1024)
+def inline_results(query: str, locale: str) -> tuple:
+    """Статьи inline-ответа по нормализованному запросу из готового HTML страниц"""
+    index, pages = lesson_search_index(locale)
+    results = []
+    for document in index.search(query, INLINE_RESULTS_LIMIT):
+        topic, page = pages[document]
+        title = LessonManager.get_topic_content(topic, page, locale)["title"]
+        parts = LessonManager.render_page(topic, page, locale)
+        text = parts[0]
+        if len(parts) > 1:
+            # В чат уходит одно сообщение: первая часть с пометкой, где читать остальное
+            more = i18n.text(locale, "lesson.inline_more", total=len(parts), title=escape_html(title))
+            text = split_html(text, TELEGRAM_MESSAGE_LIMIT - telegram_length(more))[0] + more
+        results.append(InlineQueryResultArticle(
+            id=f"{topic.value}:{page}",
+            title=title,
+            description=LessonManager.get_topic_title(topic, locale),
+            input_message_content=InputTextMessageContent(message_text=text, parse_mode=ParseMode.HTML),
+        ))
+    return tuple(results)
+
+
 # ---------- Бот ----------
 router = Router()
-db_manager = DatabaseManager()
 lesson_manager = LessonManager()
+# Вопросы тестов на каждом языке; непереведенные берутся из каталога по умолчанию
+quiz_banks = {locale: QuizBank(question_banks(table)) for locale, table in i18n.tables.items()}
+code_runner = CodeRunner(Sandbox())
+exercise_bank = ExerciseBank()
+grader = grading.Grader(code_runner)
+lesson_validator = LessonValidator(LessonManager, i18n.locales, code_runner.sandbox)
+
+
+async def load_user(user_id: int, tenant: Optional[Tenant] = None) -> Optional[UserProgress]:
+    """Пользователь из кэша, а при промахе - из хранилища бота"""
+    tenant = tenant or get_tenant()
+    user = tenant.user_cache.get(user_id)
+    if user is None and not tenant.user_cache.is_absent(user_id):
+        user = await tenant.db.get_user(user_id)
+        if user is not None:
+            tenant.user_cache.put(user)
+        else:
+            # Незарегистрированные пользователи (в том числе из inline-запросов)
+            # не читают хранилище на каждом обновлении
+            tenant.user_cache.put_absent(user_id)
+    return user
+
+
+async def save_user(user: UserProgress, deferred: bool = False):
+    """Сохранить пользователя в хранилище и кэш; deferred - в хранилище позже, пачкой"""
+    tenant = get_tenant()
+    if deferred and tenant.user_cache.defer(user):
+        return
+    await tenant.db.save_user(user)
+    tenant.user_cache.put(user)
+
+
+async def flush_users(tenant: Optional[Tenant] = None) -> int:
+    """Записать отложенные изменения пользователей бота одной транзакцией"""
+    tenant = tenant or get_tenant()
+    users = tenant.user_cache.drain()
+    if not users:
+        return 0
+    try:
+        await tenant.db.save_users(users)
+    except Exception:
+        tenant.user_cache.restore(users)
+        raise
+    return len(users)
+
+
+@router.message.outer_middleware()
+@router.callback_query.outer_middleware()
+@router.inline_query.outer_middleware()
+async def locale_middleware(handler, event: Any, data: Dict[str, Any]):
+    """Определить язык пользователя один раз и передать обработчикам как locale"""
+    data["locale"] = await user_locale(data.get("event_from_user"))
+    return await handler(event, data)
 
 
 @router.message(CommandStart())
-async def start_command(message: Message):
+async def start_command(message: Message, locale: str):
     """Обработчик команды /start"""
-    user = await db_manager.get_user(message.from_user.id)
+    user = await load_user(message.from_user.id)
     if not user:
+        # Язык из настроек Telegram запоминаем, чтобы и напоминания приходили на нем
         user = UserProgress(
             user_id=message.from_user.id,
             username=message.from_user.username,
+            language=locale,
         )
-        await db_manager.save_user(user)
-
-    welcome_text = (
-        "👋 <b>Привет! Я Python Mentor Bot</b>\n\n"
-        "Я помогу тебе изучить Python от основ до продвинутых тем!\n\n"
-        "<b>Что я умею:</b>\n"
-        "• 📚 Объяснять основы Python\n"
-        "• 💻 Показывать примеры кода\n"
-        "• 🏛️ Рассказывать про ООП\n"
-        "• 📁 Учить работать с файлами\n"
-        "• 🚀 Показывать фреймворки (Flask, Django)\n"
-        "• 🛠️ Знакомить с инструментами разработчика\n"
-        "• 📊 Объяснять Data Science\n"
-        "• ⚡ Рассказывать про асинхронность\n\n"
-        "<b>Выбери действие:</b>"
-    )
+        await save_user(user)
 
     await message.answer(
-        welcome_text,
+        i18n.text(locale, "messages.welcome"),
         parse_mode="HTML",
-        reply_markup=create_main_keyboard()
+        reply_markup=create_main_keyboard(locale)
     )
 
 
-@router.message(F.text == "📚 Темы обучения")
-async def show_topics(message: Message):
+@router.message(MenuButton("topics"))
+async def show_topics(message: Message, locale: str):
     """Показать все темы"""
     await message.answer(
-        "<b>📚 Выбери тему для изучения:</b>",
+        i18n.text(locale, "messages.choose_topic"),
         parse_mode="HTML",
-        reply_markup=create_topics_keyboard()
+        reply_markup=create_topics_keyboard(locale)
     )
 
 
-@router.message(F.text == "💻 Пример кода")
-async def show_code_examples(message: Message, state: FSMContext):
+@router.message(MenuButton("code"))
+async def show_code_examples(message: Message, state: FSMContext, locale: str):
     """Показать примеры кода"""
     await message.answer(
-        "<b>💻 Примеры кода</b>\n\n"
-        "Выбери тему для которой хочешь увидеть пример кода:",
+        i18n.text(locale, "messages.code_examples"),
         parse_mode="HTML",
-        reply_markup=create_topics_keyboard()
+        reply_markup=create_topics_keyboard(locale)
     )
 
 
-@router.message(F.text == "📥 Установка Python")
-async def show_installation(message: Message):
+@lru_cache(maxsize=None)
+def create_installation_keyboard(locale: str = DEFAULT_LOCALE) -> InlineKeyboardMarkup:
+    """Создать клавиатуру инструкции по установке"""
+    builder = InlineKeyboardBuilder()
+    builder.button(
+        text=i18n.text(locale, "buttons.install_linux"), callback_data=TopicCallback(topic=LessonTopic.INSTALL, page=1)
+    )
+    builder.button(text=i18n.text(locale, "buttons.all_topics"), callback_data=MenuCallback(action=MenuAction.TOPICS))
+    builder.button(text=i18n.text(locale, "buttons.home"), callback_data=MenuCallback(action=MenuAction.MAIN))
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+@router.message(MenuButton("install"))
+async def show_installation(message: Message, locale: str):
     """Показать инструкцию по установке Python"""
     topic = LessonTopic.INSTALL
-    content = lesson_manager.get_topic_content(topic, 0)
+    content = lesson_manager.get_topic_content(topic, 0, locale)
 
-    text = f"<b>{lesson_manager.get_topic_title(topic)}</b>\n\n"
+    text = f"<b>{lesson_manager.get_topic_title(topic, locale)}</b>\n\n"
     text += f"<b>{content['title']}</b>\n\n"
     text += f"{content['explanation']}\n\n"
 
     if 'steps' in content:
-        text += "<b>Шаги установки:</b>\n"
+        text += i18n.text(locale, "messages.install_steps")
         for step in content['steps']:
             text += f"• {step}\n"
 
-    # Кнопка для Linux установки
-    builder = InlineKeyboardBuilder()
-    builder.button(text="🐧 Установка на Linux", callback_data=f"topic:{LessonTopic.INSTALL.value}:1")
-    builder.button(text="📚 Все темы", callback_data="show_topics")
-    builder.button(text="🏠 Главная", callback_data="back_to_main")
-    builder.adjust(1)
-
-    await message.answer(text, parse_mode="HTML", reply_markup=builder.as_markup())
+    await message.answer(text, parse_mode="HTML", reply_markup=create_installation_keyboard(locale))
 
 
-@router.message(F.text == "❓ Задать вопрос")
-async def ask_question(message: Message, state: FSMContext):
+@router.message(MenuButton("question"))
+async def ask_question(message: Message, state: FSMContext, locale: str):
     """Задать вопрос"""
-    await message.answer(
-        "<b>❓ Задай свой вопрос по Python</b>\n\n"
-        "Напиши свой вопрос, и я постараюсь на него ответить:",
-        parse_mode="HTML"
-    )
+    await message.answer(i18n.text(locale, "messages.ask_question"), parse_mode="HTML")
     await state.set_state(UserState.waiting_question)
 
 
 @router.message(UserState.waiting_question)
-async def handle_question(message: Message, state: FSMContext):
+async def handle_question(message: Message, state: FSMContext, locale: str):
     """Обработка вопроса пользователя"""
     question = message.text
-    await db_manager.save_question(message.from_user.id, question)
+    await get_tenant().db.save_question(message.from_user.id, question)
 
     # Здесь можно добавить логику ответа на вопросы
     # Пока просто подтверждаем получение
     await message.answer(
-        "<b>✅ Вопрос получен!</b>\n\n"
-        "Я записал твой вопрос и скоро на него отвечу.\n"
-        "А пока можешь изучить другие темы:",
+        i18n.text(locale, "messages.question_received"),
         parse_mode="HTML",
-        reply_markup=create_main_keyboard()
+        reply_markup=create_main_keyboard(locale)
     )
     await state.clear()
 
 
-@router.message(F.text == "📊 Мой прогресс")
-async def show_progress(message: Message):
+def format_grade_result(result: grading.GradeResult, locale: str = DEFAULT_LOCALE) -> str:
+    """Итог проверки решения; входные данные скрытых тестов не раскрываются"""
+    if result.status == grading.REJECTED:
+        return format_rejection(result.rejection, locale)
+    if result.status == grading.BUSY:
+        return i18n.text(locale, "exercise.busy")
+    if result.status == grading.GRADE_TIMEOUT:
+        return i18n.text(locale, "exercise.timeout")
+    if result.status == grading.CRASHED:
+        key = "exercise.crashed" if result.line is None else "exercise.crashed_line"
+        return i18n.text(locale, key, line=result.line, error=escape_html(result.error))
+
+    lines = [i18n.text(locale, "exercise.result", passed=result.passed, total=result.total)]
+    for number, case in enumerate(result.cases, 1):
+        if case.error:
+            lines.append(i18n.text(locale, "exercise.case_error", number=number, error=escape_html(case.error)))
+        elif not case.passed:
+            lines.append(i18n.text(locale, "exercise.case_failed", number=number))
+    solved = result.passed == result.total
+    lines.append(i18n.text(locale, "exercise.solved" if solved else "exercise.retry"))
+    return "\n".join(lines)
+
+
+@router.message(UserState.waiting_solution, F.text, ~F.text.startswith("/"))
+async def handle_solution(message: Message, state: FSMContext, locale: str):
+    """Проверить решение задания скрытыми тестами"""
+    data = await state.get_data()
+    topic, page = LessonTopic(data["topic"]), data["page"]
+    user_id = message.from_user.id
+
+    result = await grader.grade(user_id, exercise_bank.get(topic.value, page), message.text)
+    if result.status == grading.GRADED:
+        await get_tenant().db.save_exercise_score(
+            user_id, topic.value, page, result.passed, result.total, datetime.now().isoformat()
+        )
+        # Решение задания - повторение страницы: качество по доле пройденных тестов
+        solved = result.passed == result.total
+        quality = 5 if solved else 3 if result.passed * 2 >= result.total else 1
+        await record_review(user_id, srs.PAGE, topic, page, quality)
+        if solved:
+            await state.clear()
+
+    await message.answer(
+        format_grade_result(result, locale),
+        parse_mode="HTML",
+        reply_markup=create_exercise_keyboard(topic, page, locale)
+    )
+
+
+@router.message(MenuButton("progress"))
+async def show_progress(message: Message, locale: str):
     """Показать прогресс пользователя"""
-    user = await db_manager.get_user(message.from_user.id)
+    user, exercise_scores = await asyncio.gather(
+        load_user(message.from_user.id), get_tenant().db.load_exercise_scores(message.from_user.id)
+    )
     if user:
         topic = LessonTopic(user.current_topic)
-        topic_title = lesson_manager.get_topic_title(topic)
-
-        progress_text = (
-            f"<b>📊 Твой прогресс</b>\n\n"
-            f"👤 Пользователь: {escape_html(user.username or 'Аноним')}\n"
-            f"🎯 Текущая тема: {topic_title}\n"
-            f"📄 Страница: {user.current_page + 1}\n"
-            f"📅 Зарегистрирован: {user.created_at.strftime('%d.%m.%Y')}\n\n"
-            f"<i>Продолжай изучать Python! 🚀</i>"
+        progress_text = i18n.text(
+            locale, "messages.progress",
+            username=escape_html(user.username or i18n.text(locale, "messages.anonymous")),
+            topic=lesson_manager.get_topic_title(topic, locale),
+            page=user.current_page + 1,
+            created=user.created_at.strftime(i18n.text(locale, "messages.date_format")),
+            exercises=f"{sum(row['passed'] == row['total'] for row in exercise_scores)}/{len(exercise_bank)}",
         )
 
         await message.answer(
             progress_text,
             parse_mode="HTML",
-            reply_markup=create_main_keyboard()
+            reply_markup=create_main_keyboard(locale)
         )
 
 
-@router.callback_query(F.data.startswith("topic:"))
-async def handle_topic_selection(callback: CallbackQuery):
-    """Обработка выбора темы"""
+async def edit_callback_message(callback: CallbackQuery, text: str, reply_markup: InlineKeyboardMarkup) -> None:
+    """Отредактировать сообщение, не падая на повторном нажатии той же кнопки"""
+    # Картинку кода текстом не заменить - отвечаем новым сообщением
+    if callback.message.text is None:
+        await callback.message.answer(text, parse_mode="HTML", reply_markup=reply_markup)
+        return
     try:
-        data_parts = callback.data.split(":")
-        topic_value = data_parts[1]
-        page = int(data_parts[2]) if len(data_parts) > 2 else 0
+        await callback.message.edit_text(
+            text,
+            parse_mode="HTML",
+            reply_markup=reply_markup
+        )
+    except TelegramBadRequest as e:
+        if "message is not modified" not in e.message:
+            raise
 
-        topic = LessonTopic(topic_value)
-        content = lesson_manager.get_topic_content(topic, page)
 
-        if not content:
-            await callback.answer("Контент не найден")
-            return
+@router.callback_query.outer_middleware()
+async def callback_payload_middleware(handler, event: CallbackQuery, data: Dict[str, Any]):
+    """Разобрать callback_data один раз и передать обработчикам как payload"""
+    data["payload"] = decode_callback(event.data)
+    return await handler(event, data)
 
-        # Формируем текст сообщения
-        text = f"<b>{lesson_manager.get_topic_title(topic)}</b>\n\n"
-        text += f"<b>{content['title']}</b>\n\n"
-        text += format_explanation(content['explanation']) + "\n\n"
 
-        # Добавляем код для Windows и Linux если есть
-        if 'windows_code' in content:
-            text += "<b>💻 Windows:</b>\n"
-            text += format_code(content['windows_code']) + "\n\n"
+@router.callback_query(PayloadFilter(TopicCallback))
+async def handle_topic_selection(callback: CallbackQuery, payload: TopicCallback, locale: str):
+    """Обработка выбора темы и навигации по страницам"""
+    topic, page = payload.topic, payload.page
+    parts = lesson_manager.render_page(topic, page, locale)
 
-        if 'linux_code' in content:
-            text += "<b>🐧 Linux:</b>\n"
-            text += format_code(content['linux_code']) + "\n\n"
+    if payload.part >= len(parts):
+        await callback.answer(i18n.text(locale, "messages.content_not_found"))
+        return
 
-        if 'install_code' in content:
-            text += "<b>📦 Установка:</b>\n"
-            text += format_code(content['install_code']) + "\n\n"
+    # Положение в уроке меняется на каждое нажатие: кэш копит его и пишет пачкой,
+    # а страница ставится на повторение только при первом просмотре
+    tenant = get_tenant()
+    user = await load_user(callback.from_user.id)
+    if user:
+        if (user.current_topic, user.current_page) != (topic.value, page):
+            user.update_topic(topic, page)
+            await save_user(user, deferred=True)
+        if tenant.user_cache.mark_seen(user.user_id, topic.value, page):
+            due_at = datetime.now() + timedelta(days=1)
+            added = await tenant.db.add_review_item(srs.ReviewItem(
+                user.user_id, srs.PAGE, topic.value, page, due_at=due_at.isoformat()
+            ))
+            if added and tenant.review_scheduler is not None:
+                tenant.review_scheduler.schedule(due_at)
 
-        if 'example_code' in content:
-            text += "<b>📝 Пример кода:</b>\n"
-            text += format_code(content['example_code'])
+    # Создаем клавиатуру навигации
+    total_pages = lesson_manager.get_total_pages(topic)
+    keyboard = create_lesson_navigation(topic, page, total_pages, payload.part, len(parts), locale)
 
-        if 'steps' in content:
-            text += "<b>📋 Шаги:</b>\n"
-            for step in content['steps']:
-                text += f"• {step}\n"
+    await edit_callback_message(callback, parts[payload.part], keyboard)
+    await callback.answer()
 
-        # Обновляем пользователя
-        user = await db_manager.get_user(callback.from_user.id)
-        if user:
-            user.update_topic(topic, page)
-            await db_manager.save_user(user)
 
-        # Создаем клавиатуру навигации
-        total_pages = lesson_manager.get_total_pages(topic)
-        keyboard = create_lesson_navigation(topic, page, total_pages)
+@router.callback_query(PayloadFilter(CodeCallback))
+async def handle_code_example(callback: CallbackQuery, payload: CodeCallback, locale: str):
+    """Показать только код без объяснений"""
+    topic, page, part = payload.topic, payload.page, payload.part
 
-        await callback.message.edit_text(
-            text,
-            parse_mode="HTML",
-            reply_markup=keyboard
+    parts = lesson_manager.render_code(topic, page, locale)
+    if part >= len(parts):
+        await callback.answer(i18n.text(locale, "messages.code_not_found"))
+        return
+
+    # Кнопка для возврата к полному уроку
+    builder = InlineKeyboardBuilder()
+    if part > 0:
+        builder.button(
+            text=i18n.text(locale, "buttons.back"), callback_data=CodeCallback(topic=topic, page=page, part=part - 1)
         )
-        await callback.answer()
+    if part < len(parts) - 1:
+        builder.button(
+            text=i18n.text(locale, "buttons.forward"), callback_data=CodeCallback(topic=topic, page=page, part=part + 1)
+        )
+    builder.button(text=i18n.text(locale, "buttons.full_lesson"), callback_data=TopicCallback(topic=topic, page=page))
+    builder.button(text=i18n.text(locale, "buttons.all_topics"), callback_data=MenuCallback(action=MenuAction.TOPICS))
+    builder.adjust((part > 0) + (part < len(parts) - 1) or 1, 1)
+
+    # Длинный пример целиком уходит картинкой: по file_id, если она уже загружалась
+    content = lesson_manager.get_topic_content(topic, page, locale)
+    code_images = get_tenant().code_images
+    if code_images.accepts(content["example_code"]):
+        await code_images.send(
+            callback.bot, callback.message.chat.id, content["example_code"],
+            caption=i18n.text(locale, "lesson.code_title", title=content["title"]).strip(),
+            reply_markup=create_code_image_keyboard(topic, page, locale),
+        )
+    else:
+        await edit_callback_message(callback, parts[part], builder.as_markup())
+    await callback.answer()
 
-    except Exception as e:
-        await callback.answer(f"Ошибка: {str(e)}")
 
+@lru_cache(maxsize=None)
+def create_code_image_keyboard(topic: LessonTopic, page: int, locale: str = DEFAULT_LOCALE) -> InlineKeyboardMarkup:
+    """Клавиатура под картинкой примера кода"""
+    builder = InlineKeyboardBuilder()
+    builder.button(text=i18n.text(locale, "buttons.full_lesson"), callback_data=TopicCallback(topic=topic, page=page))
+    builder.button(text=i18n.text(locale, "buttons.all_topics"), callback_data=MenuCallback(action=MenuAction.TOPICS))
+    builder.adjust(1)
+    return builder.as_markup()
 
-@router.callback_query(F.data.startswith("page:"))
-async def handle_page_navigation(callback: CallbackQuery):
-    """Обработка навигации по страницам"""
-    try:
-        _, topic_value, page_str = callback.data.split(":")
-        page = int(page_str)
-        topic = LessonTopic(topic_value)
 
-        # Обрабатываем как выбор темы с указанной страницей
-        await handle_topic_selection(callback)
+@lru_cache(maxsize=None)
+def create_exercise_keyboard(topic: LessonTopic, page: int, locale: str = DEFAULT_LOCALE) -> InlineKeyboardMarkup:
+    """Клавиатура под условием и результатом задания"""
+    builder = InlineKeyboardBuilder()
+    builder.button(text=i18n.text(locale, "buttons.open_lesson"), callback_data=TopicCallback(topic=topic, page=page))
+    builder.button(text=i18n.text(locale, "buttons.all_topics"), callback_data=MenuCallback(action=MenuAction.TOPICS))
+    builder.adjust(1)
+    return builder.as_markup()
 
-    except Exception as e:
-        await callback.answer(f"Ошибка навигации: {str(e)}")
 
+@router.callback_query(PayloadFilter(ExerciseCallback))
+async def handle_exercise(callback: CallbackQuery, payload: ExerciseCallback, state: FSMContext, locale: str):
+    """Показать условие задания и ждать решение"""
+    topic, page = payload.topic, payload.page
+    exercise = exercise_bank.get(topic.value, page)
+    if exercise is None:
+        await callback.answer(i18n.text(locale, "messages.content_not_found"))
+        return
 
-@router.callback_query(F.data.startswith("code:"))
-async def handle_code_example(callback: CallbackQuery):
-    """Показать только код без объяснений"""
+    await state.set_state(UserState.waiting_solution)
+    await state.update_data(topic=topic.value, page=page)
+    task = i18n.get(locale, f"lessons.{topic.value}.{page}.exercise", exercise.task)
+    await callback.message.answer(
+        i18n.text(
+            locale, "exercise.task",
+            title=escape_html(lesson_manager.get_topic_content(topic, page, locale)["title"]),
+            task=escape_html(task),
+        ),
+        parse_mode="HTML",
+        reply_markup=create_exercise_keyboard(topic, page, locale)
+    )
+    await callback.answer()
+
+
+@router.callback_query(PayloadFilter(MenuCallback, action=MenuAction.TOPICS))
+async def handle_show_topics(callback: CallbackQuery, locale: str):
+    """Показать все темы"""
+    await edit_callback_message(
+        callback,
+        i18n.text(locale, "messages.choose_topic"),
+        create_topics_keyboard(locale)
+    )
+    await callback.answer()
+
+
+@router.callback_query(PayloadFilter(MenuCallback, action=MenuAction.MAIN))
+async def handle_back_to_main(callback: CallbackQuery, locale: str):
+    """Вернуться в главное меню"""
+    # Reply-клавиатуру нельзя прикрепить через edit_text, поэтому отправляем новое сообщение
+    await callback.message.answer(
+        i18n.text(locale, "messages.main_menu"),
+        parse_mode="HTML",
+        reply_markup=create_main_keyboard(locale)
+    )
+    await callback.answer()
+
+
+def format_question(topic: LessonTopic, index: int, feedback: str = "", locale: str = DEFAULT_LOCALE) -> str:
+    """Текст вопроса теста"""
+    question = quiz_banks[locale].get(topic.value, index)
+    text = f"{feedback}\n\n" if feedback else ""
+    text += i18n.text(locale, "messages.quiz_title", topic=lesson_manager.get_topic_title(topic, locale))
+    text += i18n.text(locale, "messages.quiz_question", number=index + 1, total=quiz_banks[locale].size(topic.value))
+    text += escape_html(question.text)
+    return text
+
+
+def format_leaderboard(user_id: int, limit: int = 10, locale: str = DEFAULT_LOCALE) -> str:
+    """Текст рейтинга по тестам"""
+    text = i18n.text(locale, "messages.leaderboard")
+    leaderboard = get_tenant().leaderboard
+    top = leaderboard.top(limit)
+    if not top:
+        return text + i18n.text(locale, "messages.leaderboard_empty")
+    anonymous = i18n.text(locale, "messages.anonymous")
+    for place, (_, username, points) in enumerate(top, 1):
+        text += f"{place}. {escape_html(username or anonymous)} - {points}\n"
+    rank = leaderboard.rank(user_id)
+    if rank is not None:
+        text += i18n.text(locale, "messages.leaderboard_rank", rank=rank, total=len(leaderboard))
+    return text
+
+
+async def flush_quiz_scores(tenant: Optional[Tenant] = None) -> int:
+    """Записать накопленные результаты тестов бота одной транзакцией"""
+    tenant = tenant or get_tenant()
+    rows = tenant.score_buffer.drain()
+    if not rows:
+        return 0
     try:
-        _, topic_value, page_str = callback.data.split(":")
-        page = int(page_str)
-        topic = LessonTopic(topic_value)
+        await tenant.db.save_quiz_scores(rows)
+    except Exception:
+        tenant.score_buffer.extend(rows)
+        raise
+    return len(rows)
+
+
+@router.callback_query(PayloadFilter(MenuCallback, action=MenuAction.QUIZ))
+async def handle_quiz_menu(callback: CallbackQuery, locale: str):
+    """Показать темы тестов"""
+    await edit_callback_message(
+        callback,
+        i18n.text(locale, "messages.choose_quiz"),
+        create_quiz_topics_keyboard(locale)
+    )
+    await callback.answer()
 
-        content = lesson_manager.get_topic_content(topic, page)
-        if not content or 'example_code' not in content:
-            await callback.answer("Пример кода не найден")
-            return
 
-        text = f"<b>💻 Пример кода: {content['title']}</b>\n\n"
-        text += format_code(content['example_code'])
+@router.callback_query(PayloadFilter(QuizCallback))
+async def handle_quiz_start(callback: CallbackQuery, payload: QuizCallback, state: FSMContext, locale: str):
+    """Начать тест по теме"""
+    question = quiz_banks[locale].get(payload.topic.value, 0)
+    if question is None:
+        await callback.answer(i18n.text(locale, "messages.quiz_missing"))
+        return
 
-        # Кнопка для возврата к полному уроку
-        builder = InlineKeyboardBuilder()
-        builder.button(text="📖 Полный урок", callback_data=f"topic:{topic.value}:{page}")
-        builder.button(text="📚 Все темы", callback_data="show_topics")
-        builder.adjust(1)
+    await state.set_state(QuizState.answering)
+    await state.set_data({"topic": payload.topic.value, "index": 0, "score": 0})
+    await edit_callback_message(
+        callback,
+        format_question(payload.topic, 0, locale=locale),
+        create_question_keyboard(0, question.options)
+    )
+    await callback.answer()
 
-        await callback.message.edit_text(
-            text,
-            parse_mode="HTML",
-            reply_markup=builder.as_markup()
+
+@router.callback_query(QuizState.answering, PayloadFilter(AnswerCallback))
+async def handle_quiz_answer(callback: CallbackQuery, payload: AnswerCallback, state: FSMContext, locale: str):
+    """Обработка ответа на вопрос теста"""
+    data = await state.get_data()
+    topic, index = LessonTopic(data["topic"]), data["index"]
+    if payload.question != index:
+        # Нажатие на кнопку уже отвеченного вопроса
+        await callback.answer()
+        return
+
+    bank = quiz_banks[locale]
+    question = bank.get(topic.value, index)
+    correct = bank.is_correct(topic.value, index, payload.option)
+    if correct:
+        score = data["score"] + 1
+        feedback = i18n.text(locale, "messages.correct")
+    else:
+        score = data["score"]
+        feedback = i18n.text(locale, "messages.wrong", answer=escape_html(question.options[question.correct]))
+    await record_review(callback.from_user.id, srs.QUIZ, topic, index, 5 if correct else 1)
+
+    index += 1
+    total = bank.size(topic.value)
+    if index < total:
+        await state.update_data(index=index, score=score)
+        await edit_callback_message(
+            callback,
+            format_question(topic, index, feedback, locale),
+            create_question_keyboard(index, bank.get(topic.value, index).options)
         )
         await callback.answer()
+        return
 
-    except Exception as e:
-        await callback.answer(f"Ошибка: {str(e)}")
+    await state.clear()
+    tenant = get_tenant()
+    tenant.leaderboard.record(callback.from_user.id, topic.value, score, callback.from_user.username)
+    tenant.score_buffer.add(callback.from_user.id, topic.value, score, total, datetime.now().isoformat())
+    if tenant.score_buffer.full:
+        await flush_quiz_scores(tenant)
 
+    builder = InlineKeyboardBuilder()
+    builder.button(text=i18n.text(locale, "buttons.retry"), callback_data=QuizCallback(topic=topic))
+    builder.button(
+        text=i18n.text(locale, "buttons.leaderboard"), callback_data=MenuCallback(action=MenuAction.LEADERBOARD)
+    )
+    builder.button(text=i18n.text(locale, "buttons.all_topics"), callback_data=MenuCallback(action=MenuAction.TOPICS))
+    builder.adjust(1)
 
-@router.callback_query(F.data == "show_topics")
-async def handle_show_topics(callback: CallbackQuery):
-    """Показать все темы"""
-    await callback.message.edit_text(
-        "<b>📚 Выбери тему для изучения:</b>",
-        parse_mode="HTML",
-        reply_markup=create_topics_keyboard()
+    await edit_callback_message(
+        callback,
+        i18n.text(locale, "messages.quiz_finished", feedback=feedback, score=score, total=total),
+        builder.as_markup()
     )
     await callback.answer()
 
 
-@router.callback_query(F.data == "back_to_main")
-async def handle_back_to_main(callback: CallbackQuery):
-    """Вернуться в главное меню"""
-    await callback.message.edit_text(
-        "<b>🏠 Главное меню</b>\n\n"
-        "Выбери действие:",
+async def record_review(user_id: int, kind: str, topic: LessonTopic, item: int, quality: int) -> srs.ReviewItem:
+    """Оценить элемент повторения по SM-2 и сохранить новый срок"""
+    db = get_tenant().db
+    current = await db.get_review_item(user_id, kind, topic.value, item)
+    reviewed = srs.review(current or srs.ReviewItem(user_id, kind, topic.value, item), quality)
+    await db.save_review_item(reviewed)
+    return reviewed
+
+
+async def send_review_reminder(tenant: Tenant, bot: Bot, user_id: int, items: List[srs.ReviewItem]):
+    """Отправить пользователю напоминание о повторении от бота tenant"""
+    item = items[0]
+    topic = LessonTopic(item.topic)
+    user = await load_user(user_id, tenant)
+    locale = (user.language if user is not None else None) or tenant.locale or i18n.default
+    builder = InlineKeyboardBuilder()
+
+    if item.kind == srs.PAGE:
+        content = lesson_manager.get_topic_content(topic, item.item, locale)
+        subject = i18n.text(locale, "messages.review_page", title=escape_html(content.get('title', '')))
+        builder.button(
+            text=i18n.text(locale, "buttons.open_lesson"), callback_data=TopicCallback(topic=topic, page=item.item)
+        )
+        for key, quality in (("remember", 5), ("hard", 3), ("forgot", 1)):
+            builder.button(
+                text=i18n.text(locale, f"buttons.{key}"),
+                callback_data=ReviewCallback(kind=item.kind, topic=topic, item=item.item, quality=quality)
+            )
+        builder.adjust(1, 3)
+    else:
+        subject = i18n.text(locale, "messages.review_quiz", topic=lesson_manager.get_topic_title(topic, locale))
+        builder.button(text=i18n.text(locale, "buttons.take_quiz"), callback_data=QuizCallback(topic=topic))
+
+    text = i18n.text(locale, "messages.review", subject=subject)
+    if len(items) > 1:
+        text += i18n.text(locale, "messages.review_more", count=len(items) - 1)
+
+    try:
+        await bot.send_message(user_id, text, parse_mode="HTML", reply_markup=builder.as_markup())
+    except TelegramForbiddenError:
+        logging.info("Пользователь %s заблокировал бота, напоминание пропущено", user_id)
+
+
+@router.callback_query(PayloadFilter(ReviewCallback))
+async def handle_review_rating(callback: CallbackQuery, payload: ReviewCallback, locale: str):
+    """Оценка повторения урока"""
+    reviewed = await record_review(
+        callback.from_user.id, payload.kind, payload.topic, payload.item, payload.quality
+    )
+    await callback.answer(i18n.text(locale, "messages.review_next", days=reviewed.interval))
+    await callback.message.edit_reply_markup(reply_markup=None)
+
+
+@router.callback_query(PayloadFilter(MenuCallback, action=MenuAction.LEADERBOARD))
+async def handle_leaderboard(callback: CallbackQuery, locale: str):
+    """Показать рейтинг по тестам"""
+    builder = InlineKeyboardBuilder()
+    builder.button(text=i18n.text(locale, "buttons.quizzes"), callback_data=MenuCallback(action=MenuAction.QUIZ))
+    builder.button(text=i18n.text(locale, "buttons.home"), callback_data=MenuCallback(action=MenuAction.MAIN))
+    await edit_callback_message(
+        callback, format_leaderboard(callback.from_user.id, locale=locale), builder.as_markup()
+    )
+    await callback.answer()
+
+
+@router.callback_query(PayloadFilter(LanguageCallback))
+async def handle_language(callback: CallbackQuery, payload: LanguageCallback):
+    """Сохранить выбранный язык интерфейса"""
+    locale = payload.locale
+    if locale not in i18n.tables:
+        await callback.answer()
+        return
+
+    user = await load_user(callback.from_user.id)
+    if user is None:
+        user = UserProgress(user_id=callback.from_user.id, username=callback.from_user.username)
+    user.language = locale
+    await save_user(user)
+
+    await callback.message.answer(
+        i18n.text(locale, "language.selected"),
         parse_mode="HTML",
-        reply_markup=create_main_keyboard()
+        reply_markup=create_main_keyboard(locale)
     )
     await callback.answer()
 
 
-@router.message(F.text)
-async def handle_text_message(message: Message):
-    """Обработка текстовых сообщений"""
-    text = message.text.lower()
-
-    # Простые ответы на частые вопросы
-    responses = {
-        "привет": "👋 Привет! Я Python Mentor Bot. Используй кнопки меню для навигации.",
-        "help": "📋 Используй кнопки меню:\n• 📚 Темы обучения - выбрать тему\n• 💻 Пример кода - посмотреть код\n• ❓ Задать вопрос - получить помощь",
-        "python": "🐍 Python - отличный выбор! Начни изучение с раздела 📚 Основы Python",
-        "спасибо": "😊 Пожалуйста! Рад помочь в изучении Python!",
-        "код": "💻 Примеры кода доступны в каждой теме. Выбери тему и нажми 'Пример кода'",
-        "ооп": "🏛️ Объектно-ориентированное программирование - важная тема! Изучи ее в соответствующем разделе.",
-        "файлы": "📁 Работа с файлами - основа многих программ. Узнай больше в разделе 'Файлы'",
-    }
+@router.callback_query()
+async def handle_unknown_callback(callback: CallbackQuery):
+    """Кнопка-счетчик страниц или устаревшие/поврежденные callback_data"""
+    await callback.answer()
+
+
+@router.inline_query()
+async def inline_lookup(query: InlineQuery, locale: str, config: BotConfig):
+    """Поиск урока в inline-режиме (@bot async) для отправки в другой чат"""
+    # Ответ зависит от языка пользователя, поэтому Telegram кэширует его для каждого отдельно
+    await query.answer(
+        list(inline_results(normalize_query(query.query), locale)),
+        cache_time=config.inline_cache_time,
+        is_personal=True,
+    )
 
-    if text in responses:
-        await message.answer(responses[text], parse_mode="HTML")
+
+@router.errors()
+async def handle_errors(event: ErrorEvent):
+    """Залогировать ошибку, не показывая пользователю текст исключения"""
+    logging.exception("Ошибка при обработке обновления %s", event.update.update_id, exc_info=event.exception)
+    callback = event.update.callback_query
+    if callback:
+        await callback.answer(i18n.text(await user_locale(callback.from_user), "messages.error"))
+
+
+@router.message(Command("language"))
+async def language_command(message: Message, locale: str):
+    """Выбор языка интерфейса"""
+    await message.answer(
+        i18n.text(locale, "language.choose"),
+        parse_mode="HTML",
+        reply_markup=create_language_keyboard()
+    )
+
+
+def format_rejection(rejection: Rejection, locale: str = DEFAULT_LOCALE) -> str:
+    """Причина, по которой код не отправлен в песочницу"""
+    text = i18n.text(
+        locale, f"sandbox.rejected.{rejection.reason}", line=rejection.line, detail=escape_html(rejection.detail)
+    )
+    if rejection.reason == "syntax":
+        # Строка с ошибкой и указатель на место ошибки
+        text += f"<pre>{escape_html(rejection.detail)}</pre>"
+    return text
+
+
+def format_run_result(result: RunResult, locale: str = DEFAULT_LOCALE) -> List[str]:
+    """Ответ на запуск кода, разбитый на части по лимиту Telegram"""
+    if result.status == REJECTED:
+        return [format_rejection(result.rejection, locale)]
+    if result.status == TIMEOUT:
+        return [i18n.text(locale, "sandbox.timeout", seconds=f"{code_runner.sandbox.timeout:g}")]
+
+    blocks = []
+    if result.stdout:
+        blocks.append(i18n.text(locale, "sandbox.output") + f"<pre>{escape_html(result.stdout)}</pre>")
+    if result.status != OK:
+        blocks.append(i18n.text(locale, "sandbox.error") + f"<pre>{escape_html(result.stderr)}</pre>")
+    elif not result.stdout:
+        blocks.append(i18n.text(locale, "sandbox.no_output"))
+    if result.truncated:
+        blocks.append(i18n.text(locale, "sandbox.truncated"))
+    return pack_html_blocks(blocks)
+
+
+@router.message(Command("run"))
+async def run_command(message: Message, config: BotConfig, locale: str):
+    """Выполнить код после команды или из сообщения, на которое она отвечает.
+
+    Без изоляции песочницы (bubblewrap) код видит файлы и сеть хоста,
+    поэтому тогда команда доступна только администраторам.
+    """
+    if not code_runner.sandbox.isolated and message.from_user.id not in config.admin_ids:
+        return
+
+    command = message.text.split(maxsplit=1)
+    reply = message.reply_to_message
+    if len(command) > 1:
+        source = command[1]
+    elif reply and reply.text:
+        source = reply.text
     else:
-        await message.answer(
-            "🤔 Я не совсем понял ваш вопрос.\n"
-            "Используй кнопки меню или напиши 'help' для помощи.",
-            parse_mode="HTML"
+        await message.answer(i18n.text(locale, "sandbox.usage"), parse_mode="HTML")
+        return
+
+    result = await code_runner.run(source)
+    for part in format_run_result(result, locale):
+        await message.answer(part, parse_mode="HTML")
+
+
+@router.message(Command("sandbox"))
+async def sandbox_command(message: Message, config: BotConfig, locale: str):
+    """Статистика предварительной проверки кода (только для администраторов)"""
+    if message.from_user.id not in config.admin_ids:
+        return
+
+    stats, grading_stats, image_stats = code_runner.stats(), grader.stats(), get_tenant().code_images.stats()
+    reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(stats["rejected_by_reason"].items()))
+    await message.answer(
+        i18n.text(
+            locale, "admin.sandbox",
+            checked=stats["checked"], rejected=stats["rejected"], reasons=f" ({reasons})" if reasons else "",
+            precheck_ms=stats["precheck_avg"] * 1000, sandbox_runs=stats["sandbox_runs"],
+            sandbox_ms=stats["sandbox_avg"] * 1000, saved=stats["saved"],
+            workers=grading_stats["workers"], queued=grading_stats["queued"], grading=grading_stats["grading"],
+            graded=grading_stats["graded"], grading_ms=grading_stats["grading_avg"] * 1000, busy=grading_stats["busy"],
+            images=i18n.text(locale, "admin.images_on" if image_stats["enabled"] else "admin.images_off"),
+            rendered=image_stats["rendered"], render_ms=image_stats["render_avg"] * 1000,
+            uploaded=image_stats["uploaded"], hits=image_stats["hits"],
+        ),
+        parse_mode="HTML",
+    )
+
+
+@router.message(Command("top"))
+async def top_command(message: Message, locale: str):
+    """Команда рейтинга по тестам"""
+    await message.answer(format_leaderboard(message.from_user.id, locale=locale), parse_mode="HTML")
+
+
+@router.message(Command("jobs"))
+async def jobs_command(message: Message, config: BotConfig, scheduler: JobScheduler, locale: str):
+    """Состояние фоновых задач (только для администраторов)"""
+    if message.from_user.id not in config.admin_ids:
+        return
+
+    stats = scheduler.stats()
+    text = i18n.text(
+        locale, "admin.jobs",
+        lag_ms=stats["lag_last"] * 1000, lag_avg_ms=stats["lag_avg"] * 1000, lag_max_ms=stats["lag_max"] * 1000,
+    )
+    time_format = i18n.text(locale, "admin.job_time_format")
+    for name, job in stats["jobs"].items():
+        text += i18n.text(
+            locale, "admin.job",
+            name=escape_html(name), trigger=escape_html(job["trigger"]),
+            next_run=job["next_run"].strftime(time_format) if job["next_run"] else "-",
+            status=job["last_status"] or "-", duration_ms=job["last_duration"] * 1000,
+            runs=job["runs"], failures=job["failures"], skipped=job["skipped"],
         )
+    await message.answer(text, parse_mode="HTML")
+
+
+@router.message(Command("lessons"))
+async def lessons_command(message: Message, config: BotConfig, locale: str):
+    """Проверка примеров кода и длины страниц уроков (только для администраторов).
+
+    /lessons - компиляция и длина, /lessons run - еще и запуск примеров в песочнице,
+    /lessons all - заново все страницы, а не только изменившиеся.
+    """
+    if message.from_user.id not in config.admin_ids:
+        return
+
+    options = set((message.text.split(maxsplit=1)[1:] or [""])[0].split())
+    lesson_validator.workers = config.worker_count
+    report = await lesson_validator.validate(run="run" in options, force="all" in options)
+    title = i18n.text(locale, "admin.lessons_ok" if report.ok else "admin.lessons_failed")
+    for part in split_html(f"<b>{title}</b>\n\n<pre>{escape_html(report.format())}</pre>"):
+        await message.answer(part, parse_mode="HTML")
 
 
 @router.message(Command("help"))
-async def help_command(message: Message):
+async def help_command(message: Message, locale: str):
     """Команда помощи"""
-    help_text = (
-        "<b>📋 Помощь по командам:</b>\n\n"
-        "/start - Начать работу с ботом\n"
-        "/help - Эта справка\n\n"
-        "<b>Основные функции:</b>\n"
-        "• 📚 Темы обучения - изучение Python от основ до продвинутых тем\n"
-        "• 💻 Пример кода - примеры кода для каждой темы\n"
-        "• ❓ Задать вопрос - получить помощь по Python\n"
-        "• 📊 Мой прогресс - отслеживать прогресс обучения\n"
-        "• 📥 Установка Python - инструкция по установке\n\n"
-        "<b>Темы обучения:</b>\n"
-        "• Основы Python - переменные, типы данных, функции\n"
-        "• Синтаксис - современные возможности Python\n"
-        "• ООП - объектно-ориентированное программирование\n"
-        "• Файлы - работа с файлами и данными\n"
-        "• Фреймворки - Flask, Django, FastAPI\n"
-        "• Инструменты - pip, git, виртуальные окружения\n"
-        "• Data Science - NumPy, Pandas, машинное обучение\n"
-        "• Асинхронность - async/await, asyncio\n\n"
-        "<i>Используй кнопки для удобной навигации! 🚀</i>"
-    )
+    await message.answer(i18n.text(locale, "messages.help"), parse_mode="HTML")
 
-    await message.answer(help_text, parse_mode="HTML")
+
+async def send_lesson(message: Message, topic: LessonTopic, locale: str):
+    """Отправить первую страницу урока новым сообщением"""
+    parts = lesson_manager.render_page(topic, 0, locale)
+    keyboard = create_lesson_navigation(topic, 0, lesson_manager.get_total_pages(topic), 0, len(parts), locale)
+    await message.answer(parts[0], parse_mode="HTML", reply_markup=keyboard)
+
+
+# Перехватывает любой текст, поэтому регистрируется последним: команды - выше
+@router.message(F.text)
+async def handle_text_message(message: Message, state: FSMContext, locale: str):
+    """Обработка текстовых сообщений: ответ, урок или вопрос по распознанному намерению"""
+    intent, confidence = intent_classifier.classify(message.text)
+    logging.debug("Намерение %s (%.2f)", intent, confidence)
+    group, _, name = (intent or "").partition(".")
+
+    if group == "topic":
+        await send_lesson(message, LessonTopic(name), locale)
+    elif intent == "action.question":
+        await ask_question(message, state, locale)
+    elif intent == "action.code":
+        await show_code_examples(message, state, locale)
+    elif intent == "action.progress":
+        await show_progress(message, locale)
+    else:
+        # Ответ на языке пользователя, даже если фраза была на другом
+        await message.answer(i18n.text(locale, intent or "smalltalk.unknown"), parse_mode="HTML")
+
+
+BOT_COMMANDS = ("start", "help", "top", "language")
 
 
 async def set_bot_commands(bot: Bot):
-    """Установить команды бота"""
-    commands = [
-        BotCommand(command="start", description="🚀 Начать работу с ботом"),
-        BotCommand(command="help", description="📋 Помощь и справка"),
-    ]
-    await bot.set_my_commands(commands)
+    """Установить команды бота: язык по умолчанию и отдельно каждый перевод"""
+    await asyncio.gather(*(
+        bot.set_my_commands(
+            [BotCommand(command=name, description=i18n.text(locale, f"commands.{name}")) for name in BOT_COMMANDS],
+            language_code=None if locale == i18n.default else locale,
+        )
+        for locale in i18n.locales
+    ))
+
+
+def tenant_webhook_path(config: BotConfig, tenant: Tenant) -> str:
+    """Путь webhook бота: основной бот - webhook_path, остальные - webhook_path/<имя>"""
+    if tenant is default_tenant:
+        return config.webhook_path
+    return f"{config.webhook_path.rstrip('/')}/{tenant.name}"
+
+
+async def run_webhook(dp: Dispatcher, bots: Dict[str, Bot], config: BotConfig):
+    """Принимать обновления через webhook до сигнала остановки; bots - путь -> бот"""
+    from aiohttp import web
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+    app = web.Application()
+    for path, bot in bots.items():
+        handler = SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=config.webhook_secret)
+        # Маршрут без handler.register(): сессию бота закрывает процедура остановки, а не aiohttp
+        app.router.add_route("POST", path, handler.handle)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, config.webhook_host, config.webhook_port).start()
+    await asyncio.gather(*(
+        bot.set_webhook(
+            config.webhook_url.rstrip("/") + path,
+            secret_token=config.webhook_secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        for path, bot in bots.items()
+    ))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        # Перестаем принимать запросы; принятые обновления дорабатывают в фоне
+        await runner.cleanup()
 
 
-async def main():
-    """Основная функция запуска бота"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+def create_tenants(config: BotConfig, extra: List[TenantConfig]) -> List[Tenant]:
+    """Основной бот и боты из TENANTS_FILE, у каждого свое хранилище"""
+    default_tenant.db = create_repository(config)
+    tenants = [default_tenant]
+    for tenant in extra:
+        database = config.model_copy(update={"database_path": tenant.database_path, "database_url": tenant.database_url})
+        tenants.append(Tenant(tenant.name, create_repository(database), tenant.locale))
+    return tenants
 
-    # Загрузка конфигурации
-    env_config = dotenv_values(".env")
-    token = env_config.get("BOT_TOKEN")
 
-    if not token:
-        logging.error("Токен бота не найден. Создайте файл .env с BOT_TOKEN=ваш_токен")
+async def main():
+    """Основная функция запуска бота"""
+    # Загрузка конфигурации: .env и переменные окружения, один раз
+    try:
+        config = load_settings()
+        extra_tenants = load_tenants(config)
+    except (ValidationError, ValueError, OSError) as e:
+        logging.basicConfig(level=logging.INFO, format=CONSOLE_FORMAT)
+        logging.error("Некорректная конфигурация. Создайте файл .env с BOT_TOKEN=ваш_токен\n%s", e)
         return
 
-    config = BotConfig(
-        token=token,
-        debug=env_config.get("DEBUG", "false").lower() == "true"
+    # Запись логов уходит в отдельный поток, event loop только кладет их в очередь
+    log_listener = setup_logging(
+        config.log_level, config.log_dir, config.log_max_bytes, config.log_backup_count
     )
+    tenants = create_tenants(config, extra_tenants)
+
+    # Создание ботов: одна HTTP-сессия и пул соединений на всех
+    session = create_session(config)
+    bot_defaults = DefaultBotProperties(parse_mode=ParseMode.HTML)
+    bots = [
+        Bot(token=token, session=session, default=bot_defaults)
+        for token in [config.token] + [tenant.token for tenant in extra_tenants]
+    ]
+    tenant_middleware = TenantMiddleware(default_tenant)
+    for tenant, bot in zip(tenants, bots):
+        tenant_middleware.register(bot, tenant)
+
+    # Задачи всех ботов в одном планировщике; состояние хранится в базе основного
+    scheduler = JobScheduler(store=default_tenant.db)
+    flush_jobs = []
+    for tenant in tenants:
+        flush_jobs.append(scheduler.add_job(
+            tenant.job_name("quiz_scores_flush"), partial(flush_quiz_scores, tenant),
+            IntervalTrigger(config.quiz_flush_interval), timeout=30, jitter=1.0
+        ))
+        flush_jobs.append(scheduler.add_job(
+            tenant.job_name("users_flush"), partial(flush_users, tenant),
+            IntervalTrigger(config.quiz_flush_interval), timeout=30, jitter=1.0
+        ))
+        scheduler.add_job(
+            tenant.job_name("db_optimize"), tenant.db.optimize,
+            CronTrigger("30 4 * * *"), timeout=300, jitter=600
+        )
+        if isinstance(tenant.db, SQLiteRepository):
+            # PostgreSQL резервируется своими средствами (pg_dump, реплики)
+            backup_dir = Path(config.backup_dir)
+            if tenant is not default_tenant:
+                backup_dir /= tenant.name
+            backups = BackupManager(str(tenant.db.path), str(backup_dir), config.backup_keep)
+            scheduler.add_job(
+                tenant.job_name("db_backup"), backups.create,
+                CronTrigger(config.backup_cron), timeout=1800, jitter=600
+            )
+        scheduler.add_job(
+            tenant.job_name("db_vacuum"), partial(tenant.db.optimize, vacuum=True),
+            CronTrigger("0 5 * * 0"), timeout=1800, jitter=600
+        )
 
-    # Инициализация базы данных
-    await db_manager.init_db()
-
-    # Создание бота
-    bot = Bot(
-        token=config.token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    dp = Dispatcher(storage=MemoryStorage(), config=config, scheduler=scheduler)
+    drain = DrainMiddleware()
+    dp.update.outer_middleware(drain)
+    dp.update.outer_middleware(tenant_middleware)
+    log_context_middleware = LogContextMiddleware()
+    dp.update.outer_middleware(log_context_middleware)
+    dp.message.middleware(log_context_middleware)
+    dp.callback_query.middleware(log_context_middleware)
+    # Inline-запросы на каждое нажатие клавиши отсеиваются до антифлуда и очереди пользователя
+    debounce = DebounceMiddleware(config.inline_debounce, is_inline_query)
+    dp.update.outer_middleware(debounce)
+    throttling = ThrottlingMiddleware(config.throttle_rate, config.throttle_period, config.admin_ids)
+    dp.update.outer_middleware(throttling)
+    dp.update.outer_middleware(
+        UserSerializationMiddleware(config.max_concurrent_updates, is_navigation_update)
     )
-
-    dp = Dispatcher(storage=MemoryStorage())
     dp.include_router(router)
 
-    # Установка команд бота
-    await set_bot_commands(bot)
+    # БД, getMe (кэшируется в bot.me() и переиспользуется polling'ом),
+    # set_my_commands и обучение классификатора намерений не зависят друг
+    # от друга - выполняем их параллельно
+    intent_classifier.threshold = config.intent_threshold
+    await asyncio.gather(
+        *(tenant.prepare() for tenant in tenants),
+        *(bot.me() for bot in bots),
+        *(set_bot_commands(bot) for bot in bots),
+        asyncio.to_thread(intent_classifier.fit),
+    )
 
-    logging.info("🤖 Python Mentor Bot запущен!")
+    logging.info("🤖 Python Mentor Bot запущен! Ботов: %d", len(bots))
     print("=" * 50)
     print("Python Mentor Bot успешно запущен!")
     print("Бот готов к работе и ждет ваших вопросов!")
     print("=" * 50)
 
+    code_runner.sandbox.timeout = config.sandbox_timeout
+    code_runner.sandbox.memory_mb = config.sandbox_memory_mb
+    if not code_runner.sandbox.isolated:
+        logging.warning("bubblewrap не найден: песочница не изолирована, /run только для администраторов")
+    grader.workers = config.worker_count
+    # Пул рендеринга картинок общий, file_id у каждого бота свои
+    code_images = CodeImages(
+        workers=config.worker_count, theme=config.code_image_theme, min_lines=config.code_image_min_lines
+    )
+    if config.code_images:
+        code_images.start()
+    for tenant in tenants:
+        tenant.score_buffer.max_size = config.quiz_batch_size
+        tenant.user_cache.configure(config.cache_size, config.cache_ttl)
+        tenant.code_images = code_images.for_store(tenant.db)
+    await scheduler.start()
+    grader.start()
+    warm_up_task = asyncio.create_task(lesson_manager.warm_up())
+
+    # Напоминания о повторении: у каждого бота свой лимит отправки Telegram
+    review_limiters, review_schedulers = [], []
+    for tenant, bot in zip(tenants, bots):
+        review_limiters.append(srs.AsyncRateLimiter(config.review_send_rate))
+        review_schedulers.append(srs.ReviewScheduler(
+            tenant.db,
+            partial(send_review_reminder, tenant, bot),
+            review_limiters[-1],
+            batch_size=config.review_batch_size,
+        ))
+        tenant.review_scheduler = review_schedulers[-1]
+    review_tasks = [asyncio.create_task(review_scheduler.run()) for review_scheduler in review_schedulers]
+
+    async def drain_handlers() -> Dict[str, int]:
+        drained, cancelled = await drain.drain(config.shutdown_timeout * 0.6)
+        return {"drained": drained, "cancelled": cancelled, "rejected": drain.rejected}
+
+    async def stop_reviews():
+        tasks = [*review_tasks, warm_up_task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def flush_buffers() -> Dict[str, int]:
+        flushed = 0
+        for tenant in tenants:
+            try:
+                flushed += await flush_quiz_scores(tenant)
+            except Exception:
+                logging.exception("Не удалось сохранить результаты тестов бота %s при остановке", tenant.name)
+            try:
+                flushed += await flush_users(tenant)
+            except Exception:
+                logging.exception("Не удалось сохранить пользователей бота %s при остановке", tenant.name)
+        dropped = sum(len(tenant.score_buffer) + tenant.user_cache.unsaved for tenant in tenants)
+        return {"flushed": flushed, "dropped": dropped}
+
+    async def close_storage():
+        await asyncio.gather(*(tenant.db.close() for tenant in tenants))
+
+    # Порядок важен: обработчики -> фоновые задачи -> буферы -> соединения
+    shutdown = GracefulShutdown(config.shutdown_timeout)
+    shutdown.add_step("handlers", drain_handlers)
+    shutdown.add_step("reviews", stop_reviews, timeout=2)
+    shutdown.add_step("grader", grader.stop, timeout=2)
+    shutdown.add_step("code_images", code_images.stop, timeout=2)
+    shutdown.add_step("scheduler", partial(scheduler.stop, timeout=5), timeout=6)
+    shutdown.add_step("quiz_scores", flush_buffers, timeout=5)
+    shutdown.add_step("storage", close_storage, timeout=2)
+    shutdown.add_step("bot_session", session.close, timeout=2)
+
+    def apply_settings():
+        """Передать текущие значения настроек работающим компонентам"""
+        logging.getLogger().setLevel(config.log_level)
+        throttling.configure(config.throttle_rate, config.throttle_period)
+        for tenant in tenants:
+            tenant.score_buffer.max_size = config.quiz_batch_size
+            tenant.user_cache.configure(config.cache_size, config.cache_ttl)
+            tenant.code_images.theme = config.code_image_theme
+            tenant.code_images.min_lines = config.code_image_min_lines
+        for job in flush_jobs:
+            job.trigger.seconds = config.quiz_flush_interval
+        for review_scheduler in review_schedulers:
+            review_scheduler.batch_size = config.review_batch_size
+        for review_limiter in review_limiters:
+            review_limiter.rate = config.review_send_rate
+        shutdown.deadline = config.shutdown_timeout
+        intent_classifier.threshold = config.intent_threshold
+        debounce.delay = config.inline_debounce
+        code_runner.sandbox.timeout = config.sandbox_timeout
+
+    def handle_sighup():
+        """Перечитать некритичные настройки без перезапуска"""
+        try:
+            changed = reload_settings(config, load_settings())
+        except ValidationError as e:
+            logging.error("Новая конфигурация некорректна, оставлены прежние настройки\n%s", e)
+            return
+        apply_settings()
+        logging.info("Настройки перечитаны: %s", changed or "без изменений")
+
+    with suppress(NotImplementedError, AttributeError):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, handle_sighup)
+
     try:
-        await dp.start_polling(bot)
+        if config.use_webhook:
+            paths = {tenant_webhook_path(config, tenant): bot for tenant, bot in zip(tenants, bots)}
+            await run_webhook(dp, paths, config)
+        else:
+            # Сессию закрываем сами в конце остановки, чтобы обработчики успели ответить
+            await dp.start_polling(*bots, close_bot_session=False)
     finally:
-        await bot.session.close()
+        await shutdown.run()
+        log_listener.stop()
 
 
 if __name__ == "__main__":
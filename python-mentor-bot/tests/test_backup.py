@@ -0,0 +1,78 @@
+# tests/test_backup.py
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from bot.backup import BackupManager, main
+
+
+def make_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, username TEXT)")
+    conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def count_users(path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_snapshots_are_rotated(tmp_path):
+    """Тест: снимки сжимаются, сопровождаются контрольной суммой и ротируются."""
+    db = tmp_path / "bot.db"
+    make_db(db, [(i, f"user{i}") for i in range(1000)])
+    manager = BackupManager(str(db), str(tmp_path / "backups"), keep=2, pages=8, pause=0)
+
+    start = datetime(2025, 1, 1)
+    for day in range(3):
+        manager.create_sync(start + timedelta(days=day))
+
+    snapshots = manager.snapshots()
+    assert [s.name for s in snapshots] == ["bot-20250102-000000.db.gz", "bot-20250103-000000.db.gz"]
+    assert all(s.with_name(s.name + ".sha256").exists() for s in snapshots)
+    assert snapshots[-1].stat().st_size < db.stat().st_size
+
+
+def test_restore_validates_snapshot(tmp_path):
+    """Тест: восстановление возвращает данные и отвергает испорченный снимок."""
+    db = tmp_path / "bot.db"
+    make_db(db, [(1, "alice"), (2, "bob")])
+    manager = BackupManager(str(db), str(tmp_path / "backups"), pause=0)
+    snapshot = manager.create_sync(datetime(2025, 1, 1))
+
+    make_db(db, [(3, "eve")])
+    previous = manager.restore(snapshot)
+    assert count_users(db) == 2
+    assert previous is not None and previous.exists()
+
+    data = bytearray(snapshot.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    snapshot.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        manager.restore(snapshot)
+    assert count_users(db) == 2
+
+
+def test_cli_uses_bot_settings(tmp_path, monkeypatch):
+    """Тест: CLI берет БД, каталог и число снимков из настроек бота (.env и окружения)."""
+    make_db(tmp_path / "bot.db", [(1, "alice")])
+    (tmp_path / ".env").write_text("BOT_TOKEN=1:TEST\nDATABASE_PATH=bot.db\nBACKUP_KEEP=1\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    for name in ("BOT_TOKEN", "DATABASE_PATH", "BACKUP_KEEP"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("BACKUP_DIR", "snapshots")
+    monkeypatch.setattr(sys, "argv", ["backup", "create"])
+    main()
+    main()
+    assert [path.parent.name for path in (tmp_path / "snapshots").glob("bot-*.db.gz")] == ["snapshots"]
+
+    monkeypatch.setenv("BACKUP_KEEP", "0")
+    with pytest.raises(SystemExit):
+        main()
@@ -0,0 +1,30 @@
+# tests/test_callbacks.py
+from main import (
+    CodeCallback,
+    LessonManager,
+    LessonTopic,
+    MenuAction,
+    MenuCallback,
+    TopicCallback,
+    decode_callback,
+)
+
+
+def test_callback_roundtrip():
+    """Тест упаковки и разбора callback_data для всех страниц."""
+    for topic, lesson in LessonManager.lessons.items():
+        for page in range(len(lesson["content"])):
+            for codec in (TopicCallback, CodeCallback):
+                packed = codec(topic=topic, page=page).pack()
+                assert len(packed.encode()) <= 32
+                assert decode_callback(packed) == codec(topic=topic, page=page)
+
+    packed = MenuCallback(action=MenuAction.MAIN).pack()
+    assert decode_callback(packed) == MenuCallback(action=MenuAction.MAIN)
+
+
+def test_decode_invalid_callback():
+    """Тест отбрасывания некорректных callback_data."""
+    for data in (None, "", "topic:basics", "t:unknown:0:0", "t:basics:-1:0", "t:basics:x:0", "c:oop", "m:bogus", "z:1"):
+        assert decode_callback(data) is None
+    assert decode_callback(f"t:{LessonTopic.ASYNC.value}:0:0").topic is LessonTopic.ASYNC
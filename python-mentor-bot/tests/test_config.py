@@ -0,0 +1,47 @@
+# tests/test_config.py
+import pytest
+from pydantic import ValidationError
+
+from bot.config import load_settings, reload_settings
+
+
+def test_load_settings_from_environ():
+    """Тест: переменные окружения разбираются и приводятся к типам."""
+    config = load_settings(env_file=None, environ={
+        "BOT_TOKEN": "42:TEST",
+        "ADMIN_IDS": "1, 2,,3",
+        "DEBUG": "true",
+        "THROTTLE_RATE": "7",
+        "TZ": "UTC",
+        "LOG_LEVEL": "debug",
+    })
+    assert config.token == "42:TEST"
+    assert config.admin_ids == [1, 2, 3]
+    assert config.debug is True
+    assert config.throttle_rate == 7
+    assert config.timezone == "UTC"
+    assert config.log_level == "DEBUG"
+    assert not config.use_webhook
+
+
+def test_invalid_settings_rejected():
+    """Тест: без токена и с неверными значениями загрузка падает сразу."""
+    with pytest.raises(ValidationError):
+        load_settings(env_file=None, environ={})
+    with pytest.raises(ValidationError):
+        load_settings(env_file=None, environ={"BOT_TOKEN": "42:TEST", "THROTTLE_RATE": "0"})
+
+
+def test_reload_changes_only_reloadable_fields():
+    """Тест: перечитывание не трогает токен и режим работы."""
+    config = load_settings(env_file=None, environ={"BOT_TOKEN": "42:OLD"})
+    fresh = load_settings(env_file=None, environ={
+        "BOT_TOKEN": "42:NEW",
+        "WEBHOOK_URL": "https://example.org",
+        "THROTTLE_RATE": "3",
+    })
+    changed = reload_settings(config, fresh)
+    assert changed == {"throttle_rate": (10, 3)}
+    assert config.token == "42:OLD"
+    assert not config.use_webhook
+    assert config.throttle_rate == 3
@@ -0,0 +1,161 @@
+# tests/test_grader.py
+import asyncio
+
+import pytest
+
+from bot import grader as grading
+from bot.exercises import ExerciseBank, canonical
+from bot.sandbox import CodeRunner, Sandbox
+from main import format_grade_result
+
+AREA = {"basics": {0: {"task": "area", "cases": [("area(2, 3)", 6), ("area(1.5, 2)", 3.0)]}}}
+
+
+def make_grader(**kwargs) -> grading.Grader:
+    return grading.Grader(CodeRunner(Sandbox(timeout=3)), **kwargs)
+
+
+def test_bank_compiles_expected_values():
+    """Тест: ожидаемые значения хранятся канонической строкой, задание без тестов - ошибка."""
+    bank = ExerciseBank(AREA)
+    exercise = bank.get("basics", 0)
+    assert len(bank) == 1 and exercise.size == 2
+    assert exercise.expected == ("6", "3.0")
+    assert canonical({"b": 1, "a": "Ф"}) == '{"a": "Ф", "b": 1}'
+    assert bank.get("basics", 1) is None
+    with pytest.raises(ValueError):
+        ExerciseBank({"basics": {0: {"task": "", "cases": []}}})
+
+
+def test_all_exercises_have_cases():
+    """Тест: встроенные задания компилируются и у каждого есть тесты."""
+    bank = ExerciseBank()
+    assert len(bank) == len(bank.all()) > 0
+    assert all(exercise.size > 0 for exercise in bank.all())
+
+
+def test_grading_in_one_sandbox_run():
+    """Тест: верное, частично верное, падающее и отклоненное решения."""
+    grader = make_grader()
+    exercise = ExerciseBank(AREA).get("basics", 0)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                grader.grade(1, exercise, "def area(w, h):\n    print('debug')\n    return w * h"),
+                grader.grade(2, exercise, "def area(w, h):\n    return int(w * h)"),
+                grader.grade(3, exercise, "x = 1\nraise RuntimeError('boom')"),
+                grader.grade(4, exercise, "import os"),
+            )
+        finally:
+            await grader.stop()
+
+    solved, partial, crashed, rejected = asyncio.run(run())
+    assert solved.status == grading.GRADED and (solved.passed, solved.total) == (2, 2)
+    assert partial.status == grading.GRADED and partial.passed == 1
+    assert crashed.status == grading.CRASHED and crashed.line == 2 and "boom" in crashed.error
+    assert rejected.status == grading.REJECTED and rejected.rejection.reason == "import"
+    # Отклоненное решение в песочницу не попадает
+    assert grader.runner.sandbox_runs == 3 and grader.graded == 3
+
+
+def test_case_errors_and_timeouts():
+    """Тест: исключение и зависание в отдельном тесте не мешают остальным тестам."""
+    grader = make_grader(case_timeout=0.3)
+    exercise = ExerciseBank({"basics": {0: {"task": "", "cases": [
+        ("f(1)", 1), ("f(0)", 0), ("f(-1)", -1),
+    ]}}}).get("basics", 0)
+    source = (
+        "def f(x):\n"
+        "    if x == 0:\n"
+        "        raise ValueError('zero')\n"
+        "    while x < 0:\n"
+        "        x -= 1\n"
+        "    return x"
+    )
+
+    async def run():
+        try:
+            return await grader.grade(1, exercise, source)
+        finally:
+            await grader.stop()
+
+    result = asyncio.run(run())
+    assert [case.passed for case in result.cases] == [True, False, False]
+    assert result.cases[1].error == "ValueError: zero"
+    assert result.cases[2].error == "TimeoutError"
+
+
+def test_one_pending_solution_per_user_and_pool_bound():
+    """Тест: второе решение пользователя во время проверки - BUSY, воркеров не больше заданного."""
+    grader = make_grader(workers=1)
+    exercise = ExerciseBank(AREA).get("basics", 0)
+    slow = "import time\ntime.sleep(0.3)\ndef area(w, h):\n    return w * h"
+
+    async def run():
+        try:
+            first = asyncio.create_task(grader.grade(1, exercise, slow))
+            await asyncio.sleep(0)
+            second = await grader.grade(1, exercise, slow)
+            other = asyncio.create_task(grader.grade(2, exercise, slow))
+            await asyncio.sleep(0.1)
+            stats = grader.stats()
+            return await first, second, await other, stats
+        finally:
+            await grader.stop()
+
+    first, second, other, stats = asyncio.run(run())
+    assert first.passed == other.passed == 2
+    assert second.status == grading.BUSY
+    assert stats["workers"] == 1 and stats["grading"] == 1 and stats["queued"] == 1
+
+
+def test_format_grade_result():
+    """Тест: итог показывает номера непройденных тестов, но не их входные данные."""
+    result = grading.GradeResult(grading.GRADED, (
+        grading.CaseResult(True), grading.CaseResult(False), grading.CaseResult(False, "ZeroDivisionError: <x>"),
+    ))
+    text = format_grade_result(result, "en")
+    assert text.startswith("<b>🧪 Tests passed: 1 of 3</b>")
+    assert "❌ Test 2: wrong answer" in text and "Test 3: <code>ZeroDivisionError: &lt;x&gt;</code>" in text
+    assert "Fix your solution" in text
+    crashed = format_grade_result(grading.GradeResult(grading.CRASHED, error="NameError: x", line=4), "ru")
+    assert "строка 4" in crashed
+
+
+def test_solution_cannot_forge_report():
+    """Тест: подмена json.dumps и запись в stdout программы проверки не засчитывают тесты."""
+    grader = make_grader()
+    exercise = ExerciseBank(AREA).get("basics", 0)
+    forged = '{"cases": [{"value": "6"}, {"value": "3.0"}]}'
+    source = (
+        "import json, sys\n"
+        f"json.dumps = lambda *args, **kwargs: {forged!r}\n"
+        f"sys.__stdout__.write('0' * 64 + '\\n' + {forged!r})\n"
+        "sys.__stdout__.flush()\n"
+        "def area(w, h):\n"
+        "    return 0"
+    )
+    # Статическую проверку пропускаем: изоляция не должна на нее полагаться
+    result = asyncio.run(grader._run(exercise, source))
+    assert result.status == grading.GRADED and result.passed == 0
+
+
+def test_case_timeouts_fit_sandbox_timeout():
+    """Тест: при тестах дольше песочницы зависает только свой тест, а не вся проверка."""
+    grader = grading.Grader(CodeRunner(Sandbox(timeout=1.5)), case_timeout=1.0)
+    exercise = ExerciseBank({"basics": {0: {"task": "", "cases": [
+        ("f(1)", 1), ("f(-1)", -1), ("f(2)", 2),
+    ]}}}).get("basics", 0)
+    assert grader.budget(exercise) == pytest.approx(1 / 3)
+
+    async def run():
+        try:
+            return await grader.grade(1, exercise, "def f(x):\n    while x < 0:\n        pass\n    return x")
+        finally:
+            await grader.stop()
+
+    result = asyncio.run(run())
+    assert result.status == grading.GRADED
+    assert [case.passed for case in result.cases] == [True, False, True]
+    assert result.cases[1].error == "TimeoutError"
@@ -0,0 +1,103 @@
+# tests/test_i18n.py
+import asyncio
+import string
+from datetime import datetime
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message, Update, User
+
+from bot.i18n import Translator, flatten, load_catalogues
+from bot.storage import SQLiteRepository
+from main import LessonManager, LessonTopic, create_main_keyboard, default_tenant, i18n, router
+
+CATALOGUES = {
+    "ru": {"menu": {"topics": "📚 Темы"}, "messages": {"hi": "Привет, {name}", "bye": "Пока"}},
+    "en": {"menu": {"topics": "📚 Topics"}, "messages": {"hi": "Hi, {name}"}},
+}
+
+
+def test_missing_translation_falls_back_to_default():
+    """Тест: отсутствующий перевод и неизвестный язык берут строку языка по умолчанию."""
+    translator = Translator(CATALOGUES)
+    assert translator.text("en", "messages.hi", name="Ann") == "Hi, Ann"
+    assert translator.text("en", "messages.bye") == "Пока"
+    assert translator.text("de", "messages.hi", name="Ann") == "Привет, Ann"
+    assert translator.get("en", "messages.missing", "-") == "-"
+
+
+def test_resolve_language_code():
+    """Тест: language_code Telegram сводится к языку каталога."""
+    translator = Translator(CATALOGUES)
+    assert translator.resolve("en-US") == "en"
+    assert translator.resolve("EN") == "en"
+    assert translator.resolve("de") == "ru"
+    assert translator.resolve(None) == "ru"
+    assert translator.locales == ("ru", "en")
+
+
+def test_reverse_index_matches_every_locale():
+    """Тест: подпись кнопки на любом языке находит один и тот же ключ."""
+    translator = Translator(CATALOGUES)
+    assert translator.button("📚 Темы") == translator.button("📚 Topics") == "menu.topics"
+    assert translator.button("Пока") is None
+    assert translator.button(None) is None
+
+    with pytest.raises(ValueError):
+        Translator({"ru": {"menu": {"topics": "Темы", "code": "Код"}}, "en": {"menu": {"topics": "Код"}}})
+
+
+def test_shipped_catalogues_match_default():
+    """Тест: переводы не содержат лишних ключей и сохраняют подстановки."""
+    catalogues = load_catalogues()
+    base = flatten(catalogues["ru"])
+    fields = lambda text: sorted(name for _, name, _, _ in string.Formatter().parse(text) if name)
+    for locale, catalogue in catalogues.items():
+        for key, value in flatten(catalogue).items():
+            if key.startswith("lessons."):
+                continue
+            assert key in base, (locale, key)
+            if isinstance(value, str):
+                assert fields(value) == fields(base[key]), (locale, key)
+
+
+def test_pages_and_keyboards_cached_per_locale():
+    """Тест: страницы и клавиатуры рендерятся один раз на каждый язык."""
+    english = LessonManager.render_page(LessonTopic.BASICS, 0, "en")
+    assert english is LessonManager.render_page(LessonTopic.BASICS, 0, "en")
+    assert english != LessonManager.render_page(LessonTopic.BASICS, 0, "ru")
+    assert "Introduction to Python" in english[0]
+
+    keyboard = create_main_keyboard("es")
+    assert keyboard is create_main_keyboard("es")
+    assert keyboard.keyboard[0][0].text == i18n.text("es", "menu.topics")
+
+
+def test_menu_button_answers_in_user_language(tmp_path, monkeypatch):
+    """Тест: нажатие кнопки меню обрабатывается и отвечает на языке пользователя."""
+    sent = []
+    monkeypatch.setattr(default_tenant, "db", SQLiteRepository(str(tmp_path / "bot.db")))
+    asyncio.run(default_tenant.db.init_db())
+
+    class LocalSession(BaseSession):
+        async def make_request(self, bot, method, timeout=None):
+            sent.append(method.text)
+            return Message(message_id=2, date=datetime.now(), chat=Chat(id=100, type="private"), text=method.text)
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self):
+            pass
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    user = User(id=100, is_bot=False, first_name="Student", language_code="en-GB")
+    for text in ("📚 Темы обучения", "hola"):
+        update = Update(update_id=1, message=Message(
+            message_id=1, date=datetime.now(), chat=Chat(id=100, type="private"), from_user=user, text=text,
+        ))
+        asyncio.run(dp.feed_update(Bot(token="42:TEST", session=LocalSession()), update))
+
+    assert sent == [i18n.text("en", "messages.choose_topic"), i18n.text("en", "smalltalk.hello")]
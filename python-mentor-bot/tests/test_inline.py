@@ -0,0 +1,86 @@
+# tests/test_inline.py
+import asyncio
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import AnswerInlineQuery
+from aiogram.types import InlineQuery, User
+
+from bot.config import BotConfig
+from bot.search import SearchIndex, normalize_query
+from main import TELEGRAM_MESSAGE_LIMIT, LessonManager, LessonTopic, inline_lookup, inline_results, telegram_length
+
+DOCUMENTS = [
+    ("Асинхронное программирование", "async и await, корутины asyncio"),
+    ("Работа с файлами", "open, with и чтение файлов"),
+    ("Классы", "наследование и полиморфизм, async методы"),
+]
+
+
+def test_normalize_query():
+    """Тест: регистр, ё, пунктуация и пробелы не меняют ключ запроса."""
+    assert normalize_query("  Ёлка,   ASYNC!! ") == "елка async"
+    assert normalize_query("?!") == ""
+
+
+def test_prefix_fuzzy_and_all_words():
+    """Тест: слово ищется как префикс, с опечаткой - нечетко, все слова обязательны."""
+    index = SearchIndex(DOCUMENTS)
+    assert index.search("асинхр") == [0]
+    assert index.search("файлми") == [1]
+    # Слово заголовка весит больше слова текста
+    assert index.search("async") == [0, 2]
+    assert index.search("async наслед") == [2]
+    assert index.search("async файл") == []
+    assert index.search("") == [0, 1, 2]
+    assert index.search("", limit=1) == [0]
+
+
+def test_inline_results_cached_and_prerendered():
+    """Тест: статьи собираются из готового HTML страниц и кэшируются по запросу и языку."""
+    results = inline_results("asyncio", "ru")
+    assert results is inline_results("asyncio", "ru")
+    assert results[0].id == "async:0"
+    assert results[0].input_message_content.message_text == LessonManager.render_page(LessonTopic.ASYNC, 0, "ru")[0]
+    assert inline_results("poo", "es")[0].title == "Fundamentos de la POO"
+
+
+def test_multipart_page_shared_with_continuation_note(monkeypatch):
+    """Тест: от страницы из нескольких частей в чат уходит первая часть с пометкой о продолжении."""
+    first = "<b>Часть</b>\n" + "x" * (TELEGRAM_MESSAGE_LIMIT - 20)
+    monkeypatch.setattr(LessonManager, "render_page", lambda topic, page, locale: [first, "вторая", "третья"])
+    inline_results.cache_clear()
+    try:
+        text = inline_results("asyncio", "ru")[0].input_message_content.message_text
+    finally:
+        inline_results.cache_clear()
+    assert text.startswith("<b>Часть</b>\n") and "вторая" not in text
+    assert "Часть 1 из 3" in text
+    assert telegram_length(text) <= TELEGRAM_MESSAGE_LIMIT
+
+
+def test_inline_query_answered_personal_with_cache_time():
+    """Тест: inline-запрос отвечается статьями с cache_time из настроек и is_personal."""
+    answered = []
+
+    class LocalSession(BaseSession):
+        async def make_request(self, bot, method, timeout=None):
+            assert isinstance(method, AnswerInlineQuery)
+            answered.append(method)
+            return True
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self):
+            pass
+
+    bot = Bot(token="42:TEST", session=LocalSession())
+    user = User(id=100, is_bot=False, first_name="Student", language_code="en")
+    query = InlineQuery(id="q1", from_user=user, query="  Flask ", offset="").as_(bot)
+    asyncio.run(inline_lookup(query, locale="en", config=BotConfig(token="42:TEST", inline_cache_time=60)))
+
+    [method] = answered
+    assert method.cache_time == 60 and method.is_personal
+    assert [result.id for result in method.results] == [result.id for result in inline_results("flask", "en")]
+    assert method.results[0].title == "Flask - a microframework"
@@ -0,0 +1,78 @@
+# tests/test_intents.py
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from bot.i18n import load_catalogues
+from bot.intents import IntentClassifier, ngrams
+from main import LessonTopic, i18n, intent_classifier
+
+ROOT = Path(__file__).resolve().parent.parent
+ACTIONS = {"action.question", "action.code", "action.progress"}
+
+
+def test_ngrams_ignore_case_and_punctuation():
+    """Тест: регистр, ё и знаки препинания не меняют n-граммы."""
+    assert ngrams("Привет!!!") == ngrams("привет")
+    assert ngrams("Ёлка") == ngrams("елка")
+    assert ngrams("?!") == {}
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("привет!", "smalltalk.hello"),
+    ("Спасибо большое!!", "smalltalk.thanks"),
+    ("помоги с ооп", "topic.oop"),
+    ("расскажи про классы и наследование", "topic.oop"),
+    ("как установить питон", "topic.install"),
+    ("у меня ошибка в коде", "action.question"),
+    ("what is asyncio", "topic.async"),
+    ("hola, qué tal", "smalltalk.hello"),
+])
+def test_classify_known_intents(text, intent):
+    """Тест: фразы, отличающиеся от примеров, распознаются по близости."""
+    assert intent_classifier.classify(text)[0] == intent
+
+
+def test_unrelated_text_below_threshold():
+    """Тест: посторонний текст не проходит порог уверенности."""
+    for text in ("погода в москве", "асдфгх", "ok", ""):
+        intent, confidence = intent_classifier.classify(text)
+        assert intent is None and confidence < intent_classifier.threshold
+
+
+def test_every_intent_has_a_route():
+    """Тест: каждое намерение каталогов ведет к ответу, уроку или действию."""
+    for intent in IntentClassifier.from_catalogues(load_catalogues()).examples:
+        group, _, name = intent.partition(".")
+        if group == "topic":
+            assert LessonTopic(name)
+        elif group == "smalltalk":
+            assert i18n.get(i18n.default, intent)
+        else:
+            assert intent in ACTIONS
+
+
+def test_classification_is_fast():
+    """Тест: классификация сообщения занимает меньше миллисекунды."""
+    intent_classifier.classify("прогрев")
+    rounds = 500
+    started = time.perf_counter()
+    for _ in range(rounds):
+        intent_classifier.classify("расскажи пожалуйста про асинхронное программирование в python")
+    assert (time.perf_counter() - started) / rounds < 1e-3
+
+
+def test_empty_examples_rejected():
+    """Тест: обучение без примеров - ошибка."""
+    with pytest.raises(ValueError):
+        IntentClassifier({"smalltalk.hello": ["!!!"]}).fit()
+
+
+def test_numpy_is_not_imported_with_main():
+    """Тест: numpy загружается при обучении классификатора, а не при импорте main."""
+    code = "import sys, main; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "False"
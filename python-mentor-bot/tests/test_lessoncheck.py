@@ -0,0 +1,97 @@
+# tests/test_lessoncheck.py
+import asyncio
+import sys
+from enum import Enum
+
+from bot.lessoncheck import (
+    LENGTH, RUNTIME, SYNTAX, LessonValidator, check_block, visible_length,
+)
+from bot.sandbox import Sandbox
+
+
+class Topic(str, Enum):
+    A = "a"
+    B = "b"
+
+
+class FakeLessons:
+    """Уроки с рендерингом без разметки: страница - объяснение, пример - код"""
+
+    def __init__(self):
+        self.lessons = {
+            Topic.A: {"content": [
+                {"explanation": "ok", "example_code": "print(sum(range(10)))"},
+                {"explanation": "x" * 5000},
+            ]},
+            Topic.B: {"content": [{"explanation": "ok", "example_code": "def broken(:\n    pass"}]},
+        }
+
+    def get_topic_content(self, topic, page, locale="ru"):
+        return self.lessons[topic]["content"][page]
+
+    def render_page(self, topic, page, locale="ru"):
+        return [self.get_topic_content(topic, page)["explanation"]]
+
+    def render_code(self, topic, page, locale="ru"):
+        return [f"<pre>{self.get_topic_content(topic, page)['example_code']}</pre>"]
+
+
+def test_check_block():
+    """Тест: синтаксис, сторонние пакеты и input() распознаются без запуска."""
+    assert check_block("print(1)").error == "" and check_block("print(1)").skip == ""
+    error = check_block("x = 1\nreturn x")
+    assert error.error and error.line == 2
+    assert check_block("import numpy as np\nimport os").skip == "нужны numpy"
+    assert check_block("from flask import Flask").skip == "нужны flask"
+    assert check_block("name = input()").skip == "ждет ввода"
+    assert visible_length("<b>Привет</b> &amp; 👋") == 11
+
+
+def test_incremental_validation():
+    """Тест: повторная проверка проходит только по изменившимся страницам."""
+    lessons = FakeLessons()
+    validator = LessonValidator(lessons, ["ru", "en"], workers=2)
+
+    first = asyncio.run(validator.validate())
+    assert (first.pages, first.checked, first.compiled, first.executed) == (3, 3, 2, 0)
+    assert sorted((issue.topic, issue.page, issue.kind) for issue in first.issues) == [
+        ("a", 1, LENGTH), ("a", 1, LENGTH), ("b", 0, SYNTAX),
+    ]
+
+    second = asyncio.run(validator.validate())
+    assert second.checked == 0 and second.issues == first.issues
+
+    lessons.lessons[Topic.B]["content"][0]["example_code"] = "def fixed():\n    pass"
+    third = asyncio.run(validator.validate())
+    assert third.checked == 1 and len(third.issues) == 2
+    assert asyncio.run(validator.validate(force=True)).checked == 3
+
+
+def test_run_in_sandbox_and_persist(tmp_path):
+    """Тест: примеры выполняются в песочнице, результаты переживают перезапуск."""
+    lessons = FakeLessons()
+    lessons.lessons[Topic.A]["content"][0]["example_code"] = "print(1 / 0)"
+    validator = LessonValidator(lessons, ["ru"], Sandbox(timeout=5))
+    report = asyncio.run(validator.validate(run=True))
+    runtime = [issue for issue in report.issues if issue.kind == RUNTIME]
+    assert report.executed == 1 and "ZeroDivisionError" in runtime[0].detail
+
+    validator.save(tmp_path / "check.json")
+    restored = LessonValidator(lessons, ["ru"], Sandbox(timeout=5))
+    restored.load(tmp_path / "check.json")
+    again = asyncio.run(restored.validate(run=True))
+    assert again.checked == 0 and again.issues == report.issues
+
+
+def test_blocks_compiled_by_target_interpreter(tmp_path):
+    """Тест: примеры компилирует интерпретатор из --python, а не интерпретатор бота."""
+    log = tmp_path / "calls.log"
+    python = tmp_path / "python"
+    python.write_text(f'#!/bin/sh\necho "$@" >> {log}\nexec {sys.executable} "$@"\n')
+    python.chmod(0o755)
+    validator = LessonValidator(FakeLessons(), ["ru"], Sandbox(python=str(python)), workers=2)
+
+    report = asyncio.run(validator.validate())
+    assert report.compiled == 2 and [issue.kind for issue in report.issues if issue.kind == SYNTAX] == [SYNTAX]
+    calls = log.read_text().splitlines()
+    assert len(calls) == 2 and all("--check-blocks" in call for call in calls)
@@ -0,0 +1,73 @@
+# tests/test_logging.py
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Chat, Message, Update, User
+
+from bot.log import SamplingFilter, setup_logging
+from bot.middlewares import LogContextMiddleware
+
+
+def make_record(msg: str = "Ошибка %s", level: int = logging.ERROR) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, msg, ("x",), None)
+
+
+def test_sampling_filter_limits_repeated_errors():
+    """Тест: одинаковые ошибки пропускаются пачкой burst, остальные считаются."""
+    sampling = SamplingFilter(burst=2, period=0.05)
+    passed = [sampling.filter(make_record()) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert sampling.filter(make_record("Другая ошибка"))
+    assert sampling.filter(make_record(level=logging.INFO))
+
+    time.sleep(0.06)
+    record = make_record()
+    assert sampling.filter(record)
+    assert record.suppressed == 3
+
+
+def test_json_log_with_update_context(tmp_path):
+    """Тест: запись из обработчика попадает в файл JSON с контекстом обновления."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    listener = setup_logging("INFO", str(tmp_path))
+
+    router = Router()
+
+    @router.message()
+    async def lesson_handler(message: Message):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("bot").exception("Не удалось показать урок %s", "basics")
+
+    dp = Dispatcher()
+    middleware = LogContextMiddleware()
+    dp.update.outer_middleware(middleware)
+    dp.message.middleware(middleware)
+    dp.include_router(router)
+
+    update = Update(update_id=7, message=Message(
+        message_id=1, date=datetime.now(), chat=Chat(id=100, type="private"),
+        from_user=User(id=100, is_bot=False, first_name="Student"), text="hi",
+    ))
+    try:
+        asyncio.run(dp.feed_update(Bot(token="42:TEST"), update))
+    finally:
+        listener.stop()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+
+    entries = [json.loads(line) for line in (tmp_path / "bot.log").read_text(encoding="utf-8").splitlines()]
+    entry = next(e for e in entries if e["logger"] == "bot")
+    assert entry["msg"] == "Не удалось показать урок basics"
+    assert entry["level"] == "ERROR"
+    assert (entry["update_id"], entry["user_id"], entry["handler"]) == (7, 100, "lesson_handler")
+    assert "ValueError: boom" in entry["exc"]
@@ -21,4 +21,12 @@ def test_validate_markdown():
     """Тест валидации Markdown."""
     assert validate_markdown("**правильно**")[0] == True
     assert validate_markdown("**неправильно")[0] == False
-    assert "Непарные **" in validate_markdown("**неправильно")[1]
\ No newline at end of file
+    assert "Непарные **" in validate_markdown("**неправильно")[1]
+
+def test_markdown_escaping_and_nesting():
+    """Тест экранирования HTML и вложенной разметки."""
+    assert markdown_to_html("a < b && *c **d***") == "a &lt; b &amp;&amp; <i>c <b>d</b></i>"
+    assert markdown_to_html("`<tag>`") == "<code>&lt;tag&gt;</code>"
+    assert markdown_to_html("\\*не курсив\\*") == "*не курсив*"
+    assert markdown_to_html("**незакрытый") == "**незакрытый"
+    assert validate_markdown("```python\nprint()")[0] == False
@@ -0,0 +1,108 @@
+# tests/test_middlewares.py
+import asyncio
+
+from aiogram.types import User
+
+from bot.middlewares import DebounceMiddleware, ThrottlingMiddleware, UserSerializationMiddleware
+
+
+def make_data(user_id: int) -> dict:
+    return {"event_from_user": User(id=user_id, is_bot=False, first_name="Test")}
+
+
+def test_updates_of_one_user_are_serialised_and_collapsed():
+    """Тест: обновления пользователя идут по очереди, лишняя навигация схлопывается."""
+    middleware = UserSerializationMiddleware(is_collapsible=lambda event: event.startswith("nav"))
+    processed = []
+    running = 0
+
+    async def handler(event, data):
+        nonlocal running
+        running += 1
+        assert running == 1
+        await asyncio.sleep(0.01)
+        processed.append(event)
+        running -= 1
+
+    async def run():
+        events = ["nav-1", "nav-2", "text", "nav-3"]
+        await asyncio.gather(*(middleware(handler, event, make_data(1)) for event in events))
+
+    asyncio.run(run())
+
+    assert processed == ["nav-1", "text", "nav-3"]
+    assert middleware.collapsed == 1
+    assert middleware.active_users == 0
+
+
+def test_global_concurrency_cap():
+    """Тест ограничения общего числа одновременно выполняемых обработчиков."""
+    middleware = UserSerializationMiddleware(max_concurrent=2)
+    peak = 0
+
+    async def handler(event, data):
+        nonlocal peak
+        peak = max(peak, middleware.in_flight)
+        await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(middleware(handler, user_id, make_data(user_id)) for user_id in range(10)))
+
+    asyncio.run(run())
+
+    assert peak == 2
+    assert middleware.active_users == 0
+
+
+def test_throttling_sliding_window():
+    """Тест скользящего окна антифлуда и очистки неактивных пользователей."""
+    middleware = ThrottlingMiddleware(rate=3, period=1.0)
+
+    assert [middleware.hit(1, now) for now in (10.0, 10.1, 10.2, 10.3)] == [True, True, True, False]
+    assert middleware.hit(1, 11.05) is True
+    assert middleware.hit(1, 11.06) is False
+    assert middleware.hit(2, 11.07) is True
+
+    middleware.hit(3, 20.0)
+    assert middleware.active_users == 1
+
+
+def test_throttling_exempts_admins():
+    """Тест: администраторы не ограничиваются."""
+    middleware = ThrottlingMiddleware(rate=1, period=60.0, exempt_ids=[42])
+    calls = []
+
+    async def handler(event, data):
+        calls.append(event)
+
+    async def run():
+        for event in range(3):
+            await middleware(handler, event, make_data(42))
+            await middleware(handler, -event, make_data(7))
+
+    asyncio.run(run())
+
+    assert calls == [0, 0, 1, 2]
+    assert middleware.throttled == 2
+
+
+def test_debounce_keeps_last_update_of_each_user():
+    """Тест: из серии частых обновлений пользователя обрабатывается только последнее."""
+    middleware = DebounceMiddleware(delay=0.02, applies_to=lambda event: event != "message")
+    processed = []
+
+    async def handler(event, data):
+        processed.append(event)
+
+    async def run():
+        tasks = []
+        for user_id, event in [(1, "a"), (1, "as"), (2, "py"), (1, "message"), (1, "asy")]:
+            tasks.append(asyncio.create_task(middleware(handler, event, make_data(user_id))))
+            await asyncio.sleep(0.001)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert sorted(processed) == ["asy", "message", "py"]
+    assert middleware.debounced == 2
+    assert middleware.pending_users == 0
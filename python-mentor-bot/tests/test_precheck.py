@@ -0,0 +1,110 @@
+# tests/test_precheck.py
+import asyncio
+
+import pytest
+
+from bot.precheck import PrecheckLimits, precheck
+from bot.sandbox import ERROR, OK, REJECTED, TIMEOUT, CodeRunner, Sandbox
+from main import format_run_result
+
+
+@pytest.mark.parametrize("source", [
+    "print('Привет')",
+    "while True:\n    line = input()\n    if not line:\n        break",
+    "def wait():\n    while 1:\n        return 42",
+    "while True:\n    for i in range(3):\n        pass\n    else:\n        break",
+    "import math\nfrom collections import Counter",
+])
+def test_viable_code_passes(source):
+    """Тест: обычный код, циклы с выходом и разрешенные импорты проходят проверку."""
+    assert precheck(source) is None
+
+
+@pytest.mark.parametrize("source, reason, line, detail", [
+    ("", "empty", None, ""),
+    ("x = 1\nwhile True:\n    x += 1", "loop", 2, ""),
+    ("while True:\n    for i in range(3):\n        break", "loop", 1, ""),
+    ("import os", "import", 1, "os"),
+    ("x = 1\nfrom subprocess import run", "import", 2, "subprocess"),
+    ("print(open('/etc/passwd').read())", "name", 1, "open"),
+    ("().__class__.__base__.__subclasses__()", "name", 1, "__subclasses__"),
+])
+def test_rejections(source, reason, line, detail):
+    """Тест: пустой код, бесконечный цикл и запрещенные модули отклоняются с номером строки."""
+    rejection = precheck(source)
+    assert (rejection.reason, rejection.line, rejection.detail) == (reason, line, detail)
+
+
+def test_syntax_error_marker():
+    """Тест: синтаксическая ошибка возвращается со строкой кода и указателем."""
+    rejection = precheck("x = 1\nprint(x +)")
+    assert rejection.reason == "syntax" and rejection.line == 2
+    assert rejection.detail.splitlines()[:2] == ["2 | print(x +)", "  |          ^"]
+
+
+def test_size_and_complexity_limits():
+    """Тест: ограничения длины, числа строк, узлов и вложенности."""
+    limits = PrecheckLimits(max_chars=100, max_lines=3, max_nodes=20, max_depth=2)
+    assert precheck("x = 1" * 30, limits).reason == "size"
+    assert precheck("x = 1\n" * 5, limits).reason == "lines"
+    assert precheck("x = " + "+".join("123456789"), limits).reason == "complexity"
+    nested = "if a:\n if b:\n  if c: pass"
+    assert precheck(nested, limits) == ("complexity", 3, "2")
+
+
+def test_runner_skips_sandbox_for_rejected_code():
+    """Тест: отклоненный код не запускается, запущенный код возвращает вывод и ошибки."""
+    runner = CodeRunner(Sandbox(timeout=2))
+
+    async def run():
+        return [
+            await runner.run("print(1 +"),
+            await runner.run("while True:\n    pass"),
+            await runner.run("print(input() * 2)", stdin="ab\n"),
+            await runner.run("1 / 0"),
+        ]
+
+    syntax, loop, echo, failure = asyncio.run(run())
+    assert syntax.status == loop.status == REJECTED
+    assert echo.status == OK and echo.stdout == "abab\n"
+    assert failure.status == ERROR and 'File "main.py", line 1' in failure.stderr
+    stats = runner.stats()
+    assert stats["checked"] == 4 and stats["rejected"] == 2 and stats["sandbox_runs"] == 2
+    assert stats["rejected_by_reason"] == {"syntax": 1, "loop": 1}
+
+
+def test_sandbox_stops_endless_output_and_timeout():
+    """Тест: бесконечный вывод обрезается сразу, долгий код снимается по таймауту."""
+    sandbox = Sandbox(timeout=0.5, output_limit=1000)
+
+    async def run():
+        return await asyncio.gather(
+            sandbox.run("while 1:\n    print('x' * 100)\n    if False:\n        break"),
+            sandbox.run("import time\ntime.sleep(5)"),
+        )
+
+    flood, slow = asyncio.run(run())
+    assert flood.status == OK and flood.truncated and len(flood.stdout) == 1000
+    assert slow.status == TIMEOUT
+
+
+def test_format_run_result():
+    """Тест: синтаксическая ошибка показывается с указателем, вывод экранируется."""
+    runner = CodeRunner(Sandbox())
+    [syntax] = format_run_result(asyncio.run(runner.run("print(1 +")), "en")
+    assert syntax.startswith("<b>❌ Syntax error on line 1:</b>") and "<pre>1 | print(1 +" in syntax
+    [output] = format_run_result(asyncio.run(runner.run("print('<b>')")), "ru")
+    assert "<pre>&lt;b&gt;\n</pre>" in output
+
+
+def test_jail_command_hides_network_and_host_files(tmp_path):
+    """Тест: в bubblewrap нет сети, каталог запуска один, системные каталоги только на чтение."""
+    assert not Sandbox(jail=None).isolated
+    assert Sandbox(jail=None).command(str(tmp_path))[1:] == ["-I", "-B", "main.py"]
+
+    command = Sandbox(jail="/usr/bin/bwrap").command(str(tmp_path))
+    assert command[:2] == ["/usr/bin/bwrap", "--unshare-all"] and command[-3:] == ["-I", "-B", "main.py"]
+    binds = [command[i + 1:i + 3] for i, arg in enumerate(command) if arg == "--bind"]
+    assert binds == [[str(tmp_path), "/sandbox"]]
+    assert ["--uid", "65534"] == command[command.index("--uid"):command.index("--uid") + 2]
+    assert "--clearenv" in command and "--share-net" not in command
@@ -0,0 +1,107 @@
+# tests/test_quiz.py
+import asyncio
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message, Update, User
+
+from bot.quiz import Leaderboard, QuizBank, ScoreBuffer, default_question_banks, question_banks
+from bot.storage import SQLiteRepository
+from main import default_tenant, format_leaderboard, i18n, router
+
+QUESTION_BANKS = default_question_banks()
+
+
+def test_quiz_bank_compiles_shuffled_answers():
+    """Тест: ответы перемешаны один раз, правильный находится за O(1)."""
+    bank = QuizBank(QUESTION_BANKS)
+
+    for topic, items in QUESTION_BANKS.items():
+        assert bank.size(topic) == len(items)
+        for index, item in enumerate(items):
+            question = bank.get(topic, index)
+            assert sorted(question.options) == sorted(item["options"])
+            assert question.options[question.correct] == item["options"][0]
+            assert bank.is_correct(topic, index, question.correct)
+            assert bank.get(topic, index) is question
+
+    assert bank.get("basics", 100) is None
+    assert QuizBank(QUESTION_BANKS).get("oop", 0) == bank.get("oop", 0)
+
+
+def test_translated_questions_keep_answer_positions():
+    """Тест: вопросы переведены, правильный ответ на любом языке на том же месте."""
+    russian = QuizBank(QUESTION_BANKS)
+    for locale in i18n.locales:
+        bank = QuizBank(question_banks(i18n.tables[locale]))
+        assert bank.topics() == russian.topics()
+        for topic in russian.topics():
+            assert bank.size(topic) == russian.size(topic)
+            for index in range(bank.size(topic)):
+                question, original = bank.get(topic, index), russian.get(topic, index)
+                assert len(question.options) == len(original.options)
+                assert question.correct == original.correct
+    english = QuizBank(question_banks(i18n.tables["en"]))
+    assert english.get("basics", 0).text == "What is the type of the value 3.14?"
+
+
+def test_leaderboard_keeps_best_scores_sorted():
+    """Тест рейтинга по сумме лучших результатов."""
+    board = Leaderboard()
+    board.record(1, "basics", 2, "anna")
+    board.record(2, "basics", 3, "ivan")
+    board.record(1, "oop", 2)
+    assert board.record(2, "basics", 1) is False
+
+    assert board.top() == [(1, "anna", 4), (2, "ivan", 3)]
+    assert board.rank(2) == 2
+
+    board.record(2, "oop", 3)
+    assert board.top(1) == [(2, "ivan", 6)]
+    assert board.rank(1) == 2
+    assert board.rank(3) is None
+
+
+def test_score_buffer_keeps_best_result_per_topic():
+    """Тест буфера пакетной записи результатов."""
+    buffer = ScoreBuffer(max_size=2)
+    buffer.add(1, "basics", 1, 3, "t1")
+    buffer.add(1, "basics", 3, 3, "t2")
+    buffer.add(1, "basics", 2, 3, "t3")
+    assert not buffer.full
+    buffer.add(2, "oop", 1, 3, "t4")
+    assert buffer.full
+
+    assert sorted(buffer.drain()) == [(1, "basics", 3, 3, "t2"), (2, "oop", 1, 3, "t4")]
+    assert len(buffer) == 0
+
+
+def test_top_command_is_not_taken_by_free_text_handler(tmp_path, monkeypatch):
+    """Тест: /top отвечает рейтингом, а не разбором свободного текста."""
+    sent = []
+    monkeypatch.setattr(default_tenant, "db", SQLiteRepository(str(tmp_path / "bot.db")))
+    asyncio.run(default_tenant.db.init_db())
+
+    class LocalSession(BaseSession):
+        async def make_request(self, bot, method, timeout=None):
+            sent.append(method.text)
+            return Message(message_id=2, date=datetime.now(), chat=Chat(id=100, type="private"), text=method.text)
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self):
+            pass
+
+    dp = Dispatcher()
+    # Роутер мог подключить диспетчер другого теста
+    router._parent_router = None
+    dp.include_router(router)
+    user = User(id=100, is_bot=False, first_name="Student", language_code="ru")
+    update = Update(update_id=1, message=Message(
+        message_id=1, date=datetime.now(), chat=Chat(id=100, type="private"), from_user=user, text="/top",
+    ))
+    asyncio.run(dp.feed_update(Bot(token="42:TEST", session=LocalSession()), update))
+
+    assert sent == [format_leaderboard(100)]
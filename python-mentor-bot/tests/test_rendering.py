@@ -0,0 +1,69 @@
+# tests/test_rendering.py
+import html
+import re
+
+from main import (
+    LessonManager,
+    TELEGRAM_MESSAGE_LIMIT,
+    format_code,
+    split_html,
+    telegram_length,
+)
+
+TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)[^>]*>")
+
+
+def assert_balanced(part: str):
+    """Все теги части закрыты в правильном порядке."""
+    stack = []
+    for closing, name in TAG_RE.findall(part):
+        if closing:
+            assert stack and stack.pop() == name, part
+        else:
+            stack.append(name)
+    assert not stack, part
+
+
+def visible_text(text: str) -> str:
+    return html.unescape(TAG_RE.sub("", text))
+
+
+def test_every_lesson_page_fits_telegram_limit():
+    """Тест: каждая страница каждого урока помещается в сообщения Telegram."""
+    for topic, lesson in LessonManager.lessons.items():
+        for page in range(len(lesson["content"])):
+            parts = LessonManager.render_page(topic, page)
+            assert parts, (topic, page)
+            assert LessonManager.render_page(topic, page) is parts
+            for part in parts:
+                assert telegram_length(part) <= TELEGRAM_MESSAGE_LIMIT
+                assert_balanced(part)
+
+
+def test_split_long_code_block():
+    """Тест разбиения длинного блока <pre> без разрыва тегов и сущностей."""
+    code = "".join(f"value_{i} = '<&>'\n" for i in range(1500))
+    text = "<b>Заголовок</b>\n" + format_code(code)
+
+    parts = split_html(text, 1000)
+
+    assert len(parts) > 1
+    for part in parts:
+        assert telegram_length(part) <= 1000
+        assert_balanced(part)
+        assert part.endswith("</code></pre>")
+    assert parts[1].startswith("<pre><code class='python'>")
+    joined = "".join(visible_text(part) for part in parts)
+    assert joined.replace("\n", "") == visible_text(text).replace("\n", "")
+
+
+def test_split_long_line():
+    """Тест разбиения строки длиннее лимита."""
+    text = "<i>" + "&amp;" * 500 + "</i>"
+
+    parts = split_html(text, 100)
+
+    for part in parts:
+        assert telegram_length(part) <= 100
+        assert_balanced(part)
+        assert "&" not in part.replace("&amp;", "")
@@ -0,0 +1,65 @@
+# tests/test_review.py
+import asyncio
+from datetime import datetime, timedelta
+
+from bot import review as srs
+from bot.storage import SQLiteRepository
+
+
+def test_sm2_intervals():
+    """Тест интервалов SM-2 при хороших и плохих ответах."""
+    item = srs.ReviewItem(1, srs.PAGE, "basics", 0)
+    now = datetime(2026, 1, 1)
+
+    intervals = []
+    for _ in range(4):
+        item = srs.review(item, 5, now)
+        intervals.append(item.interval)
+    assert intervals[:2] == [1, 6]
+    assert intervals[3] > intervals[2] > 6
+
+    forgotten = srs.review(item, 1, now)
+    assert (forgotten.interval, forgotten.repetitions) == (1, 0)
+    assert forgotten.ease < item.ease
+    assert forgotten.due_at == (now + timedelta(days=1)).isoformat()
+
+
+def test_scheduler_sends_due_items_in_batches(tmp_path):
+    """Тест: планировщик забирает наступившие повторения и откладывает их."""
+    db = SQLiteRepository(str(tmp_path / "review.db"))
+    now = datetime(2026, 1, 10, 12, 0)
+    sent = []
+
+    async def notify(user_id, items):
+        sent.append((user_id, [item.item for item in items]))
+
+    async def run():
+        await db.init_db()
+        for user_id, item, days in ((1, 0, -2), (1, 1, -1), (2, 0, -1), (3, 0, 5)):
+            await db.add_review_item(srs.ReviewItem(
+                user_id, srs.PAGE, "basics", item, due_at=(now + timedelta(days=days)).isoformat()
+            ))
+
+        scheduler = srs.ReviewScheduler(db, notify, srs.AsyncRateLimiter(1000, burst=10), batch_size=10)
+        assert await scheduler.run_once(now) == 3
+        assert await scheduler.run_once(now) == 0
+        return await scheduler.next_delay(now)
+
+    delay = asyncio.run(run())
+
+    assert sent == [(1, [0, 1]), (2, [0])]
+    assert delay == 300.0
+
+
+def test_scheduler_wakes_for_earlier_items():
+    """Тест: новый элемент будит спящий планировщик, только если наступает раньше его пробуждения."""
+    scheduler = srs.ReviewScheduler(None, None, srs.AsyncRateLimiter(1))
+    now = datetime.now()
+    scheduler.schedule(now)
+    assert not scheduler._wakeup.is_set()
+
+    scheduler._sleep_until = now + timedelta(minutes=5)
+    scheduler.schedule(now + timedelta(days=1))
+    assert not scheduler._wakeup.is_set()
+    scheduler.schedule(now + timedelta(minutes=1))
+    assert scheduler._wakeup.is_set()
@@ -0,0 +1,49 @@
+# tests/test_scheduler.py
+import asyncio
+from datetime import datetime
+
+from bot.scheduler import CronTrigger, IntervalTrigger, JobScheduler
+from bot.storage import SQLiteRepository
+
+
+def test_cron_next_fire():
+    """Тест вычисления следующего запуска cron."""
+    after = datetime(2026, 1, 31, 23, 59, 30)
+
+    assert CronTrigger("*/15 * * * *").next_fire(after) == datetime(2026, 2, 1, 0, 0)
+    assert CronTrigger("30 4 * * *").next_fire(after) == datetime(2026, 2, 1, 4, 30)
+    # 1 февраля 2026 - воскресенье
+    assert CronTrigger("0 5 * * 0").next_fire(after) == datetime(2026, 2, 1, 5, 0)
+    assert CronTrigger("0 5 * * 1-5").next_fire(after) == datetime(2026, 2, 2, 5, 0)
+    assert CronTrigger("0 0 1 6 *").next_fire(after) == datetime(2026, 6, 1, 0, 0)
+
+
+def test_scheduler_runs_jobs_with_limits(tmp_path):
+    """Тест: интервальные задачи, лимит экземпляров, таймаут и сохранение состояния."""
+    db = SQLiteRepository(str(tmp_path / "jobs.db"))
+    calls = []
+
+    async def fast():
+        calls.append("fast")
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def run():
+        await db.init_db()
+        scheduler = JobScheduler(store=db)
+        scheduler.add_job("fast", fast, IntervalTrigger(0.02))
+        scheduler.add_job("slow", slow, IntervalTrigger(0.02), timeout=0.1, max_instances=1)
+        await scheduler.start()
+        await asyncio.sleep(0.3)
+        await scheduler.stop()
+        return scheduler.stats(), await db.load_job_states()
+
+    stats, states = asyncio.run(run())
+
+    assert len(calls) >= 5
+    assert stats["jobs"]["slow"]["last_status"] == "timeout"
+    assert stats["jobs"]["slow"]["skipped"] > 0
+    assert stats["lag_max"] < 0.1
+    assert states["fast"]["last_status"] == "ok"
+    assert states["slow"]["trigger"] == "every 0.02s"
@@ -0,0 +1,85 @@
+# tests/test_session.py
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+from aiogram import Bot
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from bot.config import BotConfig
+from bot.session import BotSession, create_session, json_codec
+
+ME = {"id": 42, "is_bot": True, "first_name": "Mentor", "username": "mentor_bot"}
+
+
+def test_json_codec():
+    """Тест: auto выбирает orjson, если он есть; dumps всегда возвращает строку."""
+    name, loads, dumps = json_codec("json")
+    assert name == "json" and dumps({"text": "Привет"}) == '{"text":"Привет"}'
+    name, loads, dumps = json_codec("auto")
+    assert isinstance(dumps({"a": [1]}), str) and loads(dumps({"a": [1]})) == {"a": [1]}
+    with pytest.raises(ValueError):
+        json_codec("yaml")
+
+
+def test_session_from_settings():
+    """Тест: пул соединений и адрес своего сервера Bot API берутся из настроек."""
+    config = BotConfig(
+        token="42:TEST", bot_api_url="http://localhost:8081/", bot_api_local=True,
+        http_pool_size=20, http_pool_per_host=10, http_keepalive=15, http_timeout=30, json_backend="json",
+    )
+    session = create_session(config)
+    assert session.api.api_url("42:TEST", "getMe") == "http://localhost:8081/bot42:TEST/getMe"
+    assert session.api.is_local and session.timeout == 30 and session.json_backend == "json"
+    assert session.connector_options == {
+        "limit": 20, "limit_per_host": 10, "keepalive_timeout": 15, "ttl_dns_cache": 3600,
+    }
+    assert create_session(BotConfig(token="42:TEST")).api.api_url("1:A", "getMe").startswith("https://api.telegram.org/")
+
+
+def test_requests_through_local_api_server():
+    """Тест: запросы идут на свой сервер по одному соединению, вложенные поля собираются выбранным JSON."""
+    async def run():
+        requests, peers = [], set()
+
+        async def handle(request: web.Request):
+            peers.add(request.transport.get_extra_info("peername"))
+            form = await request.post()
+            requests.append((request.match_info["method"], dict(form)))
+            if request.match_info["method"] == "getMe":
+                return web.json_response({"ok": True, "result": ME})
+            return web.json_response({"ok": True, "result": {
+                "message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}, "text": form["text"],
+            }})
+
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        session = BotSession(api=create_session(BotConfig(
+            token="42:TEST", bot_api_url=f"http://127.0.0.1:{port}"
+        )).api)
+        bot = Bot("42:TEST", session=session)
+        builder = InlineKeyboardBuilder()
+        builder.button(text="Далее", callback_data="t:basics:1")
+        try:
+            me = await bot.get_me()
+            for _ in range(3):
+                message = await bot.send_message(1, "Привет", reply_markup=builder.as_markup())
+        finally:
+            await session.close()
+            await runner.cleanup()
+        return me, message, requests, peers
+
+    me, message, requests, peers = asyncio.run(run())
+    assert me.username == "mentor_bot" and message.text == "Привет"
+    assert [method for method, _ in requests] == ["getMe"] + ["sendMessage"] * 3
+    markup = json.loads(requests[1][1]["reply_markup"])
+    assert markup["inline_keyboard"][0][0]["callback_data"] == "t:basics:1"
+    # keep-alive: все запросы по одному соединению
+    assert len(peers) == 1
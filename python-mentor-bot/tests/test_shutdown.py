@@ -0,0 +1,56 @@
+# tests/test_shutdown.py
+import asyncio
+
+from bot.middlewares import DrainMiddleware
+from bot.shutdown import GracefulShutdown
+
+
+def test_drain_waits_for_handlers_and_cancels_stragglers():
+    """Тест: остановка дожидается быстрых обработчиков и отменяет зависшие."""
+    drain = DrainMiddleware()
+    finished = []
+
+    async def handler(event, data):
+        await asyncio.sleep(event)
+        finished.append(event)
+
+    async def run():
+        tasks = [asyncio.create_task(drain(handler, delay, {})) for delay in (0.01, 0.02, 10)]
+        await asyncio.sleep(0)
+        result = await drain.drain(timeout=0.2)
+        await drain(handler, 0, {})
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return result
+
+    assert asyncio.run(run()) == (2, 1)
+    assert finished == [0.01, 0.02]
+    assert drain.rejected == 1
+    assert drain.in_flight == 0
+
+
+def test_shutdown_runs_steps_in_order_with_report():
+    """Тест: шаги выполняются по порядку, таймауты и ошибки попадают в отчет."""
+    order = []
+
+    async def step(name, delay=0.0, result=None):
+        order.append(name)
+        await asyncio.sleep(delay)
+        return result
+
+    async def failing():
+        order.append("failing")
+        raise RuntimeError("boom")
+
+    shutdown = GracefulShutdown(deadline=5, min_step=0.05)
+    shutdown.add_step("handlers", lambda: step("handlers", result={"drained": 3}))
+    shutdown.add_step("slow", lambda: step("slow", delay=1), timeout=0.05)
+    shutdown.add_step("failing", failing)
+    shutdown.add_step("session", lambda: step("session"))
+
+    report = asyncio.run(shutdown.run())
+
+    assert order == ["handlers", "slow", "failing", "session"]
+    assert report["handlers"] == {"drained": 3}
+    assert report["slow"] == "timeout"
+    assert report["failing"] == "error: boom"
+    assert report["session"] == "ok"
@@ -0,0 +1,123 @@
+# tests/test_snippets.py
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
+
+from bot.snippets import CodeImages, render_snippet, renderer_available, snippet_hash
+from bot.storage import SQLiteRepository
+
+CODE = "\n".join(f"print({i})" for i in range(20))
+
+
+class FakeBot:
+    """Запоминает отправленные картинки и выдает file_id загруженным"""
+
+    def __init__(self, invalid=()):
+        self.sent = []
+        self.invalid = set(invalid)
+
+    async def send_photo(self, chat_id, photo, caption=None, reply_markup=None):
+        if photo in self.invalid:
+            raise TelegramBadRequest(method=None, message="Bad Request: wrong file identifier")
+        self.sent.append(photo)
+        file_id = photo if isinstance(photo, str) else f"id-{len(self.sent)}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="thumb"), SimpleNamespace(file_id=file_id)])
+
+
+def make_images(store=None, **kwargs) -> CodeImages:
+    images = CodeImages(store, **kwargs)
+    images.enabled = True
+
+    async def render(code):
+        images.rendered += 1
+        return b"png"
+
+    images.render = render
+    return images
+
+
+def test_snippet_hash_and_length_limits():
+    """Тест: ключ не зависит от пробелов по краям, картинками уходят только фрагменты нужной длины."""
+    assert snippet_hash(CODE) == snippet_hash(f"\n{CODE}  \n") != snippet_hash(CODE + "\nx")
+    images = make_images(min_lines=15, max_lines=30)
+    assert images.accepts(CODE)
+    assert not images.accepts("print(1)") and not images.accepts("\n".join(["x"] * 31))
+    images.enabled = False
+    assert not images.accepts(CODE)
+
+
+def test_uploaded_once_and_sent_by_file_id(tmp_path):
+    """Тест: фрагмент рисуется и загружается один раз, file_id переживает перезапуск."""
+    async def run():
+        store = SQLiteRepository(str(tmp_path / "images.db"))
+        await store.init_db()
+        bot = FakeBot()
+        images = make_images(store)
+        await asyncio.gather(*(images.send(bot, 1, CODE) for _ in range(3)))
+        first = images.stats()
+
+        restarted = make_images(store)
+        await restarted.send(bot, 1, CODE)
+        # Другая тема - другая картинка
+        await make_images(store, theme="default").send(bot, 1, CODE)
+        await store.close()
+        return bot.sent, first, restarted.stats()
+
+    sent, first, restarted = asyncio.run(run())
+    assert isinstance(sent[0], BufferedInputFile) and isinstance(sent[-1], BufferedInputFile)
+    assert sent[1:4] == ["id-1", "id-1", "id-1"]
+    assert (first["rendered"], first["uploaded"], first["hits"]) == (1, 1, 2)
+    assert (restarted["rendered"], restarted["hits"]) == (0, 1)
+
+
+def test_invalid_file_id_is_uploaded_again():
+    """Тест: недействительный file_id заменяется новой загрузкой."""
+    bot = FakeBot(invalid={"stale"})
+    images = make_images()
+    images._file_ids[(snippet_hash(CODE), images.theme)] = "stale"
+    asyncio.run(images.send(bot, 1, CODE))
+    assert images.stats()["uploaded"] == 1
+    assert asyncio.run(images.file_id(CODE)) == "id-1"
+
+
+def test_render_in_process_pool():
+    """Тест: PNG рисуется в пуле процессов."""
+    if not renderer_available():
+        pytest.skip("нет pygments, pillow или моноширинного шрифта")
+
+    async def run():
+        images = CodeImages(workers=1)
+        assert images.start()
+        try:
+            return await images.render(CODE)
+        finally:
+            await images.stop()
+
+    png = asyncio.run(run())
+    assert png.startswith(b"\x89PNG") and png == render_snippet(CODE)
+
+
+def test_bots_share_pool_but_not_file_ids(tmp_path):
+    """Тест: картинки другого бота используют общий пул, но загружаются им самим."""
+    pool = ProcessPoolExecutor(1)
+    images = CodeImages(workers=1, pool=pool)
+    images.enabled = True
+    images._file_ids[(snippet_hash(CODE), images.theme)] = "first-bot"
+
+    async def run():
+        store = SQLiteRepository(str(tmp_path / "other.db"))
+        await store.init_db()
+        other = images.for_store(store)
+        assert other.enabled and other._pool is pool
+        assert await other.file_id(CODE) is None
+        # Пул закрывает тот, кто его создал
+        await other.stop()
+        await store.close()
+
+    asyncio.run(run())
+    assert pool.submit(abs, -1).result() == 1
+    pool.shutdown()
@@ -0,0 +1,166 @@
+# tests/test_storage.py
+"""
+Общий набор проверок для всех реализаций хранилища.
+
+PostgreSQL проверяется, если задан TEST_POSTGRES_DSN и установлен asyncpg,
+например: TEST_POSTGRES_DSN=postgresql://postgres@localhost/mentor_test
+Таблицы в этой базе пересоздаются.
+"""
+import asyncio
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from bot import review as srs
+from bot.models import UserProgress
+from bot.storage import PostgresRepository, SQLiteRepository
+
+TABLES = (
+    "users", "user_questions", "command_logs", "quiz_scores", "exercise_scores", "review_items", "scheduled_jobs",
+    "code_images",
+)
+
+
+async def reset_postgres(dsn: str):
+    import asyncpg
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f"DROP TABLE IF EXISTS {', '.join(TABLES)}")
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def repository(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteRepository(str(tmp_path / "storage.db"))
+
+    dsn = os.environ.get("TEST_POSTGRES_DSN")
+    if not dsn:
+        pytest.skip("TEST_POSTGRES_DSN не задан")
+    pytest.importorskip("asyncpg")
+    asyncio.run(reset_postgres(dsn))
+    return PostgresRepository(dsn, pool_size=2)
+
+
+def run_with(repository, scenario):
+    async def run():
+        await repository.init_db()
+        try:
+            return await scenario(repository)
+        finally:
+            await repository.close()
+
+    return asyncio.run(run())
+
+
+def test_users_and_questions(repository):
+    """Тест: пользователь сохраняется по одному и пачкой, обновляется и читается одинаково."""
+    created = datetime(2026, 1, 1, 9, 30)
+
+    async def scenario(repo):
+        assert await repo.get_user(1) is None
+        user = UserProgress(user_id=1, username="alice", created_at=created)
+        await repo.save_user(user)
+        user.current_topic, user.current_page, user.language = "oop", 3, "en"
+        await repo.save_user(user)
+        await repo.save_users([UserProgress(user_id=2, username="bob"), UserProgress(user_id=3, current_page=1)])
+        await repo.save_question(1, "Что такое GIL?")
+        await repo.save_command_logs([(1, "/start", created.isoformat()), (1, "/help", created.isoformat())])
+        await repo.save_command_logs([])
+        assert (await repo.get_user(3)).current_page == 1
+        return await repo.get_user(1), await repo.get_user(2)
+
+    user, other = run_with(repository, scenario)
+    assert (user.username, user.current_topic, user.current_page, user.created_at) == ("alice", "oop", 3, created)
+    assert user.language == "en"
+    assert other.language is None
+
+
+def test_sqlite_adds_language_column(tmp_path):
+    """Тест: база без столбца language дополняется им при запуске."""
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT, "
+                     "current_topic TEXT, current_page INTEGER, created_at TEXT)")
+        conn.execute("INSERT INTO users VALUES (1, 'alice', 'basics', 0, '2026-01-01T00:00:00')")
+
+    user = run_with(SQLiteRepository(str(path)), lambda repo: repo.get_user(1))
+    assert (user.username, user.language) == ("alice", None)
+
+
+def test_quiz_scores_keep_best(repository):
+    """Тест: пакетная запись результатов оставляет лучший результат по теме."""
+    async def scenario(repo):
+        await repo.save_user(UserProgress(user_id=1, username="alice"))
+        await repo.save_quiz_scores([(1, "basics", 2, 3, "t1"), (2, "basics", 1, 3, "t1")])
+        await repo.save_quiz_scores([(1, "basics", 1, 3, "t2"), (2, "basics", 3, 3, "t2")])
+        await repo.save_quiz_scores([])
+        rows = await repo.load_quiz_scores()
+        return sorted((row["user_id"], row["topic"], row["score"], row["username"]) for row in rows)
+
+    assert run_with(repository, scenario) == [(1, "basics", 2, "alice"), (2, "basics", 3, None)]
+
+
+def test_exercise_scores_keep_best(repository):
+    """Тест: результат задания перезаписывается только лучшим."""
+    async def scenario(repo):
+        await repo.save_exercise_score(1, "basics", 0, 2, 4, "t1")
+        await repo.save_exercise_score(1, "basics", 0, 1, 4, "t2")
+        await repo.save_exercise_score(1, "oop", 0, 4, 4, "t3")
+        await repo.save_exercise_score(2, "basics", 0, 4, 4, "t4")
+        rows = await repo.load_exercise_scores(1)
+        return [(row["topic"], row["page"], row["passed"], row["total"], row["graded_at"]) for row in rows]
+
+    assert run_with(repository, scenario) == [("basics", 0, 2, 4, "t1"), ("oop", 0, 4, 4, "t3")]
+
+
+def test_review_items(repository):
+    """Тест: элементы повторения добавляются один раз, выбираются по due_at и откладываются."""
+    async def scenario(repo):
+        assert await repo.next_review_due() is None
+        for item, due in ((0, "2026-01-03"), (1, "2026-01-01"), (2, "2026-01-02"), (3, "2026-02-01")):
+            assert await repo.add_review_item(srs.ReviewItem(1, srs.PAGE, "basics", item, due_at=due))
+        assert not await repo.add_review_item(srs.ReviewItem(1, srs.PAGE, "basics", 0, due_at="2020-01-01"))
+
+        due = await repo.due_reviews("2026-01-05", 2)
+        assert [item.item for item in due] == [1, 2]
+        assert await repo.next_review_due() == "2026-01-01"
+
+        await repo.snooze_reviews(due, "2026-01-10")
+        reviewed = srs.review(await repo.get_review_item(1, srs.PAGE, "basics", 0), 5, datetime(2026, 1, 10))
+        await repo.save_review_item(reviewed)
+        assert await repo.get_review_item(1, srs.PAGE, "basics", 0) == reviewed
+        assert await repo.get_review_item(1, srs.QUIZ, "basics", 0) is None
+        return [item.item for item in await repo.due_reviews("2026-01-05", 10)]
+
+    assert run_with(repository, scenario) == []
+
+
+def test_job_states_and_maintenance(repository):
+    """Тест: состояние фоновых задач перезаписывается, обслуживание выполняется."""
+    async def scenario(repo):
+        await repo.save_job_state("flush", "every 30s", "2026-01-01T00:00:30", None, "", 0.0)
+        await repo.save_job_state("flush", "every 30s", "2026-01-01T00:01:00", "2026-01-01T00:00:30", "ok", 0.5)
+        await repo.optimize()
+        await repo.optimize(vacuum=True)
+        return await repo.load_job_states()
+
+    states = run_with(repository, scenario)
+    assert list(states) == ["flush"]
+    assert (states["flush"]["next_run"], states["flush"]["last_status"]) == ("2026-01-01T00:01:00", "ok")
+
+
+def test_code_images(repository):
+    """Тест: file_id картинки хранится по (хэш, тема) и перезаписывается."""
+    async def scenario(repo):
+        assert await repo.get_code_image("abc", "monokai") is None
+        await repo.save_code_image("abc", "monokai", "f1")
+        await repo.save_code_image("abc", "default", "f2")
+        await repo.save_code_image("abc", "monokai", "f3")
+        return await repo.get_code_image("abc", "monokai"), await repo.get_code_image("abc", "default")
+
+    assert run_with(repository, scenario) == ("f3", "f2")
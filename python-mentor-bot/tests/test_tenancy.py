@@ -0,0 +1,97 @@
+# tests/test_tenancy.py
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message, Update, User
+
+from bot.config import BotConfig, load_tenants
+from bot.middlewares import TenantMiddleware
+from bot.storage import SQLiteRepository
+from bot.tenancy import DEFAULT_TENANT, Tenant
+from main import default_tenant, i18n, router
+
+
+def write_tenants(tmp_path, tenants) -> BotConfig:
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps(tenants), encoding="utf-8")
+    return BotConfig(token="1:MAIN", tenants_file=str(path))
+
+
+def test_load_tenants(tmp_path):
+    """Тест: у бота без базы своя SQLite по имени, пересечения с другими ботами запрещены."""
+    config = write_tenants(tmp_path, [
+        {"name": "school", "token": "2:SCHOOL", "locale": "en"},
+        {"name": "club", "token": "3:CLUB", "database_url": "postgresql://localhost/club"},
+    ])
+    school, club = load_tenants(config)
+    assert (school.database_path, school.locale) == ("school.db", "en")
+    assert club.database_path is None
+    assert load_tenants(BotConfig(token="1:MAIN")) == []
+
+    for tenants in (
+        [{"name": "a", "token": "1:MAIN"}],
+        [{"name": "a", "token": "2:A"}, {"name": "a", "token": "3:B"}],
+        [{"name": "a", "token": "2:A", "database_path": "python_mentor.db"}],
+        [{"name": DEFAULT_TENANT, "token": "2:A"}],
+    ):
+        with pytest.raises(ValueError):
+            load_tenants(write_tenants(tmp_path, tenants))
+
+
+def test_job_names():
+    """Тест: у основного бота имена задач прежние, у остальных - с именем бота."""
+    assert Tenant(DEFAULT_TENANT, None).job_name("db_backup") == "db_backup"
+    assert Tenant("school", None).job_name("db_backup") == "db_backup:school"
+
+
+def test_updates_use_data_of_receiving_bot(tmp_path):
+    """Тест: обновления разных ботов пишут в хранилище и языки своего бота."""
+    sent = []
+
+    class LocalSession(BaseSession):
+        async def make_request(self, bot, method, timeout=None):
+            sent.append((bot.id, method.text))
+            return Message(message_id=2, date=datetime.now(), chat=Chat(id=100, type="private"), text=method.text)
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self):
+            pass
+
+    async def run():
+        first = Tenant("first", SQLiteRepository(str(tmp_path / "first.db")))
+        second = Tenant("second", SQLiteRepository(str(tmp_path / "second.db")), locale="en")
+        await asyncio.gather(first.prepare(), second.prepare())
+        session = LocalSession()
+        bots = [Bot(token="41:FIRST", session=session), Bot(token="43:SECOND", session=session)]
+        middleware = TenantMiddleware(default_tenant)
+        middleware.register(bots[0], first)
+        middleware.register(bots[1], second)
+
+        dp = Dispatcher()
+        dp.update.outer_middleware(middleware)
+        # Роутер мог подключить диспетчер другого теста
+        router._parent_router = None
+        dp.include_router(router)
+        user = User(id=100, is_bot=False, first_name="Student", language_code="ru")
+        for bot in bots:
+            update = Update(update_id=1, message=Message(
+                message_id=1, date=datetime.now(), chat=Chat(id=100, type="private"), from_user=user, text="/start",
+            ))
+            await dp.feed_update(bot, update)
+
+        users = [await tenant.db.get_user(100) for tenant in (first, second)]
+        await asyncio.gather(first.db.close(), second.db.close())
+        return first, second, users
+
+    first, second, users = asyncio.run(run())
+    assert [user.language for user in users] == ["ru", "en"]
+    assert [tenant.user_cache.get(100).language for tenant in (first, second)] == ["ru", "en"]
+    assert 100 not in default_tenant.user_cache
+    assert (41, i18n.text("ru", "messages.welcome")) in sent
+    assert (43, i18n.text("en", "messages.welcome")) in sent
@@ -0,0 +1,116 @@
+# tests/test_transfer.py
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from bot import review as srs
+from bot.models import UserProgress
+from bot.storage import TABLE_COLUMNS, SQLiteRepository
+from bot.transfer import export_data, import_data
+
+
+async def dump(repo):
+    """Все строки хранилища по таблицам"""
+    result = {}
+    for table in TABLE_COLUMNS:
+        result[table] = [row async for rows in repo.iter_rows(table, batch_size=2) for row in rows]
+    return result
+
+
+async def fill(repo):
+    await repo.init_db()
+    for user_id in range(5):
+        await repo.save_user(UserProgress(user_id=user_id, username=f"user{user_id}"))
+    await repo.save_quiz_scores([(1, "basics", 2, 3, "t"), (1, "oop", 3, 3, "t"), (2, "basics", 0, 3, "t")])
+    await repo.add_review_item(srs.ReviewItem(1, srs.PAGE, "oop", 2, due_at="2026-01-01T00:00:00"))
+    await repo.save_question(3, "Что такое, \"GIL\"?\nВторая строка")
+    await repo.save_command_logs([(1, "/start", "t"), (2, "/help", "t")])
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_import_round_trip(tmp_path, fmt):
+    """Тест: выгрузка и загрузка в новую базу сохраняют все строки."""
+    source = SQLiteRepository(str(tmp_path / "source.db"))
+    target = SQLiteRepository(str(tmp_path / "target.db"))
+
+    async def run():
+        await fill(source)
+        exported = await export_data(source, tmp_path / "dump", fmt, batch_size=2, report=lambda line: None)
+        await target.init_db()
+        imported = await import_data(target, tmp_path / "dump", batch_size=3, report=lambda line: None)
+        return exported, imported, await dump(source), await dump(target)
+
+    exported, imported, before, after = asyncio.run(run())
+    assert exported == imported
+    assert exported["users"] == 5
+    assert after == before
+    assert not (tmp_path / "dump" / ".import-progress.json").exists()
+
+
+def test_resume_after_failure(tmp_path):
+    """Тест: прерванная загрузка продолжается с последней записанной пачки."""
+    dump_dir = tmp_path / "dump"
+    dump_dir.mkdir()
+    with open(dump_dir / "users.jsonl", "w", encoding="utf-8") as f:
+        for user_id in range(10):
+            f.write(json.dumps({"user_id": user_id, "username": f"u{user_id}", "created_at": "2026-01-01"}) + "\n")
+    target = SQLiteRepository(str(tmp_path / "target.db"))
+
+    def crash_after_first_batch(line):
+        raise RuntimeError("сбой")
+
+    async def run():
+        await target.init_db()
+        with pytest.raises(RuntimeError):
+            await import_data(target, dump_dir, batch_size=4, report=crash_after_first_batch)
+        assert json.loads((dump_dir / ".import-progress.json").read_text()) == {"users.jsonl": 4}
+        counts = await import_data(target, dump_dir, batch_size=4, report=lambda line: None)
+        return counts, await dump(target)
+
+    counts, rows = asyncio.run(run())
+    assert counts["users"] == 6
+    assert [row[0] for row in rows["users"]] == list(range(10))
+
+
+def test_import_legacy_schema(tmp_path):
+    """Тест: база старой схемы create_db.py переводится в текущую."""
+    legacy = tmp_path / "bot_data.db"
+    conn = sqlite3.connect(legacy)
+    conn.executescript("""
+        CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT, current_topic TEXT DEFAULT 'basics',
+            completed_lessons TEXT DEFAULT '[]', test_scores TEXT DEFAULT '{}',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE command_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, command TEXT,
+            used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE questions (id INTEGER PRIMARY KEY, user_id INTEGER, question_text TEXT NOT NULL,
+            answer_text TEXT, asked_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP, answered_date TIMESTAMP,
+            status TEXT DEFAULT 'pending');
+        CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT);
+    """)
+    conn.execute(
+        "INSERT INTO users VALUES (7, 'alice', 'oop', ?, ?, '2024-05-01 10:00:00')",
+        (json.dumps(["basics", "oop:2"]), json.dumps({"basics": 2, "oop": {"score": 1, "total": 4}})),
+    )
+    conn.execute("INSERT INTO users (user_id, username) VALUES (8, 'bob')")
+    conn.execute("INSERT INTO questions (user_id, question_text, asked_date) VALUES (7, 'Зачем self?', '2024-05-02')")
+    conn.execute("INSERT INTO command_logs (user_id, command) VALUES (7, '/start')")
+    conn.commit()
+    conn.close()
+
+    target = SQLiteRepository(str(tmp_path / "target.db"))
+
+    async def run():
+        await target.init_db()
+        await import_data(target, legacy, batch_size=2, report=lambda line: None)
+        return await dump(target)
+
+    rows = asyncio.run(run())
+    assert [(row[0], row[1], row[2], row[4]) for row in rows["users"]] == [
+        (7, "alice", "oop", "2024-05-01T10:00:00"), (8, "bob", "basics", rows["users"][1][4])
+    ]
+    assert [row[:4] for row in rows["quiz_scores"]] == [(7, "basics", 2, 3), (7, "oop", 1, 4)]
+    assert [row[:4] for row in rows["review_items"]] == [(7, "p", "basics", 0), (7, "p", "oop", 2)]
+    assert [row[1:4] for row in rows["user_questions"]] == [(7, "Зачем self?", None)]
+    assert [row[1:3] for row in rows["command_logs"]] == [(7, "/start")]
@@ -0,0 +1,125 @@
+# tests/test_users.py
+import asyncio
+from datetime import datetime
+
+from bot.models import LessonTopic, UserProgress
+from bot.tenancy import Tenant
+from bot.users import TOPICS, UserCache
+from main import load_user
+
+
+def make_user(user_id: int, **kwargs) -> UserProgress:
+    return UserProgress(user_id=user_id, username=f"user{user_id}", created_at=datetime(2026, 1, 2, 3, 4, 5, 678), **kwargs)
+
+
+def test_round_trip():
+    """Тест: пользователь из кэша равен сохраненному, тема и язык хранятся номерами."""
+    cache = UserCache()
+    users = [
+        make_user(1, current_topic="oop", current_page=3, language="en"),
+        make_user(2, language=None),
+        UserProgress(user_id=3),
+    ]
+    for user in users:
+        cache.put(user)
+    assert [cache.get(user.user_id) for user in users] == users
+    assert cache.get(4) is None
+    assert set(TOPICS) == {topic.value for topic in LessonTopic}
+
+    users[0].update_topic(LessonTopic.FILES, 1)
+    assert cache.get(1).current_topic == "oop"
+    cache.put(users[0])
+    assert (cache.get(1).current_topic, cache.get(1).current_page) == ("files", 1)
+    assert cache.stats()["hits"] == 6 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_reuses_rows():
+    """Тест: вытесняется давно не использованный, освобожденная строка переиспользуется."""
+    cache = UserCache(size=2)
+    cache.put(make_user(1))
+    cache.put(make_user(2))
+    cache.get(1)
+    cache.put(make_user(3))
+    assert 1 in cache and 3 in cache and 2 not in cache
+    assert len(cache._usernames) == 2
+
+    cache.configure(1, 300)
+    assert len(cache) == 1 and 3 in cache
+    cache.configure(0, 300)
+    cache.put(make_user(4))
+    assert len(cache) == 0
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    """Тест: запись старше ttl считается промахом."""
+    now = [1000.0]
+    monkeypatch.setattr("bot.users.time.monotonic", lambda: now[0])
+    cache = UserCache(ttl=60)
+    cache.put(make_user(1))
+    now[0] += 59
+    assert cache.get(1) is not None
+    now[0] += 2
+    assert cache.get(1) is None and 1 not in cache
+
+
+def test_absent_users_are_remembered(monkeypatch):
+    """Тест: промах хранилища кэшируется до ttl, сохранение пользователя его отменяет."""
+    now = [1000.0]
+    monkeypatch.setattr("bot.users.time.monotonic", lambda: now[0])
+    cache = UserCache(size=2, ttl=60)
+    cache.put_absent(1)
+    assert cache.is_absent(1) and not cache.is_absent(2)
+    cache.put(make_user(1))
+    assert not cache.is_absent(1) and cache.get(1) is not None
+
+    cache.put_absent(2)
+    cache.put_absent(3)
+    cache.put_absent(4)
+    assert not cache.is_absent(2) and cache.is_absent(4)
+    now[0] += 61
+    assert not cache.is_absent(4)
+
+
+def test_load_user_reads_storage_once_for_unknown_user():
+    """Тест: обновления незарегистрированного пользователя не читают хранилище каждый раз."""
+    class CountingRepository:
+        reads = 0
+
+        async def get_user(self, user_id):
+            self.reads += 1
+            return None
+
+    tenant = Tenant("test", CountingRepository())
+
+    async def run():
+        return [await load_user(7, tenant) for _ in range(3)]
+
+    assert asyncio.run(run()) == [None, None, None]
+    assert tenant.db.reads == 1
+
+
+def test_deferred_changes_survive_eviction_until_drained():
+    """Тест: отложенное изменение отдается из кэша и после вытеснения, drain забирает его один раз."""
+    cache = UserCache(size=1)
+    moved = make_user(1, current_topic="oop", current_page=2)
+    assert cache.defer(moved) and cache.unsaved == 1
+    cache.put(make_user(2))
+    assert 1 not in cache and cache.get(1) == moved
+
+    assert cache.drain() == [moved] and cache.unsaved == 0 and cache.drain() == []
+    cache.restore([moved])
+    cache.defer(make_user(1, current_page=5))
+    assert [user.current_page for user in cache.drain()] == [5]
+    assert not UserCache(size=0).defer(moved)
+
+
+def test_pages_are_marked_seen_once():
+    """Тест: страница отмечается один раз, у вытесненного пользователя отметки пропадают."""
+    cache = UserCache(size=1)
+    assert cache.mark_seen(1, "basics", 0)
+    cache.put(make_user(1))
+    assert cache.mark_seen(1, "basics", 0) and not cache.mark_seen(1, "basics", 0)
+    assert cache.mark_seen(1, "basics", 1)
+    cache.put(make_user(2))
+    cache.put(make_user(1))
+    assert cache.mark_seen(1, "basics", 0)